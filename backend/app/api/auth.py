@@ -1,47 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from datetime import datetime
 from ..config.database import get_db
-from ..models.models import User, UserRole
-from ..schemas.auth import Token, TokenData, UserCreate, UserResponse, LoginRequest
-from ..utils.auth import verify_password, get_password_hash, create_access_token, get_current_user
-import os
-from dotenv import load_dotenv
+from ..models.models import DEFAULT_STORE_ID, Store, User, UserRole
+from ..schemas.auth import Token, UserCreate, UserResponse, UserStoreUpdate, LoginRequest, RefreshRequest, RefreshResponse
+from ..utils.auth import (
+    verify_password, get_password_hash, create_access_token, get_current_user,
+    require_admin, require_owner, oauth2_scheme, token_session_id, ACCESS_TOKEN_EXPIRE_MINUTES
+)
+from ..utils.sessions import create_session, rotate_refresh_token, revoke_sessions, revoke_user_sessions
+from ..utils.profiling import ProfiledRoute
 
-# Load environment variables
-load_dotenv()
+router = APIRouter(route_class=ProfiledRoute)
 
-router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
-
-# JWT Configuration
-SECRET_KEY = os.getenv("SECRET_KEY")
-if not SECRET_KEY:
-    raise ValueError("SECRET_KEY environment variable is not set")
-
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1051200"))  # 2 years in minutes
+def _access_token(user: User, session_id: str) -> str:
+    return create_access_token(data={"sub": user.username, "sid": session_id})
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login_for_access_token(login_data: LoginRequest, request: Request, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.username == login_data.username).first()
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    if not user or not user.is_active or not verify_password(login_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Create token with 2-year expiration
-    access_token = create_access_token(
-        data={"sub": user.username},
-        expires_delta=timedelta(days=730)
-    )
+    session, refresh_token = create_session(db, user, request.headers.get("user-agent"))
+    access_token = _access_token(user, session.id)
     
     # Update user's last login
     user.last_login = datetime.utcnow()
@@ -49,11 +35,78 @@ async def login_for_access_token(login_data: LoginRequest, db: Session = Depends
     
     return {
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         "role": user.role,
         "redirect_to": "/report" if user.role == UserRole.ADMIN.value else "/order"
     }
 
+@router.post("/refresh", response_model=RefreshResponse)
+def refresh_access_token(refresh_data: RefreshRequest, db: Session = Depends(get_db)):
+    rotated = rotate_refresh_token(db, refresh_data.refresh_token)
+    if not rotated:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Session expired, please log in again",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    session, refresh_token = rotated
+    access_token = _access_token(session.user, session.id)
+    db.commit()
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
+
+@router.post("/logout")
+def logout(
+    token: str = Depends(oauth2_scheme),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    revoke_sessions(db, [token_session_id(token)])
+    db.commit()
+    return {"message": "Logged out successfully"}
+
+@router.post("/users/{user_id}/deactivate")
+def deactivate_user(
+    user_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if user.id == current_user.id:
+        raise HTTPException(status_code=400, detail="You cannot deactivate yourself")
+
+    user.is_active = False
+    revoked = revoke_user_sessions(db, user.id)
+    db.commit()
+    return {"message": "User deactivated successfully", "revoked_sessions": revoked}
+
+@router.put("/users/{user_id}/store")
+def update_user_store(
+    user_id: int,
+    store_data: UserStoreUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_owner)
+):
+    # Only owners may move staff between stores
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not db.query(Store.id).filter(Store.id == store_data.store_id).first():
+        raise HTTPException(status_code=404, detail="Store not found")
+
+    user.store_id = store_data.store_id
+    db.commit()
+    return {"message": "User store updated successfully"}
+
 @router.post("/register", response_model=UserResponse)
 def register_user(user: UserCreate, db: Session = Depends(get_db)):
     db_user = db.query(User).filter(User.username == user.username).first()
@@ -70,6 +123,7 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         email=user.email,
         hashed_password=hashed_password,
         role=UserRole.SELLER.value,  # Default role is SELLER
+        store_id=DEFAULT_STORE_ID,
         last_login=None
     )
     db.add(db_user)
@@ -79,4 +133,4 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
 
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user 
\ No newline at end of file
+    return current_user
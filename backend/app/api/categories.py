@@ -1,24 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Literal
 from ..config.database import get_db
 from ..models.models import Category, User
-from ..utils.auth import get_current_user
+from ..utils.auth import get_current_user, require_admin
+from ..utils.admission import HeldSlot, admit, hold
+from ..utils.bulk import export_response, import_upload
+from ..utils.images import image_urls
+from ..utils.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("", response_model=List[dict])
 async def get_categories(
+    image_size: int = Query(256, ge=1, description="Edge in pixels the till draws images at"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    categories = db.query(Category).filter(Category.is_active == 1).all()
+    categories = db.query(Category).options(joinedload(Category.image)).filter(Category.is_active == 1).all()
     return [
         {
             "id": category.id,
             "name": category.name,
             "description": category.description,
-            "image_url": category.image_url
+            **image_urls(category.image, category.image_url, image_size)
         }
         for category in categories
     ]
@@ -28,13 +33,15 @@ async def create_category(
     name: str,
     description: str,
     image_url: str = None,
+    image_id: int = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     category = Category(
         name=name,
         description=description,
-        image_url=image_url
+        image_url=image_url,
+        image_id=image_id
     )
     db.add(category)
     db.commit()
@@ -47,6 +54,7 @@ async def update_category(
     name: str,
     description: str,
     image_url: str = None,
+    image_id: int = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -57,6 +65,7 @@ async def update_category(
     category.name = name
     category.description = description
     category.image_url = image_url
+    category.image_id = image_id
     db.commit()
     return {"message": "Category updated successfully"}
 
@@ -72,4 +81,22 @@ async def delete_category(
     
     category.is_active = 0
     db.commit()
-    return {"message": "Category deleted successfully"} 
\ No newline at end of file
+    return {"message": "Category deleted successfully"}
+
+@router.post("/import", dependencies=[Depends(admit("bulk"))])
+def import_categories(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    # CSV or JSON; nothing is written unless every row is valid
+    return import_upload(db, "categories", file, None, current_user.id, dry_run)
+
+@router.get("/export")
+def export_categories(
+    format: Literal["csv", "json"] = "csv",
+    current_user: User = Depends(require_admin),
+    slot: HeldSlot = Depends(hold("bulk"))
+):
+    return export_response("categories", None, format, slot)
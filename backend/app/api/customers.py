@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response, File, UploadFile
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal
 from ..config.database import get_db
 from ..models.models import Customer, User
-from ..utils.auth import get_current_user
+from ..utils.auth import get_current_user, get_current_store, require_admin
+from ..utils.admission import HeldSlot, admit, hold
+from ..utils.bulk import export_response, import_upload
+from ..utils.stores import StoreInfo
+from ..utils.conditional import weak_etag, check_not_modified
+from ..utils.profiling import ProfiledRoute
 from pydantic import BaseModel
 
 class CustomerCreate(BaseModel):
@@ -21,14 +27,24 @@ class CustomerUpdate(BaseModel):
     sort_order: int = None
     is_active: bool = None
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("/", response_model=List[dict])
 async def get_customers(
+    request: Request,
+    response: Response,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    customers = db.query(Customer).order_by(Customer.sort_order.asc()).all()
+    last_modified, count = db.query(func.max(Customer.updated_at), func.count(Customer.id)).filter(
+        Customer.store_id == store.id
+    ).one()
+    not_modified = check_not_modified(request, response, weak_etag("customers", store.id, last_modified, count), last_modified)
+    if not_modified:
+        return not_modified
+
+    customers = db.query(Customer).filter(Customer.store_id == store.id).order_by(Customer.sort_order.asc()).all()
     return [
         {
             "id": customer.id,
@@ -45,10 +61,23 @@ async def get_customers(
 
 @router.get("/active", response_model=List[dict])
 async def get_active_customers(
+    request: Request,
+    response: Response,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    customers = db.query(Customer).filter(Customer.is_active == True).order_by(Customer.sort_order.asc()).all()
+    # Deactivating bumps updated_at, so the store-wide stamp covers this list
+    last_modified, count = db.query(func.max(Customer.updated_at), func.count(Customer.id)).filter(
+        Customer.store_id == store.id
+    ).one()
+    not_modified = check_not_modified(request, response, weak_etag("active-customers", store.id, last_modified, count), last_modified)
+    if not_modified:
+        return not_modified
+
+    customers = db.query(Customer).filter(
+        Customer.store_id == store.id, Customer.is_active == True
+    ).order_by(Customer.sort_order.asc()).all()
     return [
         {
             "id": customer.id,
@@ -64,6 +93,7 @@ async def get_active_customers(
 @router.post("/")
 async def create_customer(
     customer_data: CustomerCreate,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -72,7 +102,8 @@ async def create_customer(
         phone=customer_data.phone,
         address=customer_data.address,
         city=customer_data.city,
-        sort_order=customer_data.sort_order
+        sort_order=customer_data.sort_order,
+        store_id=store.id
     )
     db.add(customer)
     db.commit()
@@ -83,10 +114,11 @@ async def create_customer(
 async def update_customer(
     customer_id: int,
     customer_data: CustomerUpdate,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    customer = db.query(Customer).filter(Customer.id == customer_id, Customer.store_id == store.id).first()
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
@@ -109,10 +141,11 @@ async def update_customer(
 @router.delete("/{customer_id}")
 async def delete_customer(
     customer_id: int,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    customer = db.query(Customer).filter(Customer.id == customer_id, Customer.store_id == store.id).first()
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
@@ -123,13 +156,34 @@ async def delete_customer(
 @router.put("/{customer_id}/activate")
 async def activate_customer(
     customer_id: int,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    customer = db.query(Customer).filter(Customer.id == customer_id, Customer.store_id == store.id).first()
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
     
     customer.is_active = True
     db.commit()
     return {"message": "Customer activated successfully"}
+
+@router.post("/import", dependencies=[Depends(admit("bulk"))])
+def import_customers(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    # CSV or JSON; nothing is written unless every row is valid
+    return import_upload(db, "customers", file, store.id, current_user.id, dry_run)
+
+@router.get("/export")
+def export_customers(
+    format: Literal["csv", "json"] = "csv",
+    store: StoreInfo = Depends(get_current_store),
+    current_user: User = Depends(require_admin),
+    slot: HeldSlot = Depends(hold("bulk"))
+):
+    return export_response("customers", store.id, format, slot)
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
+from starlette.concurrency import run_in_threadpool
+from ..config.database import engine
+from ..config.settings import settings
+from ..utils.lifecycle import order_writes, ping_database, pool_status
+from ..utils.migrations import pending_migrations
+from ..utils import metrics
+
+router = APIRouter()
+
+# Probes arriving together share one ping, so a wedged database has at most
+# one thread waiting on it and every probe gets the same answer
+_ping: Optional[asyncio.Task] = None
+
+def _pending_migration_names():
+    with engine.connect() as conn:
+        return [f"{m.version:04d}_{m.name}" for m in pending_migrations(conn)]
+
+async def _ping_database() -> bool:
+    try:
+        await asyncio.wait_for(
+            run_in_threadpool(ping_database),
+            timeout=settings.readiness_db_timeout_seconds
+        )
+        return True
+    except Exception:
+        return False
+
+async def _database_reachable() -> bool:
+    global _ping
+    if _ping is None or _ping.done():
+        _ping = asyncio.create_task(_ping_database())
+    # Shielded so one probe's disconnect does not cancel the ping for the rest
+    return await asyncio.shield(_ping)
+
+@router.get("/healthz")
+async def liveness():
+    # The event loop is answering; says nothing about the database
+    return {"status": "alive"}
+
+@router.get("/readyz")
+async def readiness(request: Request):
+    state = request.app.state
+    checks = {
+        "started": getattr(state, "ready", False),
+        "draining": order_writes.draining,
+        "pool": pool_status(),
+    }
+
+    if checks["started"] and not checks["draining"]:
+        checks["database"] = await _database_reachable()
+        # Migrations only change between deploys, so stop checking once current
+        if checks["database"] and not getattr(state, "migrations_current", False):
+            try:
+                pending = await run_in_threadpool(_pending_migration_names)
+            except Exception:
+                pending = None
+            state.migrations_current = pending == []
+            checks["pending_migrations"] = pending
+        checks["migrations_current"] = getattr(state, "migrations_current", False)
+
+    ready = (
+        checks["started"]
+        and not checks["draining"]
+        and not checks["pool"]["exhausted"]
+        and checks.get("database", False)
+        and checks.get("migrations_current", False)
+    )
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "unavailable",
+            "startup_seconds": getattr(state, "startup_seconds", None),
+            "in_flight_orders": order_writes.count,
+            "checks": checks,
+        },
+    )
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Scraped on the backend port; nginx answers 404 for it
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
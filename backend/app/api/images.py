@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from sqlalchemy.orm import Session
+from ..config.database import get_db
+from ..config.settings import settings
+from ..models.models import Image, User
+from ..utils.auth import require_admin, get_current_user
+from ..utils.images import store_image, image_response
+from ..utils.profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+@router.post("")
+def upload_image(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    # Sync endpoint: hashing and verifying run in the threadpool, resizing in
+    # the image worker processes
+    data = file.file.read(settings.image_max_upload_bytes + 1)
+    if len(data) > settings.image_max_upload_bytes:
+        raise HTTPException(status_code=413, detail="Image is too large")
+    if not data:
+        raise HTTPException(status_code=400, detail="Empty file")
+
+    image = store_image(db, data)
+    return image_response(image)
+
+@router.get("/{image_id}")
+def get_image(
+    image_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    image = db.query(Image).filter(Image.id == image_id).first()
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return image_response(image)
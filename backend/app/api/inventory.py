@@ -0,0 +1,201 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from typing import List
+from decimal import Decimal
+from pydantic import BaseModel, Field
+from ..config.database import get_db
+from ..models.models import Ingredient, RecipeItem, Product, User
+from ..utils.auth import get_current_store, require_admin, require_seller
+from ..utils.inventory import low_stock
+from ..utils.stores import StoreInfo
+from ..utils.profiling import ProfiledRoute
+
+class IngredientCreate(BaseModel):
+    name: str
+    unit: str
+    stock: Decimal = Decimal(0)
+    low_stock_threshold: Decimal = Decimal(0)
+
+class IngredientUpdate(BaseModel):
+    name: str = None
+    unit: str = None
+    low_stock_threshold: Decimal = None
+    is_active: bool = None
+
+class StockAdjustment(BaseModel):
+    # Positive for deliveries, negative for waste or stock-take corrections
+    delta: Decimal
+
+class RecipeLine(BaseModel):
+    ingredient_id: int
+    quantity: Decimal = Field(gt=0)
+
+router = APIRouter(route_class=ProfiledRoute)
+
+def _store_ingredient(db: Session, store: StoreInfo, ingredient_id: int) -> Ingredient:
+    ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id, Ingredient.store_id == store.id).first()
+    if not ingredient:
+        raise HTTPException(status_code=404, detail="Ingredient not found")
+    return ingredient
+
+def _ingredient_response(ingredient: Ingredient):
+    return {
+        "id": ingredient.id,
+        "name": ingredient.name,
+        "unit": ingredient.unit,
+        "stock": float(ingredient.stock),
+        "low_stock_threshold": float(ingredient.low_stock_threshold),
+        "is_active": ingredient.is_active
+    }
+
+@router.get("/ingredients", response_model=List[dict])
+async def get_ingredients(
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_seller)
+):
+    ingredients = db.query(Ingredient).filter(
+        Ingredient.store_id == store.id, Ingredient.is_active == True
+    ).order_by(Ingredient.name).all()
+    return [_ingredient_response(ingredient) for ingredient in ingredients]
+
+@router.post("/ingredients")
+async def create_ingredient(
+    ingredient_data: IngredientCreate,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    if db.query(Ingredient).filter(Ingredient.store_id == store.id, Ingredient.name == ingredient_data.name).first():
+        raise HTTPException(status_code=400, detail="Ingredient already exists")
+
+    ingredient = Ingredient(
+        store_id=store.id,
+        name=ingredient_data.name,
+        unit=ingredient_data.unit,
+        stock=ingredient_data.stock,
+        low_stock_threshold=ingredient_data.low_stock_threshold
+    )
+    db.add(ingredient)
+    db.commit()
+    db.refresh(ingredient)
+    return {"message": "Ingredient created successfully", "id": ingredient.id}
+
+@router.put("/ingredients/{ingredient_id}")
+async def update_ingredient(
+    ingredient_id: int,
+    ingredient_data: IngredientUpdate,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    ingredient = _store_ingredient(db, store, ingredient_id)
+
+    if ingredient_data.name is not None:
+        if ingredient_data.name != ingredient.name and db.query(Ingredient.id).filter(
+            Ingredient.store_id == store.id, Ingredient.name == ingredient_data.name
+        ).first():
+            raise HTTPException(status_code=400, detail="Ingredient already exists")
+        ingredient.name = ingredient_data.name
+    if ingredient_data.unit is not None:
+        ingredient.unit = ingredient_data.unit
+    if ingredient_data.low_stock_threshold is not None:
+        ingredient.low_stock_threshold = ingredient_data.low_stock_threshold
+    if ingredient_data.is_active is not None:
+        ingredient.is_active = ingredient_data.is_active
+
+    db.commit()
+    return {"message": "Ingredient updated successfully"}
+
+@router.post("/ingredients/{ingredient_id}/adjust")
+async def adjust_stock(
+    ingredient_id: int,
+    adjustment: StockAdjustment,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    # Relative update so a delivery never overwrites sales made meanwhile
+    result = db.execute(
+        update(Ingredient)
+        .where(Ingredient.id == ingredient_id, Ingredient.store_id == store.id)
+        .values(stock=Ingredient.stock + adjustment.delta)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Ingredient not found")
+    db.commit()
+
+    ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
+    return _ingredient_response(ingredient)
+
+@router.delete("/ingredients/{ingredient_id}")
+async def delete_ingredient(
+    ingredient_id: int,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    ingredient = _store_ingredient(db, store, ingredient_id)
+
+    ingredient.is_active = False
+    db.commit()
+    return {"message": "Ingredient deleted successfully"}
+
+@router.get("/recipes/{product_id}", response_model=List[dict])
+async def get_recipe(
+    product_id: int,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_seller)
+):
+    lines = db.query(RecipeItem).join(Product, Product.id == RecipeItem.product_id).filter(
+        RecipeItem.product_id == product_id, Product.store_id == store.id
+    ).all()
+    return [
+        {
+            "ingredient_id": line.ingredient_id,
+            "ingredient_name": line.ingredient.name,
+            "unit": line.ingredient.unit,
+            "quantity": float(line.quantity)
+        }
+        for line in lines
+    ]
+
+@router.put("/recipes/{product_id}")
+async def set_recipe(
+    product_id: int,
+    lines: List[RecipeLine],
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    if not db.query(Product.id).filter(Product.id == product_id, Product.store_id == store.id).first():
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    ingredient_ids = {line.ingredient_id for line in lines}
+    if len(ingredient_ids) != len(lines):
+        raise HTTPException(status_code=400, detail="Each ingredient may appear only once")
+    # Recipes only use the product's own store's stock
+    found = {row.id for row in db.query(Ingredient.id).filter(
+        Ingredient.id.in_(ingredient_ids), Ingredient.store_id == store.id
+    ).all()}
+    missing = ingredient_ids - found
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Ingredients {sorted(missing)} not found")
+
+    db.query(RecipeItem).filter(RecipeItem.product_id == product_id).delete()
+    db.add_all([
+        RecipeItem(product_id=product_id, ingredient_id=line.ingredient_id, quantity=line.quantity)
+        for line in lines
+    ])
+    db.commit()
+    return {"message": "Recipe updated successfully"}
+
+@router.get("/low-stock", response_model=List[dict])
+async def get_low_stock_report(
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_seller)
+):
+    return [_ingredient_response(ingredient) for ingredient in low_stock(db, store.id)]
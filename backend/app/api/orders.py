@@ -1,12 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session, joinedload
-from typing import List
+from sqlalchemy import func, update
+from typing import List, Literal
+from decimal import Decimal
 from ..config.database import get_db
-from ..models.models import Order, OrderItem, Product, User, Customer, PaymentMethod
-from ..utils.auth import get_current_user
-from pydantic import BaseModel
+from ..models.models import Order, OrderItem, Product, User, Customer, PaymentMethod, OrderArchive, OrderItemArchive
+from ..utils.auth import get_current_user, get_current_store, require_admin
+from ..utils.lifecycle import guard_order_write
+from ..utils.admission import admit
+from ..utils.archive import orders_between, order_items_between
+from ..utils.report_cache import report_cache
+from ..utils.shifts import open_shift_id, record_order, record_status_change, record_item_changes
+from ..utils.inventory import ingredient_requirements, consume_stock, restore_stock, product_quantities
+from ..utils.prep_queue import close_queued_items
+from ..utils.pricing import resolve_price
+from ..utils.promotions import OrderPricer
+from ..utils.conditional import weak_etag, check_not_modified
+from ..utils.jobs import enqueue, job_workers
+from ..utils.order_jobs import ORDER_CREATED
+from ..utils.shop_settings import ShopSettings, get_shop_settings
+from ..utils.tickets import next_ticket_number
+from ..utils.stores import StoreInfo
+from pydantic import BaseModel, Field
 from datetime import datetime, timedelta
 from ..schemas.order import OrderResponse
+from ..utils.profiling import ProfiledRoute
 
 class OrderItemCreate(BaseModel):
     product_id: int
@@ -16,46 +34,84 @@ class OrderCreate(BaseModel):
     items: List[OrderItemCreate]
     payment_method_code: str = None
     customer_id: int = None
+    # Open a tab that stays editable until its status is changed
+    open_tab: bool = False
 
-router = APIRouter()
+class OrderItemOperation(BaseModel):
+    op: Literal["add", "remove", "set_quantity"]
+    product_id: int = None
+    item_id: int = None
+    quantity: int = Field(None, ge=0)
 
-@router.post("")
-async def create_order(
+class OrderItemsPatch(BaseModel):
+    # Version from the last read of the order; the patch fails if it moved on
+    version: int
+    operations: List[OrderItemOperation]
+
+ORDER_STATUSES = ["open", "pending", "completed", "cancelled"]
+
+router = APIRouter(route_class=ProfiledRoute)
+
+@router.post("", dependencies=[Depends(guard_order_write), Depends(admit("checkout"))])
+def create_order(
     order_data: OrderCreate,
+    shop: ShopSettings = Depends(get_shop_settings),
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     # Calculate total amount
     total_amount = 0
     order_items = []
+    product_ids = {item.product_id for item in order_data.items}
+    products = {
+        product.id: product
+        for product in db.query(Product).filter(Product.id.in_(product_ids), Product.store_id == store.id).all()
+    } if product_ids else {}
+    if order_data.customer_id is not None and not db.query(Customer.id).filter(
+        Customer.id == order_data.customer_id, Customer.store_id == store.id
+    ).first():
+        raise HTTPException(status_code=404, detail="Customer not found")
+    # One instant for the whole order so every line is priced from the same schedule state
+    priced_at = datetime.utcnow()
+    pricer = OrderPricer(db, shop.timezone, order_data.customer_id, priced_at)
     
     for item in order_data.items:
-        product = db.query(Product).filter(Product.id == item.product_id).first()
+        product = products.get(item.product_id)
         if not product:
             raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
         
-        total_amount += product.price * item.quantity
+        unit_price = resolve_price(db, product, priced_at)
+        discount_amount, promotion_id = pricer.price_line(product, unit_price, item.quantity)
+        line_price = unit_price * item.quantity - discount_amount
+        total_amount += line_price
         order_items.append({
             "product_id": item.product_id,
             "product_name": product.name,
-            "unit_price": product.price,
+            "unit_price": unit_price,
             "quantity": item.quantity,
-            "price": product.price * item.quantity
+            "price": line_price,
+            "discount_amount": discount_amount,
+            "promotion_id": promotion_id,
+            "station": product.station
         })
     
     # Create order
     order = Order(
+        store_id=store.id,
         user_id=current_user.id,
         customer_id=order_data.customer_id,
         total_amount=total_amount,
         payment_method_code=order_data.payment_method_code,
-        status="pending"
+        status="open" if order_data.open_tab else "pending",
+        shift_id=open_shift_id(db, store.id)
     )
     db.add(order)
-    db.commit()
-    db.refresh(order)
+    # Flush for the order id so the order and its items commit together
+    db.flush()
     
     # Create order items
+    created_items = []
     for item in order_items:
         order_item = OrderItem(
             order_id=order.id,
@@ -63,22 +119,188 @@ async def create_order(
             product_name=item["product_name"],
             unit_price=item["unit_price"],
             quantity=item["quantity"],
-            price=item["price"]
+            price=item["price"],
+            discount_amount=item["discount_amount"],
+            promotion_id=item["promotion_id"],
+            station=item["station"]
         )
         db.add(order_item)
+        created_items.append(order_item)
     
+    # Stock and shift counters change in the same transaction as the order;
+    # stock and then the ticket counter, which every till of the store shares,
+    # go last so their row locks are held only until the commit
+    record_order(db, order, created_items)
+    # Anything the till need not wait for runs from the outbox after commit
+    enqueue(db, ORDER_CREATED, {"order_id": order.id})
+    consume_stock(db, ingredient_requirements(db, product_quantities(created_items)))
+    order.ticket_date = shop.business_date(priced_at)
+    order.ticket_number = next_ticket_number(db, store.id, order.ticket_date)
+    db.commit()
+    report_cache.order_written(order.store_id, order.created_at)
+    job_workers.notify()
+    return {
+        "message": "Order created successfully",
+        "order_id": order.id,
+        "ticket_number": order.ticket_number,
+        "version": order.version
+    }
+
+@router.patch("/{order_id}/items", dependencies=[Depends(guard_order_write), Depends(admit("checkout"))])
+def update_order_items(
+    order_id: int,
+    patch: OrderItemsPatch,
+    shop: ShopSettings = Depends(get_shop_settings),
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    order = db.query(Order).filter(Order.id == order_id, Order.store_id == store.id).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if order.status != "open":
+        raise HTTPException(status_code=409, detail="Only open tabs can be edited")
+
+    items = {item.id: item for item in order.items}
+    product_ids = {op.product_id for op in patch.operations if op.op == "add"}
+    products = {
+        product.id: product
+        for product in db.query(Product).filter(Product.id.in_(product_ids), Product.store_id == store.id).all()
+    } if product_ids else {}
+
+    # Lines keep the promotions of the moment they were rung up, so a
+    # happy-hour round stays discounted when its quantity changes later
+    pricers = {}
+    def pricer_at(at):
+        if at not in pricers:
+            pricers[at] = OrderPricer(db, shop.timezone, order.customer_id, at)
+        return pricers[at]
+
+    # Work out every line change and the total delta before writing anything
+    amount_delta = Decimal(0)
+    item_deltas = []
+    new_items = []
+    for op in patch.operations:
+        if op.op == "add":
+            product = products.get(op.product_id)
+            if not product:
+                raise HTTPException(status_code=404, detail=f"Product {op.product_id} not found")
+            if not op.quantity:
+                raise HTTPException(status_code=400, detail="Quantity must be positive")
+            added_at = datetime.utcnow()
+            unit_price = resolve_price(db, product, added_at)
+            discount_amount, promotion_id = pricer_at(added_at).price_line(product, unit_price, op.quantity)
+            price = unit_price * op.quantity - discount_amount
+            new_items.append(OrderItem(
+                order_id=order.id,
+                product_id=product.id,
+                product_name=product.name,
+                unit_price=unit_price,
+                quantity=op.quantity,
+                price=price,
+                discount_amount=discount_amount,
+                promotion_id=promotion_id,
+                created_at=added_at,
+                station=product.station
+            ))
+            amount_delta += price
+            item_deltas.append((product.id, op.quantity, price))
+            continue
+
+        item = items.get(op.item_id)
+        if not item:
+            raise HTTPException(status_code=404, detail=f"Order item {op.item_id} not found")
+        quantity = 0 if op.op == "remove" else op.quantity
+        if quantity is None:
+            raise HTTPException(status_code=400, detail="Quantity is required")
+        discount_amount, promotion_id = pricer_at(item.created_at).price_line(item.product, item.unit_price, quantity) \
+            if quantity else (Decimal(0), None)
+        price = item.unit_price * quantity - discount_amount
+        amount_delta += price - item.price
+        item_deltas.append((item.product_id, quantity - item.quantity, price - item.price))
+        if quantity == 0:
+            db.delete(item)
+            del items[item.id]
+        else:
+            item.quantity = quantity
+            item.price = price
+            item.discount_amount = discount_amount
+            item.promotion_id = promotion_id
+
+    # The open shift first, so close_shift waits for this edit and its deltas
+    # land in a shift whose Z-report is not frozen yet
+    shift_id = open_shift_id(db, store.id)
+    # Claim the version next; a concurrent edit or status change makes this
+    # match no row and the whole patch is rolled back
+    result = db.execute(
+        update(Order)
+        .where(Order.id == order.id, Order.version == patch.version, Order.status == "open")
+        .values(version=Order.version + 1, total_amount=Order.total_amount + amount_delta)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Order was changed by someone else, reload and retry")
+
+    db.add_all(new_items)
+    record_item_changes(db, shift_id, order, amount_delta, item_deltas)
+
+    stock_delta = {}
+    for product_id, quantity, _ in item_deltas:
+        stock_delta[product_id] = stock_delta.get(product_id, 0) + quantity
+    consume_stock(db, ingredient_requirements(db, {pid: q for pid, q in stock_delta.items() if q > 0}))
+    restore_stock(db, ingredient_requirements(db, {pid: -q for pid, q in stock_delta.items() if q < 0}))
     db.commit()
-    return {"message": "Order created successfully", "order_id": order.id}
 
-@router.get("", response_model=List[dict])
-async def get_orders(
+    db.refresh(order)
+    report_cache.order_written(order.store_id, order.created_at)
+    return {
+        "id": order.id,
+        "version": order.version,
+        "total_amount": order.total_amount,
+        "items": [
+            {
+                "id": item.id,
+                "product_id": item.product_id,
+                "product_name": item.product_name,
+                "unit_price": item.unit_price,
+                "quantity": item.quantity,
+                "price": item.price,
+                "discount_amount": item.discount_amount,
+                "promotion_id": item.promotion_id
+            }
+            for item in order.items
+        ]
+    }
+
+def _lookup_stamps(db: Session):
+    # Order lists show customer and payment method names, so renaming either
+    # changes the list too
+    return (
+        db.query(func.max(Customer.updated_at)).scalar(),
+        db.query(func.max(PaymentMethod.updated_at)).scalar(),
+    )
+
+@router.get("", response_model=List[dict], dependencies=[Depends(admit("bulk"))])
+def get_orders(
+    request: Request,
+    response: Response,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    last_modified, count = db.query(func.max(Order.updated_at), func.count(Order.id)).filter(
+        Order.store_id == store.id
+    ).one()
+    etag = weak_etag("orders", store.id, last_modified, count, *_lookup_stamps(db))
+    not_modified = check_not_modified(request, response, etag, last_modified)
+    if not_modified:
+        return not_modified
+
     orders = db.query(Order).options(
         joinedload(Order.customer),
         joinedload(Order.payment_method)
-    ).all()
+    ).filter(Order.store_id == store.id).all()
     return [
         {
             "id": order.id,
@@ -88,6 +310,7 @@ async def get_orders(
             "customer_id": order.customer_id,
             "customer_name": order.customer.customer_name if order.customer else None,
             "status": order.status,
+            "ticket_number": order.ticket_number,
             "created_at": order.created_at,
             "items": [
                 {
@@ -95,7 +318,9 @@ async def get_orders(
                     "product_name": item.product_name,
                     "unit_price": item.unit_price,
                     "quantity": item.quantity,
-                    "price": item.price
+                    "price": item.price,
+                    "discount_amount": item.discount_amount,
+                    "promotion_id": item.promotion_id
                 }
                 for item in order.items
             ]
@@ -103,9 +328,10 @@ async def get_orders(
         for order in orders
     ]
 
-@router.get("/view/{order_id}")
+@router.get("/view/{order_id}", dependencies=[Depends(admit("standard"))])
 async def get_order(
     order_id: int,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -113,11 +339,12 @@ async def get_order(
         joinedload(Order.customer),
         joinedload(Order.payment_method)
     ).filter(
-        Order.id == order_id
+        Order.id == order_id,
+        Order.store_id == store.id
     ).first()
     
     if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+        return _get_archived_order(order_id, store.id, db)
     
     return {
         "id": order.id,
@@ -127,47 +354,119 @@ async def get_order(
         "customer_id": order.customer_id,
         "customer_name": order.customer.customer_name if order.customer else None,
         "status": order.status,
+        "ticket_number": order.ticket_number,
+        "version": order.version,
         "created_at": order.created_at,
         "items": [
             {
+                "id": item.id,
                 "product_id": item.product_id,
                 "product_name": item.product_name,
                 "unit_price": item.unit_price,
                 "quantity": item.quantity,
-                "price": item.price
+                "price": item.price,
+                "discount_amount": item.discount_amount,
+                "promotion_id": item.promotion_id
             }
             for item in order.items
         ]
     }
 
-@router.put("/{order_id}/status")
-async def update_order_status(
+def _get_archived_order(order_id: int, store_id: int, db: Session):
+    order = db.query(OrderArchive).filter(OrderArchive.id == order_id, OrderArchive.store_id == store_id).first()
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+
+    customer = db.query(Customer).filter(Customer.id == order.customer_id).first() if order.customer_id else None
+    payment_method = db.query(PaymentMethod).filter(
+        PaymentMethod.payment_method_code == order.payment_method_code
+    ).first() if order.payment_method_code else None
+    items = db.query(OrderItemArchive).filter(OrderItemArchive.order_id == order.id).all()
+
+    return {
+        "id": order.id,
+        "total_amount": order.total_amount,
+        "payment_method_code": order.payment_method_code,
+        "payment_method_name": payment_method.name if payment_method else None,
+        "customer_id": order.customer_id,
+        "customer_name": customer.customer_name if customer else None,
+        "status": order.status,
+        "ticket_number": order.ticket_number,
+        "created_at": order.created_at,
+        "items": [
+            {
+                "product_id": item.product_id,
+                "product_name": item.product_name,
+                "unit_price": item.unit_price,
+                "quantity": item.quantity,
+                "price": item.price,
+                "discount_amount": item.discount_amount,
+                "promotion_id": item.promotion_id
+            }
+            for item in items
+        ]
+    }
+
+@router.put("/{order_id}/status", dependencies=[Depends(admit("standard"))])
+def update_order_status(
     order_id: int,
     status: str,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     order = db.query(Order).filter(
         Order.id == order_id,
+        Order.store_id == store.id,
         Order.user_id == current_user.id
     ).first()
     
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
-    if status not in ["pending", "completed", "cancelled"]:
+    if status not in ORDER_STATUSES:
         raise HTTPException(status_code=400, detail="Invalid status")
+    if status == "open" and order.status != "open":
+        raise HTTPException(status_code=400, detail="Closed orders cannot be reopened")
     
-    order.status = status
+    old_status = order.status
+    shift_id = open_shift_id(db, store.id)
+    # Claim the version the items and total were read at; a concurrent tab
+    # edit makes this match no row, so stock and counters are never moved
+    # for lines that have changed since
+    result = db.execute(
+        update(Order)
+        .where(Order.id == order.id, Order.version == order.version)
+        .values(status=status, version=Order.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Order was changed by someone else, reload and retry")
+
+    # Counters before stock, the lock order checkout uses
+    record_status_change(db, shift_id, order, old_status, status)
+    if status == "cancelled" and old_status != "cancelled":
+        restore_stock(db, ingredient_requirements(db, product_quantities(order.items)))
+    elif status != "cancelled" and old_status == "cancelled":
+        consume_stock(db, ingredient_requirements(db, product_quantities(order.items)))
+    if status in ("completed", "cancelled"):
+        close_queued_items(db, order.id)
+    store_id, created_at = order.store_id, order.created_at
     db.commit()
+    report_cache.order_written(store_id, created_at)
     return {"message": "Order status updated successfully"}
 
-@router.get("/history", response_model=List[OrderResponse])
+@router.get("/history", response_model=List[OrderResponse], dependencies=[Depends(admit("bulk"))])
 def get_order_history(
+    request: Request,
+    response: Response,
     date_filter: str = Query(..., description="Filter orders by date range"),
+    shop: ShopSettings = Depends(get_shop_settings),
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db)
 ):
-    today = datetime.now().date()
+    today = shop.business_date()
     if date_filter == "today":
         start_date = today
         end_date = today + timedelta(days=1)
@@ -185,35 +484,60 @@ def get_order_history(
         end_date = today + timedelta(days=1)
     else:
         raise HTTPException(status_code=400, detail="Invalid date filter")
+    start_date, end_date = shop.day_start(start_date), shop.day_start(end_date)
+
+    # Archived orders are included only when the range reaches back that far
+    orders = orders_between(db, start_date, end_date, store.id)
+    last_modified, count = db.query(func.max(orders.c.updated_at), func.count(orders.c.id)).one()
+    etag = weak_etag("history", store.id, start_date, end_date, last_modified, count, *_lookup_stamps(db))
+    not_modified = check_not_modified(request, response, etag, last_modified)
+    if not_modified:
+        return not_modified
 
-    orders = db.query(Order, Customer, PaymentMethod).outerjoin(
-        Customer, Order.customer_id == Customer.id
+    items = order_items_between(db, start_date, end_date, store.id)
+    quantities = db.query(
+        items.c.order_id,
+        func.sum(items.c.quantity).label('total_quantity')
+    ).group_by(items.c.order_id).subquery()
+
+    rows = db.query(
+        orders.c.id,
+        orders.c.ticket_number,
+        orders.c.created_at,
+        orders.c.total_amount,
+        quantities.c.total_quantity,
+        Customer.customer_name,
+        PaymentMethod.name.label('payment_method_name')
     ).outerjoin(
-        PaymentMethod, Order.payment_method_code == PaymentMethod.payment_method_code
-    ).filter(
-        Order.created_at >= start_date,
-        Order.created_at < end_date
-    ).order_by(Order.created_at.desc()).all()
-
-    result = []
-    for order_tuple in orders:
-        order, customer, payment_method = order_tuple
-        total_quantity = sum(item.quantity for item in order.items)
-        
-        result.append({
-            "id": order.id,
-            "order_date": order.created_at,
-            "total_quantity": total_quantity,
-            "total_amount": float(order.total_amount),
-            "customer_name": customer.customer_name if customer else None,
-            "payment_method_name": payment_method.name if payment_method else None,
-        })
-    return result
+        quantities, quantities.c.order_id == orders.c.id
+    ).outerjoin(
+        Customer, orders.c.customer_id == Customer.id
+    ).outerjoin(
+        PaymentMethod, orders.c.payment_method_code == PaymentMethod.payment_method_code
+    ).order_by(orders.c.created_at.desc()).all()
+
+    return [
+        {
+            "id": row.id,
+            "ticket_number": row.ticket_number,
+            "order_date": row.created_at,
+            "total_quantity": int(row.total_quantity or 0),
+            "total_amount": float(row.total_amount),
+            "customer_name": row.customer_name,
+            "payment_method_name": row.payment_method_name,
+        }
+        for row in rows
+    ]
 
 @router.get("/debug/{order_id}")
-def debug_order(order_id: int, db: Session = Depends(get_db)):
+def debug_order(
+    order_id: int,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     """Debug endpoint to check order data and relationships"""
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = db.query(Order).filter(Order.id == order_id, Order.store_id == store.id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     
@@ -238,10 +562,21 @@ def debug_order(order_id: int, db: Session = Depends(get_db)):
     }
 
 @router.delete("/delete/{order_id}")
-def delete_order(order_id: int, db: Session = Depends(get_db)):
-    order = db.query(Order).filter(Order.id == order_id).first()
+def delete_order(
+    order_id: int,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    order = db.query(Order).filter(Order.id == order_id, Order.store_id == store.id).first()
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    # Deleting a live order voids it: its stock goes back and it leaves the shift totals
+    if order.status != "cancelled":
+        record_status_change(db, open_shift_id(db, store.id), order, order.status, "cancelled")
+        restore_stock(db, ingredient_requirements(db, product_quantities(order.items)))
+    store_id, created_at = order.store_id, order.created_at
     db.delete(order)
     db.commit()
+    report_cache.order_written(store_id, created_at)
     return {"message": "Order deleted successfully"} 
\ No newline at end of file
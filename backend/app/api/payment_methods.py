@@ -1,18 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal
 from ..config.database import get_db
 from ..models.models import PaymentMethod, User
-from ..utils.auth import get_current_user
+from ..utils.auth import get_current_user, get_current_store, require_admin
+from ..utils.admission import HeldSlot, admit, hold
+from ..utils.bulk import export_response, import_upload
+from ..utils.stores import StoreInfo, payment_methods_in
+from ..utils.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
 @router.get("/", response_model=List[dict])
 async def get_payment_methods(
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    payment_methods = db.query(PaymentMethod).filter(PaymentMethod.is_active == True).all()
+    payment_methods = db.query(PaymentMethod).filter(
+        PaymentMethod.is_active == True, payment_methods_in(store.id)
+    ).all()
     return [
         {
             "id": method.id,
@@ -28,6 +35,8 @@ async def create_payment_method(
     payment_method_code: str,
     name: str,
     description: str = None,
+    this_store_only: bool = False,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -39,7 +48,8 @@ async def create_payment_method(
     payment_method = PaymentMethod(
         payment_method_code=payment_method_code,
         name=name,
-        description=description
+        description=description,
+        store_id=store.id if this_store_only else None
     )
     db.add(payment_method)
     db.commit()
@@ -52,10 +62,11 @@ async def update_payment_method(
     payment_method_code: str,
     name: str,
     description: str = None,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    payment_method = db.query(PaymentMethod).filter(PaymentMethod.id == method_id).first()
+    payment_method = db.query(PaymentMethod).filter(PaymentMethod.id == method_id, payment_methods_in(store.id)).first()
     if not payment_method:
         raise HTTPException(status_code=404, detail="Payment method not found")
     
@@ -76,13 +87,34 @@ async def update_payment_method(
 @router.delete("/{method_id}")
 async def delete_payment_method(
     method_id: int,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    payment_method = db.query(PaymentMethod).filter(PaymentMethod.id == method_id).first()
+    payment_method = db.query(PaymentMethod).filter(PaymentMethod.id == method_id, payment_methods_in(store.id)).first()
     if not payment_method:
         raise HTTPException(status_code=404, detail="Payment method not found")
     
     payment_method.is_active = False
     db.commit()
     return {"message": "Payment method deleted successfully"}
+
+@router.post("/import", dependencies=[Depends(admit("bulk"))])
+def import_payment_methods(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    # CSV or JSON; nothing is written unless every row is valid
+    return import_upload(db, "payment_methods", file, store.id, current_user.id, dry_run, current_user.is_owner)
+
+@router.get("/export")
+def export_payment_methods(
+    format: Literal["csv", "json"] = "csv",
+    store: StoreInfo = Depends(get_current_store),
+    current_user: User = Depends(require_admin),
+    slot: HeldSlot = Depends(hold("bulk"))
+):
+    return export_response("payment_methods", store.id, format, slot)
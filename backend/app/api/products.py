@@ -1,19 +1,51 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from decimal import Decimal
+from fastapi import APIRouter, Depends, HTTPException, status, Query, File, UploadFile
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session, joinedload
+from typing import List, Literal, Optional
 from ..config.database import get_db
-from ..models.models import Product, User
-from ..utils.auth import get_current_user
+from ..models.models import Product, ProductPrice, User
+from ..utils.auth import get_current_user, get_current_store, require_admin
+from ..utils.admission import HeldSlot, admit, hold
+from ..utils.bulk import export_response, import_upload
+from ..utils.images import image_urls
+from ..utils.prep_queue import STATIONS
+from ..utils.pricing import resolve_price, schedule_price, unschedule_price
+from ..utils.stores import StoreInfo
+from ..utils.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+class PriceChange(BaseModel):
+    price: Decimal = Field(..., ge=0, max_digits=10, decimal_places=2)
+    # Naive UTC like every other timestamp; omitted means right away
+    effective_from: Optional[datetime] = None
+
+def _store_product(db: Session, store: StoreInfo, product_id: int) -> Product:
+    product = db.query(Product).filter(Product.id == product_id, Product.store_id == store.id).first()
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
+
+def _check_name_free(db: Session, store: StoreInfo, name: str, product_id: int = None):
+    query = db.query(Product.id).filter(Product.store_id == store.id, Product.name == name)
+    if product_id is not None:
+        query = query.filter(Product.id != product_id)
+    if query.first():
+        raise HTTPException(status_code=400, detail="A product with this name already exists in this store")
 
 @router.get("", response_model=List[dict])
 async def get_products(
     category_id: int = None,
+    image_size: int = Query(256, ge=1, description="Edge in pixels the till draws images at"),
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Product).filter(Product.is_active == 1)
+    query = db.query(Product).options(joinedload(Product.image)).filter(
+        Product.store_id == store.id, Product.is_active == 1
+    )
     if category_id:
         query = query.filter(Product.category_id == category_id)
     
@@ -23,9 +55,10 @@ async def get_products(
             "id": product.id,
             "name": product.name,
             "description": product.description,
-            "price": product.price,
+            "price": resolve_price(db, product),
             "category_id": product.category_id,
-            "image_url": product.image_url
+            **image_urls(product.image, product.image_url, image_size),
+            "station": product.station
         }
         for product in products
     ]
@@ -37,17 +70,28 @@ async def create_product(
     price: float,
     category_id: int,
     image_url: str = None,
+    image_id: int = None,
+    station: str = "espresso",
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    if station not in STATIONS:
+        raise HTTPException(status_code=400, detail="Invalid station")
+    _check_name_free(db, store, name)
     product = Product(
         name=name,
         description=description,
         price=price,
         category_id=category_id,
-        image_url=image_url
+        image_url=image_url,
+        image_id=image_id,
+        station=station,
+        store_id=store.id
     )
     db.add(product)
+    db.flush()
+    schedule_price(db, product, product.price, datetime.utcnow(), current_user.id)
     db.commit()
     db.refresh(product)
     return {"message": "Product created successfully", "id": product.id}
@@ -60,31 +104,115 @@ async def update_product(
     price: float,
     category_id: int,
     image_url: str = None,
+    image_id: int = None,
+    station: str = None,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+    product = _store_product(db, store, product_id)
+    if station is not None and station not in STATIONS:
+        raise HTTPException(status_code=400, detail="Invalid station")
+    _check_name_free(db, store, name, product.id)
     
     product.name = name
     product.description = description
-    product.price = price
+    # A new price is a schedule entry starting now, so the old one stays on record
+    if Decimal(str(price)) != resolve_price(db, product):
+        schedule_price(db, product, Decimal(str(price)), datetime.utcnow(), current_user.id)
     product.category_id = category_id
     product.image_url = image_url
+    product.image_id = image_id
+    if station is not None:
+        product.station = station
     db.commit()
     return {"message": "Product updated successfully"}
 
 @router.delete("/{product_id}")
 async def delete_product(
     product_id: int,
+    store: StoreInfo = Depends(get_current_store),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
+    product = _store_product(db, store, product_id)
     
     product.is_active = 0
     db.commit()
-    return {"message": "Product deleted successfully"} 
\ No newline at end of file
+    return {"message": "Product deleted successfully"} 
+
+@router.get("/{product_id}/prices")
+async def get_product_prices(
+    product_id: int,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    _store_product(db, store, product_id)
+    entries = db.query(ProductPrice).filter(
+        ProductPrice.product_id == product_id
+    ).order_by(ProductPrice.effective_from).all()
+    return [
+        {
+            "id": entry.id,
+            "price": entry.price,
+            "effective_from": entry.effective_from,
+            "effective_to": entry.effective_to,
+            "created_by": entry.created_by
+        }
+        for entry in entries
+    ]
+
+@router.post("/{product_id}/prices")
+async def add_product_price(
+    product_id: int,
+    change: PriceChange,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    product = _store_product(db, store, product_id)
+    effective_from = change.effective_from or datetime.utcnow()
+    if effective_from.tzinfo is not None:
+        raise HTTPException(status_code=400, detail="effective_from must be a naive UTC timestamp")
+    entry = schedule_price(db, product, change.price, effective_from, current_user.id)
+    db.commit()
+    return {"message": "Price scheduled successfully", "id": entry.id}
+
+@router.delete("/{product_id}/prices/{price_id}")
+async def delete_product_price(
+    product_id: int,
+    price_id: int,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    product = _store_product(db, store, product_id)
+    entry = db.query(ProductPrice).filter(
+        ProductPrice.id == price_id, ProductPrice.product_id == product_id
+    ).first()
+    if not entry:
+        raise HTTPException(status_code=404, detail="Price not found")
+    unschedule_price(db, product, entry)
+    db.commit()
+    return {"message": "Price deleted successfully"}
+
+@router.post("/import", dependencies=[Depends(admit("bulk"))])
+def import_products(
+    file: UploadFile = File(...),
+    dry_run: bool = False,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    # CSV or JSON; nothing is written unless every row is valid
+    return import_upload(db, "products", file, store.id, current_user.id, dry_run)
+
+@router.get("/export")
+def export_products(
+    format: Literal["csv", "json"] = "csv",
+    store: StoreInfo = Depends(get_current_store),
+    current_user: User = Depends(require_admin),
+    slot: HeldSlot = Depends(hold("bulk"))
+):
+    return export_response("products", store.id, format, slot)
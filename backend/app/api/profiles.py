@@ -0,0 +1,54 @@
+import json
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+from ..models.models import User
+from ..utils.auth import require_admin
+from ..utils.profiling import ProfiledRoute, list_profile_ids, profile_path
+
+router = APIRouter(route_class=ProfiledRoute)
+
+def _load(profile_id: str) -> dict:
+    path = profile_path(profile_id, ".json")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(path) as f:
+        return json.load(f)
+
+def _summaries(limit: int):
+    summaries = []
+    for profile_id in list_profile_ids()[:limit]:
+        try:
+            document = _load(profile_id)
+        except HTTPException:
+            # Pruned by another worker meanwhile
+            continue
+        document.pop("sql", None)
+        document.pop("top_functions", None)
+        summaries.append(document)
+    return summaries
+
+@router.get("")
+async def get_profiles(
+    limit: int = 50,
+    current_user: User = Depends(require_admin)
+):
+    return await run_in_threadpool(_summaries, limit)
+
+@router.get("/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    current_user: User = Depends(require_admin)
+):
+    return await run_in_threadpool(_load, profile_id)
+
+@router.get("/{profile_id}/download")
+async def download_profile(
+    profile_id: str,
+    current_user: User = Depends(require_admin)
+):
+    # cProfile output of the endpoint, for pstats or snakeviz
+    path = profile_path(profile_id, ".prof")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
@@ -0,0 +1,128 @@
+from datetime import datetime, time
+from decimal import Decimal
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field, model_validator
+from sqlalchemy.orm import Session
+from ..config.database import get_db
+from ..models.models import Promotion, User
+from ..utils.auth import require_admin
+from ..utils.promotions import promotions_changed
+from ..utils.profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+class PromotionIn(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    kind: Literal["percent", "amount", "buy_x_get_y"]
+    value: Decimal = Field(Decimal("0"), ge=0, max_digits=10, decimal_places=2)
+    buy_quantity: Optional[int] = Field(None, ge=1)
+    get_quantity: Optional[int] = Field(None, ge=1)
+    product_id: Optional[int] = None
+    category_id: Optional[int] = None
+    customer_id: Optional[int] = None
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    # Shop-local time of day; both omitted means all day
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+    # 0 = Monday
+    days: List[int] = Field(default_factory=lambda: list(range(7)), min_length=1)
+    is_active: bool = True
+
+    @model_validator(mode="after")
+    def consistent(self):
+        if self.kind == "percent" and not 0 < self.value <= 100:
+            raise ValueError("A percent promotion needs a value between 0 and 100")
+        if self.kind == "amount" and self.value <= 0:
+            raise ValueError("An amount promotion needs a positive value")
+        if self.kind == "buy_x_get_y" and not (self.buy_quantity and self.get_quantity):
+            raise ValueError("buy_x_get_y needs buy_quantity and get_quantity")
+        if self.product_id is not None and self.category_id is not None:
+            raise ValueError("Scope a promotion to a product or a category, not both")
+        if (self.start_time is None) != (self.end_time is None):
+            raise ValueError("start_time and end_time go together")
+        if self.starts_at and self.ends_at and self.ends_at <= self.starts_at:
+            raise ValueError("ends_at must be after starts_at")
+        if any(day not in range(7) for day in self.days):
+            raise ValueError("days are 0 (Monday) to 6 (Sunday)")
+        return self
+
+    def columns(self) -> dict:
+        values = self.model_dump(exclude={"days"})
+        values["days_of_week"] = sum(1 << day for day in set(self.days))
+        return values
+
+def _promotion_dict(promotion: Promotion) -> dict:
+    return {
+        "id": promotion.id,
+        "name": promotion.name,
+        "kind": promotion.kind,
+        "value": promotion.value,
+        "buy_quantity": promotion.buy_quantity,
+        "get_quantity": promotion.get_quantity,
+        "product_id": promotion.product_id,
+        "category_id": promotion.category_id,
+        "customer_id": promotion.customer_id,
+        "starts_at": promotion.starts_at,
+        "ends_at": promotion.ends_at,
+        "start_time": promotion.start_time,
+        "end_time": promotion.end_time,
+        "days": [day for day in range(7) if promotion.days_of_week >> day & 1],
+        "is_active": promotion.is_active
+    }
+
+@router.get("")
+async def get_promotions(
+    include_inactive: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    query = db.query(Promotion)
+    if not include_inactive:
+        query = query.filter(Promotion.is_active == True)
+    return [_promotion_dict(promotion) for promotion in query.order_by(Promotion.id).all()]
+
+@router.post("")
+async def create_promotion(
+    promotion_data: PromotionIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    promotion = Promotion(**promotion_data.columns())
+    db.add(promotion)
+    db.flush()
+    promotions_changed(db)
+    db.commit()
+    return {"message": "Promotion created successfully", "id": promotion.id}
+
+@router.put("/{promotion_id}")
+async def update_promotion(
+    promotion_id: int,
+    promotion_data: PromotionIn,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    promotion = db.query(Promotion).filter(Promotion.id == promotion_id).first()
+    if not promotion:
+        raise HTTPException(status_code=404, detail="Promotion not found")
+    for key, value in promotion_data.columns().items():
+        setattr(promotion, key, value)
+    promotions_changed(db)
+    db.commit()
+    return {"message": "Promotion updated successfully"}
+
+@router.delete("/{promotion_id}")
+async def delete_promotion(
+    promotion_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    promotion = db.query(Promotion).filter(Promotion.id == promotion_id).first()
+    if not promotion:
+        raise HTTPException(status_code=404, detail="Promotion not found")
+    # Order lines keep pointing at it, so it is only switched off
+    promotion.is_active = False
+    promotions_changed(db)
+    db.commit()
+    return {"message": "Promotion deleted successfully"}
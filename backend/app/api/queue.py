@@ -0,0 +1,54 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from ..config.database import get_db
+from ..models.models import Order, OrderItem, User
+from ..utils.auth import require_seller, get_current_store
+from ..utils.prep_queue import queued_items, prep_estimates, build_plan, record_completion
+from ..utils.stores import StoreInfo
+from ..utils.profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+@router.get("")
+def get_queue(
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_seller)
+):
+    return build_plan(queued_items(db, store.id), prep_estimates(db))
+
+@router.post("/items/{item_id}/done")
+def mark_item_done(
+    item_id: int,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_seller)
+):
+    item = db.query(OrderItem).join(Order, Order.id == OrderItem.order_id).filter(
+        OrderItem.id == item_id, Order.store_id == store.id
+    ).first()
+    if not item:
+        raise HTTPException(status_code=404, detail="Order item not found")
+
+    # Conditional so two baristas tapping the same line count it once
+    prepared_at = datetime.utcnow()
+    result = db.execute(
+        update(OrderItem)
+        .where(OrderItem.id == item_id, OrderItem.prepared_at.is_(None), OrderItem.station.isnot(None))
+        .values(prepared_at=prepared_at)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(status_code=409, detail="Item is not waiting in the queue")
+
+    order = db.query(Order).filter(Order.id == item.order_id).first()
+    record_completion(db, item, order.created_at, prepared_at)
+    remaining = db.query(OrderItem.id).filter(
+        OrderItem.order_id == order.id,
+        OrderItem.station.isnot(None),
+        OrderItem.prepared_at.is_(None)
+    ).count()
+    db.commit()
+    return {"message": "Item marked as done", "order_id": order.id, "order_ready": remaining == 0}
@@ -1,111 +1,375 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, cast, Date
-from datetime import datetime, timedelta
+from sqlalchemy import func, case, select
+from datetime import date, datetime, timedelta
+from decimal import Decimal
 from typing import List
 from ..config.database import get_db
-from ..models.models import Order, OrderItem, User
-from ..utils.auth import get_current_user, require_admin
+from ..models.models import Product, ProductAssociation, Promotion, User
+from ..utils.auth import get_current_user, get_current_store, require_admin, require_owner
+from ..config.settings import settings
+from ..utils.admission import admit
+from ..utils.archive import orders_between, order_items_between
+from ..utils.report_cache import report_cache
+from ..utils.shop_settings import ShopSettings, get_shop_settings
+from ..utils.stores import StoreInfo, store_cache
+from ..utils.profiling import ProfiledRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
 
-@router.get("/overview")
-async def get_overview_report(
+@router.get("/overview", dependencies=[Depends(admit("bulk"))])
+def get_overview_report(
     current_user: User = Depends(require_admin),
+    store: StoreInfo = Depends(get_current_store),
+    shop: ShopSettings = Depends(get_shop_settings),
     db: Session = Depends(get_db)
 ):
-    today = datetime.now().date()
+    # Business day in the shop's timezone, starting at the report cut-off hour
+    today = shop.business_date()
     
-    # Get total orders and revenue for today
-    result = db.query(
-        func.count(Order.id).label('total_orders'),
-        func.sum(Order.total_amount).label('total_revenue')
-    ).filter(
-        cast(Order.created_at, Date) == today
-    ).first()
-    
-    return {
-        "total_orders": result.total_orders or 0,
-        "total_revenue": float(result.total_revenue or 0)
-    }
+    start, end = shop.day_start(today), shop.day_start(today + timedelta(days=1))
+
+    def compute():
+        # Get total orders and revenue for today; cancelled orders are not sales
+        orders = orders_between(db, start, end, store.id)
+        sold = orders.c.status != "cancelled"
+        result = db.query(
+            func.sum(case((sold, 1), else_=0)).label('total_orders'),
+            func.sum(case((sold, orders.c.total_amount), else_=0)).label('total_revenue'),
+            func.sum(case((sold, 0), else_=1)).label('cancelled_orders')
+        ).first()
 
-@router.get("/product-revenue")
-async def get_product_revenue_report(
+        return {
+            "total_orders": int(result.total_orders or 0),
+            "total_revenue": float(result.total_revenue or 0),
+            "cancelled_orders": int(result.cancelled_orders or 0)
+        }
+
+    return report_cache.get("overview", store.id, start, end, compute)
+
+@router.get("/product-revenue", dependencies=[Depends(admit("bulk"))])
+def get_product_revenue_report(
     current_user: User = Depends(require_admin),
+    store: StoreInfo = Depends(get_current_store),
+    shop: ShopSettings = Depends(get_shop_settings),
     db: Session = Depends(get_db)
 ):
-    today = datetime.now().date()
+    # Business day in the shop's timezone, starting at the report cut-off hour
+    today = shop.business_date()
     
-    # Get revenue by product for today
-    results = db.query(
-        OrderItem.product_name,
-        func.sum(OrderItem.quantity).label('quantity'),
-        func.sum(OrderItem.price).label('total_price')
-    ).join(
-        Order, Order.id == OrderItem.order_id
+    start, end = shop.day_start(today), shop.day_start(today + timedelta(days=1))
+
+    def compute():
+        # Get revenue by product for today
+        items = order_items_between(db, start, end, store.id)
+        results = db.query(
+            items.c.product_name,
+            func.sum(items.c.quantity).label('quantity'),
+            func.sum(items.c.price).label('total_price')
+        ).filter(
+            items.c.status != "cancelled"
+        ).group_by(
+            items.c.product_name
+        ).all()
+
+        return [
+            {
+                "product_name": r.product_name,
+                "quantity": r.quantity,
+                "total_price": float(r.total_price)
+            }
+            for r in results
+        ]
+
+    return report_cache.get("product-revenue", store.id, start, end, compute)
+
+@router.get("/promotions", dependencies=[Depends(admit("bulk"))])
+def get_promotion_report(
+    days: int = 7,
+    current_user: User = Depends(require_admin),
+    store: StoreInfo = Depends(get_current_store),
+    shop: ShopSettings = Depends(get_shop_settings),
+    db: Session = Depends(get_db)
+):
+    if not 1 <= days <= 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+    # Discounts given over the last `days` business days, today included
+    today = shop.business_date()
+    start, end = shop.day_start(today - timedelta(days=days - 1)), shop.day_start(today + timedelta(days=1))
+
+    def compute():
+        items = order_items_between(db, start, end, store.id)
+        results = db.query(
+            items.c.promotion_id,
+            Promotion.name,
+            func.count().label('lines'),
+            func.sum(items.c.quantity).label('quantity'),
+            func.sum(items.c.discount_amount).label('discount_total'),
+            func.sum(items.c.price).label('revenue')
+        ).join(
+            Promotion, Promotion.id == items.c.promotion_id
+        ).filter(
+            items.c.status != "cancelled"
+        ).group_by(
+            items.c.promotion_id, Promotion.name
+        ).all()
+
+        return [
+            {
+                "promotion_id": r.promotion_id,
+                "name": r.name,
+                "lines": r.lines,
+                "quantity": r.quantity,
+                "discount_total": float(r.discount_total),
+                "revenue": float(r.revenue)
+            }
+            for r in results
+        ]
+
+    return report_cache.get("promotions", store.id, start, end, compute)
+
+@router.get("/frequently-bought-together", dependencies=[Depends(admit("bulk"))])
+def get_frequently_bought_together(
+    product_id: int,
+    limit: int = 5,
+    current_user: User = Depends(get_current_user),
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db)
+):
+    # Precomputed nightly by scripts/market_basket.py
+    results = db.query(ProductAssociation, Product.name).join(
+        Product, Product.id == ProductAssociation.associated_product_id
     ).filter(
-        cast(Order.created_at, Date) == today
-    ).group_by(
-        OrderItem.product_name
-    ).all()
-    
+        ProductAssociation.product_id == product_id,
+        Product.store_id == store.id,
+        Product.is_active == 1
+    ).order_by(ProductAssociation.position).limit(max(1, min(limit, 50))).all()
+
     return [
         {
-            "product_name": r.product_name,
-            "quantity": r.quantity,
-            "total_price": float(r.total_price)
+            "product_id": association.associated_product_id,
+            "product_name": name,
+            "orders": association.orders,
+            "support": association.support,
+            "confidence": association.confidence,
+            "lift": association.lift,
+            "computed_at": association.computed_at
         }
-        for r in results
+        for association, name in results
+    ]
+
+@router.get("/forecast", dependencies=[Depends(admit("bulk", route_limit=1))])
+def get_forecast(
+    day: date = Query(None, alias="date"),
+    current_user: User = Depends(get_current_user),
+    store: StoreInfo = Depends(get_current_store),
+    shop: ShopSettings = Depends(get_shop_settings),
+    db: Session = Depends(get_db)
+):
+    # numpy is only needed here, so workers that never forecast skip loading it
+    from ..utils.forecast import current_model
+
+    today = shop.business_date()
+    day = day or today
+    if not today <= day <= today + timedelta(days=14):
+        raise HTTPException(status_code=400, detail="Forecasts cover today and the next 14 days")
+
+    model = current_model(db, shop)
+    hourly = model.predict(day)
+    names = dict(db.query(Product.id, Product.name).filter(
+        Product.store_id == store.id, Product.is_active == 1
+    ).all())
+    products = [
+        {
+            "product_id": int(product_id),
+            "product_name": names[int(product_id)],
+            "expected_quantity": round(float(hourly[i].sum()), 1),
+            "hourly": [round(float(q), 2) for q in hourly[i]]
+        }
+        for i, product_id in enumerate(model.product_ids)
+        if int(product_id) in names
     ]
+    products.sort(key=lambda p: p["expected_quantity"], reverse=True)
+    return {
+        "date": day,
+        "trained_through": model.trained_through,
+        "products": products
+    }
 
-@router.get("/daily-revenue")
-async def get_daily_revenue_report(
+@router.get("/stores", dependencies=[Depends(admit("bulk"))])
+def get_store_comparison_report(
+    days: int = 1,
+    current_user: User = Depends(require_owner),
+    shop: ShopSettings = Depends(get_shop_settings),
+    db: Session = Depends(get_db)
+):
+    # Consolidated across stores, so only for owners
+    if not 1 <= days <= 366:
+        raise HTTPException(status_code=400, detail="days must be between 1 and 366")
+
+    today = shop.business_date()
+    start, end = shop.day_start(today - timedelta(days=days - 1)), shop.day_start(today + timedelta(days=1))
+
+    def compute():
+        orders = orders_between(db, start, end)
+        results = dict((r.store_id, r) for r in db.query(
+            orders.c.store_id,
+            func.count(orders.c.id).label('total_orders'),
+            func.sum(orders.c.total_amount).label('total_revenue')
+        ).filter(orders.c.status != "cancelled").group_by(orders.c.store_id).all())
+
+        stores = [
+            {
+                "store_id": store.id,
+                "store_name": store.name,
+                "total_orders": results[store.id].total_orders if store.id in results else 0,
+                "total_revenue": float(results[store.id].total_revenue or 0) if store.id in results else 0.0
+            }
+            for store in sorted(store_cache.get(db).values(), key=lambda store: store.id)
+        ]
+        return {
+            "stores": stores,
+            "total_orders": sum(store["total_orders"] for store in stores),
+            "total_revenue": sum(store["total_revenue"] for store in stores)
+        }
+
+    return report_cache.get("stores", None, start, end, compute)
+
+def _seller_totals(db: Session, start: datetime, end: datetime, store_id: int) -> dict:
+    # One grouped pass over the period's orders; item counts join in per order
+    # like order history does
+    orders = orders_between(db, start, end, store_id)
+    items = order_items_between(db, start, end, store_id)
+    quantities = select(
+        items.c.order_id,
+        func.sum(items.c.quantity).label('quantity')
+    ).group_by(items.c.order_id).subquery()
+    sold = orders.c.status != "cancelled"
+    results = db.query(
+        orders.c.user_id,
+        func.sum(case((sold, 1), else_=0)).label('orders'),
+        func.sum(case((sold, orders.c.total_amount), else_=0)).label('revenue'),
+        func.sum(case((sold, quantities.c.quantity), else_=0)).label('items'),
+        func.sum(case((sold, 0), else_=1)).label('cancelled')
+    ).outerjoin(
+        quantities, quantities.c.order_id == orders.c.id
+    ).group_by(orders.c.user_id).all()
+
+    return {
+        r.user_id: (int(r.orders or 0), Decimal(r.revenue or 0), int(r.items or 0), int(r.cancelled or 0))
+        for r in results
+    }
+
+@router.get("/sellers", dependencies=[Depends(admit("bulk"))])
+def get_seller_report(
+    start_date: date = None,
+    end_date: date = None,
     current_user: User = Depends(require_admin),
+    store: StoreInfo = Depends(get_current_store),
+    shop: ShopSettings = Depends(get_shop_settings),
     db: Session = Depends(get_db)
 ):
-    # Get last 7 days
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=6)
-    
-    # Get daily revenue for last 7 days
+    # Business days from start_date through end_date, both default today
+    today = shop.business_date()
+    end_date = end_date or today
+    start_date = start_date or end_date
+    if not start_date <= end_date <= today:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    if (end_date - start_date).days >= 366:
+        raise HTTPException(status_code=400, detail="Date range must not exceed 366 days")
+
+    # Finished days are cached for longer than today, which is still selling
+    parts = []
+    closed_end = min(end_date, today - timedelta(days=1))
+    if start_date <= closed_end:
+        start, end = shop.day_start(start_date), shop.day_start(closed_end + timedelta(days=1))
+        parts.append(report_cache.get(
+            "sellers", store.id, start, end, lambda: _seller_totals(db, start, end, store.id),
+            ttl_seconds=settings.report_closed_day_ttl_seconds
+        ))
+    if end_date == today:
+        start, end = shop.day_start(today), shop.day_start(today + timedelta(days=1))
+        parts.append(report_cache.get("sellers", store.id, start, end, lambda: _seller_totals(db, start, end, store.id)))
+
+    totals = {}
+    for part in parts:
+        for user_id, values in part.items():
+            current = totals.get(user_id, (0, Decimal(0), 0, 0))
+            totals[user_id] = tuple(a + b for a, b in zip(current, values))
+
+    names = dict(db.query(User.id, User.username).filter(User.id.in_(totals)).all()) if totals else {}
+    sellers = [
+        {
+            "user_id": user_id,
+            "username": names.get(user_id),
+            "orders": orders,
+            "revenue": float(revenue),
+            "average_ticket": round(float(revenue) / orders, 2) if orders else 0.0,
+            "items_per_order": round(items / orders, 2) if orders else 0.0,
+            "cancelled_orders": cancelled,
+            "cancellation_rate": round(cancelled / (orders + cancelled), 4)
+        }
+        for user_id, (orders, revenue, items, cancelled) in totals.items()
+    ]
+    sellers.sort(key=lambda seller: (-seller["revenue"], seller["user_id"]))
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "sellers": sellers
+    }
+
+def _revenue_by_period(db: Session, store_id: int, starts: List[datetime], end: datetime) -> List[float]:
+    """Revenue of each period [starts[i], starts[i + 1]), the last one ending at end."""
+    orders = orders_between(db, starts[0], end, store_id)
+    bounds = starts[1:] + [end]
+    # Periods are counted in SQL by which boundary each order falls before
+    periods = select(
+        case(*[(orders.c.created_at < bound, i) for i, bound in enumerate(bounds)]).label('period'),
+        orders.c.total_amount
+    ).where(orders.c.status != "cancelled").subquery()
     results = db.query(
-        cast(Order.created_at, Date).label('date'),
-        func.sum(Order.total_amount).label('revenue')
-    ).filter(
-        cast(Order.created_at, Date) >= start_date,
-        cast(Order.created_at, Date) <= end_date
-    ).group_by(
-        cast(Order.created_at, Date)
-    ).all()
-    
-    # Format dates and ensure all days are included
-    daily_data = []
-    current_date = start_date
-    while current_date <= end_date:
-        # Find revenue for current date
-        revenue = next(
-            (float(r.revenue) for r in results if r.date == current_date),
-            0
-        )
-        
+        periods.c.period,
+        func.sum(periods.c.total_amount).label('revenue')
+    ).group_by(periods.c.period).all()
+
+    revenue = [0.0] * len(starts)
+    for r in results:
+        revenue[r.period] = float(r.revenue or 0)
+    return revenue
+
+@router.get("/daily-revenue", dependencies=[Depends(admit("bulk"))])
+def get_daily_revenue_report(
+    current_user: User = Depends(require_admin),
+    store: StoreInfo = Depends(get_current_store),
+    shop: ShopSettings = Depends(get_shop_settings),
+    db: Session = Depends(get_db)
+):
+    # Last 7 business days in the shop's timezone, today included
+    end_date = shop.business_date()
+    days = [end_date - timedelta(days=n) for n in range(6, -1, -1)]
+    start, end = shop.day_start(days[0]), shop.day_start(end_date + timedelta(days=1))
+
+    def compute():
+        revenue = _revenue_by_period(db, store.id, [shop.day_start(day) for day in days], end)
         # Format date as "DD/MM - Day"
-        formatted_date = current_date.strftime("%d/%m - %A")
-        
-        daily_data.append({
-            "date": formatted_date,
-            "revenue": revenue
-        })
-        
-        current_date += timedelta(days=1)
-    
-    return daily_data 
+        return [
+            {
+                "date": day.strftime("%d/%m - %A"),
+                "revenue": revenue[i]
+            }
+            for i, day in enumerate(days)
+        ]
+
+    return report_cache.get("daily-revenue", store.id, start, end, compute)
 
-@router.get("/monthly-revenue")
-async def get_monthly_revenue_report(
+@router.get("/monthly-revenue", dependencies=[Depends(admit("bulk"))])
+def get_monthly_revenue_report(
     current_user: User = Depends(require_admin),
+    store: StoreInfo = Depends(get_current_store),
+    shop: ShopSettings = Depends(get_shop_settings),
     db: Session = Depends(get_db)
 ):
-    today = datetime.now().date()
+    today = shop.business_date()
     # Get the first day of the current month
     first_day_this_month = today.replace(day=1)
     # Get the first day of the previous month
@@ -118,37 +382,19 @@ async def get_monthly_revenue_report(
     else:
         first_day_next_month = first_day_this_month.replace(month=first_day_this_month.month + 1, day=1)
 
-    # For query, get all orders from first_day_2_months_ago to today
-    results = db.query(
-        func.extract('year', Order.created_at).label('year'),
-        func.extract('month', Order.created_at).label('month'),
-        func.sum(Order.total_amount).label('revenue')
-    ).filter(
-        cast(Order.created_at, Date) >= first_day_2_months_ago,
-        cast(Order.created_at, Date) <= today
-    ).group_by(
-        func.extract('year', Order.created_at),
-        func.extract('month', Order.created_at)
-    ).order_by(
-        func.extract('year', Order.created_at),
-        func.extract('month', Order.created_at)
-    ).all()
-
-    # Build a list for the last 3 months, current month, and next month
-    months = [first_day_2_months_ago, first_day_last_month, first_day_this_month, first_day_next_month]
-
-    monthly_data = []
-    for month_date in months:
-        year = month_date.year
-        month = month_date.month
-        # Find revenue for this month
-        revenue = next((float(r.revenue) for r in results if int(r.year) == year and int(r.month) == month), 0)
-        # For next month (future), always 0
-        if month_date == first_day_next_month:
-            revenue = 0
-        monthly_data.append({
-            "month": f"{month:02d}/{year}",
-            "revenue": revenue
-        })
-
-    return monthly_data 
\ No newline at end of file
+    # Months are made of business days, so each starts at its first day's cut-off
+    past_months = [first_day_2_months_ago, first_day_last_month, first_day_this_month]
+    start, end = shop.day_start(first_day_2_months_ago), shop.day_start(today + timedelta(days=1))
+
+    def compute():
+        revenue = _revenue_by_period(db, store.id, [shop.day_start(month) for month in past_months], end)
+        # The last 3 months, then next month, which is always 0
+        return [
+            {
+                "month": f"{month_date.month:02d}/{month_date.year}",
+                "revenue": revenue[i] if i < len(past_months) else 0
+            }
+            for i, month_date in enumerate(past_months + [first_day_next_month])
+        ]
+
+    return report_cache.get("monthly-revenue", store.id, start, end, compute)
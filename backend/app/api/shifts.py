@@ -0,0 +1,96 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List
+from ..config.database import get_db
+from ..models.models import Shift, Store, User
+from ..utils.auth import get_current_store, require_seller
+from ..utils.shifts import build_z_report
+from ..utils.stores import StoreInfo
+from ..utils.profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+def _shift_response(shift: Shift):
+    return {
+        "id": shift.id,
+        "store_id": shift.store_id,
+        "status": shift.status,
+        "opened_by": shift.opened_by,
+        "closed_by": shift.closed_by,
+        "opened_at": shift.opened_at,
+        "closed_at": shift.closed_at,
+    }
+
+@router.get("", response_model=List[dict])
+async def get_shifts(
+    limit: int = 30,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_seller)
+):
+    shifts = db.query(Shift).filter(Shift.store_id == store.id).order_by(Shift.opened_at.desc()).limit(limit).all()
+    return [_shift_response(shift) for shift in shifts]
+
+@router.post("/open")
+async def open_shift(
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_seller)
+):
+    # Lock the store row first so two requests cannot both find no open shift
+    db.query(Store.id).filter(Store.id == store.id).with_for_update().first()
+    if db.query(Shift.id).filter(Shift.store_id == store.id, Shift.status == "open").first():
+        raise HTTPException(status_code=400, detail="A shift is already open")
+
+    shift = Shift(store_id=store.id, status="open", opened_by=current_user.id, opened_at=datetime.utcnow())
+    db.add(shift)
+    db.commit()
+    db.refresh(shift)
+    return {"message": "Shift opened successfully", "id": shift.id}
+
+@router.get("/current")
+async def get_current_shift(
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_seller)
+):
+    shift = db.query(Shift).filter(Shift.store_id == store.id, Shift.status == "open").first()
+    if not shift:
+        raise HTTPException(status_code=404, detail="No open shift")
+    return build_z_report(db, shift)
+
+@router.post("/{shift_id}/close")
+async def close_shift(
+    shift_id: int,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_seller)
+):
+    # Lock the shift row so a concurrent close cannot freeze a second report,
+    # and so orders still holding it (see open_shift_id) commit first
+    shift = db.query(Shift).filter(Shift.id == shift_id, Shift.store_id == store.id).with_for_update().first()
+    if not shift:
+        raise HTTPException(status_code=404, detail="Shift not found")
+    if shift.status != "open":
+        raise HTTPException(status_code=400, detail="Shift is already closed")
+
+    shift.status = "closed"
+    shift.closed_by = current_user.id
+    shift.closed_at = datetime.utcnow()
+    shift.z_report = build_z_report(db, shift)
+    db.commit()
+    return shift.z_report
+
+@router.get("/{shift_id}/z-report")
+async def get_z_report(
+    shift_id: int,
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_seller)
+):
+    shift = db.query(Shift).filter(Shift.id == shift_id, Shift.store_id == store.id).first()
+    if not shift:
+        raise HTTPException(status_code=404, detail="Shift not found")
+    # Closed shifts return the report frozen at close time
+    return shift.z_report if shift.z_report is not None else build_z_report(db, shift)
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from ..config.database import get_db
+from ..models.models import User
+from ..utils.auth import get_current_user, require_admin
+from ..utils.profiling import ProfiledRoute
+from ..utils.shop_settings import (
+    ShopSettings, ShopSettingsUpdate, get_shop_settings, save_shop_settings, shop_settings_cache
+)
+
+router = APIRouter(route_class=ProfiledRoute)
+
+@router.get("")
+def read_settings(
+    shop: ShopSettings = Depends(get_shop_settings),
+    current_user: User = Depends(get_current_user)
+):
+    return shop.model_dump()
+
+@router.put("")
+def update_settings(
+    changes: ShopSettingsUpdate,
+    shop: ShopSettings = Depends(get_shop_settings),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    try:
+        updated = save_shop_settings(db, shop, changes.model_dump(exclude_none=True))
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=422,
+            detail=[{"loc": list(error["loc"]), "msg": error["msg"]} for error in e.errors()]
+        )
+    db.commit()
+    shop_settings_cache.invalidate()
+    return updated.model_dump()
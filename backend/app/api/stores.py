@@ -0,0 +1,63 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+from ..config.database import get_db
+from ..models.models import Store, User
+from ..utils.auth import get_current_user, require_owner
+from ..utils.stores import stores_changed, store_cache
+from ..utils.profiling import ProfiledRoute
+
+class StoreCreate(BaseModel):
+    code: str = Field(..., min_length=1, max_length=20)
+    name: str = Field(..., min_length=1, max_length=100)
+
+class StoreUpdate(BaseModel):
+    name: str = Field(None, min_length=1, max_length=100)
+    is_active: bool = None
+
+router = APIRouter(route_class=ProfiledRoute)
+
+@router.get("")
+async def get_stores(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    stores = sorted(store_cache.get(db).values(), key=lambda store: store.id)
+    return [
+        store._asdict()
+        for store in stores
+        if store.is_active and (current_user.is_owner or current_user.store_id == store.id)
+    ]
+
+@router.post("")
+async def create_store(
+    store_data: StoreCreate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_owner)
+):
+    if db.query(Store.id).filter(Store.code == store_data.code).first():
+        raise HTTPException(status_code=400, detail="Store code already exists")
+    store = Store(code=store_data.code, name=store_data.name)
+    db.add(store)
+    db.flush()
+    stores_changed(db)
+    db.commit()
+    return {"message": "Store created successfully", "id": store.id}
+
+@router.put("/{store_id}")
+async def update_store(
+    store_id: int,
+    store_data: StoreUpdate,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_owner)
+):
+    store = db.query(Store).filter(Store.id == store_id).first()
+    if not store:
+        raise HTTPException(status_code=404, detail="Store not found")
+    if store_data.name is not None:
+        store.name = store_data.name
+    if store_data.is_active is not None:
+        store.is_active = store_data.is_active
+    stores_changed(db)
+    db.commit()
+    return {"message": "Store updated successfully"}
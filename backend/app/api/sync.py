@@ -0,0 +1,130 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.orm import Session, joinedload
+from ..config.database import get_db
+from ..config.settings import settings
+from ..models.models import DEFAULT_STORE_ID, Category, Product, ProductPrice, PaymentMethod, Customer, User
+from ..utils.admission import admit
+from ..utils.auth import get_current_user, get_current_store
+from ..utils.images import image_urls
+from ..utils.pricing import resolve_price
+from ..utils.stores import StoreInfo, payment_methods_in
+from ..utils.profiling import ProfiledRoute
+
+router = APIRouter(route_class=ProfiledRoute)
+
+# Fields sent to the tills for each catalog table, matching the list endpoints
+CATALOG_TABLES = {
+    "categories": (Category, ("id", "name", "description", "image_url")),
+    "products": (Product, ("id", "name", "description", "price", "category_id", "image_url", "station")),
+    "payment_methods": (PaymentMethod, ("id", "payment_method_code", "name", "description")),
+    "customers": (Customer, ("id", "customer_name", "phone", "address", "city", "sort_order")),
+}
+
+def _in_store(model, store_id: int):
+    # Categories are shared by all stores
+    if model is Category:
+        return None
+    if model is PaymentMethod:
+        return payment_methods_in(store_id)
+    return model.store_id == store_id
+
+def _changed_at(model, upper: datetime):
+    """When a row last changed as the tills see it; the feed's sort key."""
+    if model is not Product:
+        return model.updated_at
+    # A scheduled price changes what tills must show once it takes effect,
+    # without touching the product row
+    started = select(func.max(ProductPrice.effective_from)).where(
+        ProductPrice.product_id == Product.id,
+        ProductPrice.effective_from <= upper
+    ).scalar_subquery()
+    return case((started > Product.updated_at, started), else_=Product.updated_at)
+
+def _encode_cursor(positions: dict, store_id: int) -> str:
+    payload = {
+        table: [updated_at.isoformat(), row_id]
+        for table, (updated_at, row_id) in positions.items()
+        if updated_at is not None
+    }
+    payload["store"] = store_id
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+def _decode_cursor(cursor: str, store_id: int) -> dict:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        # Positions of another store's feed would skip rows of this one
+        if payload.get("store", DEFAULT_STORE_ID) != store_id:
+            raise HTTPException(status_code=400, detail="Sync cursor belongs to another store")
+        return {
+            table: (datetime.fromisoformat(position[0]), int(position[1]))
+            for table, position in payload.items()
+            if table in CATALOG_TABLES
+        }
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid sync cursor")
+
+def _row_payload(db: Session, row, fields, image_size: int) -> dict:
+    payload = {field: getattr(row, field) for field in fields}
+    if "image_url" in fields:
+        payload.update(image_urls(row.image, row.image_url, image_size))
+    if isinstance(row, Product):
+        # The price checkout charges now, not the row's copy
+        payload["price"] = resolve_price(db, row)
+    return payload
+
+@router.get("/catalog", dependencies=[Depends(admit("standard"))])
+def get_catalog_changes(
+    since: str = Query(None, description="Cursor from the previous response; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=5000, description="Maximum rows per table"),
+    image_size: int = Query(256, ge=1, description="Edge in pixels the till draws images at"),
+    store: StoreInfo = Depends(get_current_store),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    positions = _decode_cursor(since, store.id) if since else {}
+    # Rows stamped in the last moments may belong to transactions that have
+    # not committed yet; leave them for the next poll so none are skipped
+    upper = datetime.utcnow() - timedelta(seconds=settings.sync_safety_lag_seconds)
+
+    changes = {}
+    has_more = False
+    for table, (model, fields) in CATALOG_TABLES.items():
+        changed_at = _changed_at(model, upper)
+        query = db.query(model, changed_at.label("changed_at"))
+        in_store = _in_store(model, store.id)
+        if in_store is not None:
+            query = query.filter(in_store)
+        query = query.filter(changed_at <= upper)
+        if "image_url" in fields:
+            query = query.options(joinedload(model.image))
+        position = positions.get(table)
+        if position:
+            updated_at, row_id = position
+            # Served by the (store_id, updated_at, id) index as a range scan,
+            # except products, whose few rows are sorted with their price changes
+            query = query.filter(or_(
+                changed_at > updated_at,
+                and_(changed_at == updated_at, model.id > row_id)
+            ))
+        rows = query.order_by(changed_at, model.id).limit(limit + 1).all()
+
+        if len(rows) > limit:
+            has_more = True
+            rows = rows[:limit]
+        if rows:
+            positions[table] = (rows[-1].changed_at, rows[-1][0].id)
+
+        changes[table] = {
+            "upserted": [_row_payload(db, row, fields, image_size) for row, _ in rows if row.is_active],
+            "deactivated": [row.id for row, _ in rows if not row.is_active],
+        }
+
+    return {
+        "cursor": _encode_cursor(positions, store.id),
+        "has_more": has_more,
+        "changes": changes,
+    }
@@ -1,13 +1,72 @@
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .api import auth, categories, products, orders, reports, payment_methods, customers
-from .models.models import Base
+from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+from .api import auth, categories, products, orders, reports, payment_methods, customers, health, shifts, sync, inventory, queue, images, shop_settings, promotions, stores, profiles
 from .config.database import engine
+from .config.settings import settings
+from .utils.lifecycle import order_writes, install_drain_handler, ping_database
+from .utils.images import shutdown_image_pool
+from .utils.compression import CompressionMiddleware
+from .utils.profiling import ProfilingMiddleware
+from .utils.jobs import job_workers
+
+logger = logging.getLogger(__name__)
+
+async def _warm_up(app: FastAPI):
+    # Open the first pooled connection off the event loop; until it succeeds
+    # /readyz reports 503 so the proxy keeps routing to the other workers
+    delay = 0.5
+    while True:
+        try:
+            await run_in_threadpool(ping_database)
+            break
+        except Exception as e:
+            logger.warning("Database not reachable during startup: %s", e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10)
+
+    app.state.startup_seconds = round(time.perf_counter() - _import_started, 3)
+    app.state.ready = True
+    if app.state.startup_seconds > settings.startup_target_seconds:
+        logger.warning(
+            "Worker ready in %.3fs, over the %.1fs startup target",
+            app.state.startup_seconds, settings.startup_target_seconds
+        )
+    else:
+        logger.info("Worker ready in %.3fs", app.state.startup_seconds)
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.ready = False
+    app.state.startup_seconds = None
+    # With gunicorn --preload the app is imported once in the master; drop any
+    # pooled connections inherited across fork without closing the parent's
+    engine.dispose(close=False)
+    app.state.migrations_current = False
+    install_drain_handler(order_writes)
+    warm_up = asyncio.create_task(_warm_up(app))
+    job_workers.start()
+    yield
+    app.state.ready = False
+    order_writes.draining = True
+    warm_up.cancel()
+    if not await order_writes.wait_idle(settings.drain_timeout_seconds):
+        logger.error("Shutting down with %d order(s) still in flight", order_writes.count)
+    shutdown_image_pool()
+    # A job cut off here is picked up again once its lease runs out
+    await run_in_threadpool(job_workers.stop)
+    engine.dispose()
 
-app = FastAPI(title="Coffee POS API")
+# Schema changes are applied by scripts/migrate.py before the service starts
+app = FastAPI(title="Coffee POS API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -18,13 +77,24 @@ app.add_middleware(
         "https://pos.huongbonmua.com",  # Production frontend (HTTPS)
     ],
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
     allow_headers=["*"],
     expose_headers=["Content-Length", "Content-Range"],
     max_age=1728000,  # 20 days
 )
 
+# Inside compression, so its time is not counted against the endpoint
+app.add_middleware(ProfilingMiddleware, sample_rate=settings.profile_sample_rate)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.compression_minimum_size,
+    gzip_level=settings.compression_gzip_level,
+    brotli_quality=settings.compression_brotli_quality,
+)
+
 # Include routers
+app.include_router(health.router, tags=["health"])
 app.include_router(auth.router, prefix="/api/auth", tags=["auth"])
 app.include_router(categories.router, prefix="/api/categories", tags=["categories"])
 app.include_router(products.router, prefix="/api/products", tags=["products"])
@@ -32,7 +102,19 @@ app.include_router(orders.router, prefix="/api/orders", tags=["orders"])
 app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
 app.include_router(payment_methods.router, prefix="/api/payment-methods", tags=["payment-methods"])
 app.include_router(customers.router, prefix="/api/customers", tags=["customers"])
+app.include_router(shifts.router, prefix="/api/shifts", tags=["shifts"])
+app.include_router(sync.router, prefix="/api/sync", tags=["sync"])
+app.include_router(inventory.router, prefix="/api/inventory", tags=["inventory"])
+app.include_router(queue.router, prefix="/api/queue", tags=["queue"])
+app.include_router(images.router, prefix="/api/images", tags=["images"])
+app.include_router(shop_settings.router, prefix="/api/settings", tags=["settings"])
+app.include_router(promotions.router, prefix="/api/promotions", tags=["promotions"])
+app.include_router(stores.router, prefix="/api/stores", tags=["stores"])
+app.include_router(profiles.router, prefix="/api/profiles", tags=["profiles"])
+
+# nginx serves /media itself in production; this covers development
+app.mount(settings.media_url, StaticFiles(directory=settings.media_root, check_dir=False), name="media")
 
 @app.get("/")
 async def root():
-    return {"message": "Welcome to Coffee POS API"} 
\ No newline at end of file
+    return {"message": "Welcome to Coffee POS API"}
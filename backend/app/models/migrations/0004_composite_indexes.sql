@@ -0,0 +1,31 @@
+-- Composite indexes for the hot order queries
+-- Reports and history filter orders by a created_at range and status
+CREATE INDEX idx_orders_created_at_status ON orders(created_at, status);
+-- Order detail and product revenue join order_items on order_id, then product_id
+CREATE INDEX idx_order_items_order_id_product_id ON order_items(order_id, product_id);
+
+-- Drop indexes made redundant by the composites above
+DROP INDEX idx_orders_created_at ON orders;
+DROP INDEX idx_order_items_order_id ON order_items;
+
+-- Drop secondary indexes duplicating a primary key
+DROP INDEX ix_payment_methods_id ON payment_methods;
+DROP INDEX ix_customers_id ON customers;
+DROP INDEX ix_users_id ON users;
+DROP INDEX ix_categories_id ON categories;
+DROP INDEX ix_products_id ON products;
+DROP INDEX ix_orders_id ON orders;
+DROP INDEX ix_order_items_id ON order_items;
+DROP INDEX ix_system_config_id ON system_config;
+
+-- Drop indexes duplicating a unique key or another index on the same column
+DROP INDEX idx_payment_methods_payment_method_code ON payment_methods;
+DROP INDEX idx_payment_methods_name ON payment_methods;
+DROP INDEX ix_users_is_active ON users;
+DROP INDEX idx_users_username ON users;
+DROP INDEX idx_users_email ON users;
+DROP INDEX ix_categories_is_active ON categories;
+DROP INDEX idx_categories_name ON categories;
+DROP INDEX ix_products_is_active ON products;
+DROP INDEX idx_products_name ON products;
+DROP INDEX idx_system_config_key ON system_config;
@@ -0,0 +1,27 @@
+-- Archive tables for orders past the retention horizon (see scripts/archive_orders.py)
+-- No foreign keys: archived rows are never updated and must not block deletes
+CREATE TABLE IF NOT EXISTS orders_archive (
+    id INTEGER NOT NULL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    customer_id INTEGER NULL,
+    total_amount DECIMAL(10,2) NOT NULL,
+    payment_method_code VARCHAR(20) NULL,
+    status VARCHAR(50) NOT NULL,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL,
+    archived_at DATETIME NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS order_items_archive (
+    id INTEGER NOT NULL PRIMARY KEY,
+    order_id INTEGER NOT NULL,
+    product_id INTEGER NOT NULL,
+    product_name VARCHAR(100) NOT NULL,
+    unit_price DECIMAL(10,2) NOT NULL,
+    quantity INTEGER NOT NULL,
+    price DECIMAL(10,2) NOT NULL,
+    created_at DATETIME NOT NULL
+);
+
+CREATE INDEX idx_orders_archive_created_at_status ON orders_archive(created_at, status);
+CREATE INDEX idx_order_items_archive_order_id_product_id ON order_items_archive(order_id, product_id);
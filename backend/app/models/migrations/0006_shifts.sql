@@ -0,0 +1,34 @@
+-- Shifts and the running counters behind their Z-reports
+CREATE TABLE IF NOT EXISTS shifts (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    status VARCHAR(20) NOT NULL DEFAULT 'open',
+    opened_by INTEGER NOT NULL,
+    closed_by INTEGER NULL,
+    opened_at DATETIME NOT NULL,
+    closed_at DATETIME NULL,
+    z_report JSON NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CONSTRAINT fk_shifts_opened_by FOREIGN KEY (opened_by) REFERENCES users(id),
+    CONSTRAINT fk_shifts_closed_by FOREIGN KEY (closed_by) REFERENCES users(id)
+);
+
+CREATE INDEX idx_shifts_status ON shifts(status);
+CREATE INDEX idx_shifts_opened_at ON shifts(opened_at);
+
+CREATE TABLE IF NOT EXISTS shift_counters (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    shift_id INTEGER NOT NULL,
+    dimension VARCHAR(20) NOT NULL,
+    `key` VARCHAR(100) NOT NULL,
+    orders INTEGER NOT NULL DEFAULT 0,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    amount DECIMAL(12,2) NOT NULL DEFAULT 0,
+    CONSTRAINT uq_shift_counters_shift_dimension_key UNIQUE (shift_id, dimension, `key`),
+    CONSTRAINT fk_shift_counters_shift FOREIGN KEY (shift_id) REFERENCES shifts(id)
+);
+
+-- Orders remember their shift so a later cancellation updates the right counters
+ALTER TABLE orders ADD COLUMN shift_id INTEGER NULL;
+ALTER TABLE orders ADD CONSTRAINT fk_orders_shift FOREIGN KEY (shift_id) REFERENCES shifts(id);
+CREATE INDEX idx_orders_shift_id ON orders(shift_id);
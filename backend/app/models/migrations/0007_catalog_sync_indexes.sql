@@ -0,0 +1,5 @@
+-- Serve the catalog changes feed (GET /api/sync/catalog) by (updated_at, id) range
+CREATE INDEX idx_categories_updated_at_id ON categories(updated_at, id);
+CREATE INDEX idx_products_updated_at_id ON products(updated_at, id);
+CREATE INDEX idx_payment_methods_updated_at_id ON payment_methods(updated_at, id);
+CREATE INDEX idx_customers_updated_at_id ON customers(updated_at, id);
@@ -0,0 +1,25 @@
+-- Ingredient stock and the recipes that consume it
+CREATE TABLE IF NOT EXISTS ingredients (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    name VARCHAR(100) NOT NULL UNIQUE,
+    unit VARCHAR(20) NOT NULL,
+    stock DECIMAL(12,3) NOT NULL DEFAULT 0,
+    low_stock_threshold DECIMAL(12,3) NOT NULL DEFAULT 0,
+    is_active TINYINT(1) NOT NULL DEFAULT 1,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE INDEX idx_ingredients_is_active ON ingredients(is_active);
+
+CREATE TABLE IF NOT EXISTS recipe_items (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    product_id INTEGER NOT NULL,
+    ingredient_id INTEGER NOT NULL,
+    quantity DECIMAL(12,3) NOT NULL,
+    CONSTRAINT uq_recipe_items_product_ingredient UNIQUE (product_id, ingredient_id),
+    CONSTRAINT fk_recipe_items_product FOREIGN KEY (product_id) REFERENCES products(id),
+    CONSTRAINT fk_recipe_items_ingredient FOREIGN KEY (ingredient_id) REFERENCES ingredients(id)
+);
+
+CREATE INDEX idx_recipe_items_ingredient_id ON recipe_items(ingredient_id);
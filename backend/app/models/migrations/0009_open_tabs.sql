@@ -0,0 +1,3 @@
+-- Open tabs are orders with status 'open' whose items can still change;
+-- version guards concurrent edits from several tills
+ALTER TABLE orders ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
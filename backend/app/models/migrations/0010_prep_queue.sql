@@ -0,0 +1,14 @@
+-- Bar preparation queue: station per product and per order line, completion times.
+-- Existing lines keep a NULL station, so they never show up as waiting.
+ALTER TABLE products ADD COLUMN station VARCHAR(20) NOT NULL DEFAULT 'espresso';
+ALTER TABLE order_items ADD COLUMN station VARCHAR(20) NULL;
+ALTER TABLE order_items ADD COLUMN prepared_at DATETIME NULL;
+CREATE INDEX idx_order_items_station_prepared_at ON order_items(station, prepared_at);
+
+CREATE TABLE IF NOT EXISTS product_prep_stats (
+    product_id INTEGER NOT NULL PRIMARY KEY,
+    avg_seconds DOUBLE NOT NULL,
+    samples INTEGER NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CONSTRAINT fk_product_prep_stats_product FOREIGN KEY (product_id) REFERENCES products(id)
+);
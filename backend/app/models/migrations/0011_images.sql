@@ -0,0 +1,15 @@
+-- Uploaded images with resized variants, referenced from categories and products
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    content_hash VARCHAR(64) NOT NULL UNIQUE,
+    original_ext VARCHAR(10) NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+ALTER TABLE categories ADD COLUMN image_id INTEGER NULL;
+ALTER TABLE categories ADD CONSTRAINT fk_categories_image FOREIGN KEY (image_id) REFERENCES images(id);
+ALTER TABLE products ADD COLUMN image_id INTEGER NULL;
+ALTER TABLE products ADD CONSTRAINT fk_products_image FOREIGN KEY (image_id) REFERENCES images(id);
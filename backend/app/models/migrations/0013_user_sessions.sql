@@ -0,0 +1,22 @@
+-- Login sessions with rotating refresh tokens, and version counters that let
+-- workers notice revocations without reloading on every request
+CREATE TABLE IF NOT EXISTS user_sessions (
+    id VARCHAR(32) NOT NULL PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    refresh_token_hash VARCHAR(64) NOT NULL,
+    user_agent VARCHAR(255) NULL,
+    expires_at DATETIME NOT NULL,
+    revoked_at DATETIME NULL,
+    last_used_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_user_sessions_user FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+CREATE INDEX idx_user_sessions_user_id ON user_sessions(user_id);
+CREATE INDEX idx_user_sessions_revoked_at ON user_sessions(revoked_at);
+
+CREATE TABLE IF NOT EXISTS change_versions (
+    name VARCHAR(50) NOT NULL PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
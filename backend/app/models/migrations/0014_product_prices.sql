@@ -0,0 +1,16 @@
+-- Effective-dated price schedule; today's prices become the first entries
+CREATE TABLE IF NOT EXISTS product_prices (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    product_id INTEGER NOT NULL,
+    price DECIMAL(10,2) NOT NULL,
+    effective_from DATETIME NOT NULL,
+    effective_to DATETIME NULL,
+    created_by INTEGER NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT uq_product_prices_product_from UNIQUE (product_id, effective_from),
+    CONSTRAINT fk_product_prices_product FOREIGN KEY (product_id) REFERENCES products(id),
+    CONSTRAINT fk_product_prices_created_by FOREIGN KEY (created_by) REFERENCES users(id)
+);
+
+INSERT INTO product_prices (product_id, price, effective_from)
+SELECT id, price, created_at FROM products;
@@ -0,0 +1,32 @@
+-- Promotions and the discount each order line received
+CREATE TABLE IF NOT EXISTS promotions (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    name VARCHAR(100) NOT NULL,
+    kind VARCHAR(20) NOT NULL,
+    value DECIMAL(10,2) NOT NULL DEFAULT 0,
+    buy_quantity INTEGER NULL,
+    get_quantity INTEGER NULL,
+    product_id INTEGER NULL,
+    category_id INTEGER NULL,
+    customer_id INTEGER NULL,
+    starts_at DATETIME NULL,
+    ends_at DATETIME NULL,
+    start_time TIME NULL,
+    end_time TIME NULL,
+    days_of_week INTEGER NOT NULL DEFAULT 127,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CONSTRAINT fk_promotions_product FOREIGN KEY (product_id) REFERENCES products(id),
+    CONSTRAINT fk_promotions_category FOREIGN KEY (category_id) REFERENCES categories(id),
+    CONSTRAINT fk_promotions_customer FOREIGN KEY (customer_id) REFERENCES customers(id)
+);
+CREATE INDEX idx_promotions_is_active ON promotions(is_active);
+
+ALTER TABLE order_items ADD COLUMN discount_amount DECIMAL(10,2) NOT NULL DEFAULT 0;
+ALTER TABLE order_items ADD COLUMN promotion_id INTEGER NULL;
+ALTER TABLE order_items ADD CONSTRAINT fk_order_items_promotion FOREIGN KEY (promotion_id) REFERENCES promotions(id);
+CREATE INDEX idx_order_items_promotion_id ON order_items(promotion_id);
+
+ALTER TABLE order_items_archive ADD COLUMN discount_amount DECIMAL(10,2) NOT NULL DEFAULT 0;
+ALTER TABLE order_items_archive ADD COLUMN promotion_id INTEGER NULL;
@@ -0,0 +1,28 @@
+-- Market basket analysis: per-day pair counts and the derived top associations
+CREATE TABLE IF NOT EXISTS basket_days (
+    day DATE NOT NULL PRIMARY KEY,
+    orders INTEGER NOT NULL,
+    computed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS basket_day_counts (
+    day DATE NOT NULL,
+    product_a INTEGER NOT NULL,
+    product_b INTEGER NOT NULL,
+    orders INTEGER NOT NULL,
+    PRIMARY KEY (day, product_a, product_b)
+);
+
+CREATE TABLE IF NOT EXISTS product_associations (
+    product_id INTEGER NOT NULL,
+    associated_product_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    orders INTEGER NOT NULL,
+    support DOUBLE NOT NULL,
+    confidence DOUBLE NOT NULL,
+    lift DOUBLE NOT NULL,
+    computed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (product_id, associated_product_id),
+    CONSTRAINT fk_product_associations_product FOREIGN KEY (product_id) REFERENCES products(id),
+    CONSTRAINT fk_product_associations_associated FOREIGN KEY (associated_product_id) REFERENCES products(id)
+);
@@ -0,0 +1,41 @@
+-- Stores; everything that exists today belongs to the first one
+CREATE TABLE IF NOT EXISTS stores (
+    id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    code VARCHAR(20) NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    CONSTRAINT uq_stores_code UNIQUE (code)
+);
+INSERT INTO stores (id, code, name) VALUES (1, 'main', 'Main store');
+
+ALTER TABLE users ADD COLUMN store_id INTEGER NULL;
+ALTER TABLE users ADD CONSTRAINT fk_users_store FOREIGN KEY (store_id) REFERENCES stores(id);
+-- Every existing account, admins included, is staff of the one store there
+-- was; owners, who work across stores, are promoted explicitly
+ALTER TABLE users ADD COLUMN is_owner BOOLEAN NOT NULL DEFAULT FALSE;
+UPDATE users SET store_id = 1;
+CREATE INDEX idx_users_store_id ON users(store_id);
+
+ALTER TABLE payment_methods ADD COLUMN store_id INTEGER NULL;
+ALTER TABLE payment_methods ADD CONSTRAINT fk_payment_methods_store FOREIGN KEY (store_id) REFERENCES stores(id);
+CREATE INDEX idx_payment_methods_store_id ON payment_methods(store_id);
+
+ALTER TABLE customers ADD COLUMN store_id INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE customers ADD CONSTRAINT fk_customers_store FOREIGN KEY (store_id) REFERENCES stores(id);
+CREATE INDEX idx_customers_store_id_sort_order ON customers(store_id, sort_order);
+CREATE INDEX idx_customers_store_id_updated_at_id ON customers(store_id, updated_at, id);
+
+ALTER TABLE products ADD COLUMN store_id INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE products ADD CONSTRAINT fk_products_store FOREIGN KEY (store_id) REFERENCES stores(id);
+CREATE INDEX idx_products_store_id_is_active_category_id ON products(store_id, is_active, category_id);
+CREATE INDEX idx_products_store_id_updated_at_id ON products(store_id, updated_at, id);
+
+ALTER TABLE orders ADD COLUMN store_id INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE orders ADD CONSTRAINT fk_orders_store FOREIGN KEY (store_id) REFERENCES stores(id);
+CREATE INDEX idx_orders_store_id_created_at_status ON orders(store_id, created_at, status);
+CREATE INDEX idx_orders_store_id_status ON orders(store_id, status);
+
+ALTER TABLE orders_archive ADD COLUMN store_id INTEGER NOT NULL DEFAULT 1;
+CREATE INDEX idx_orders_archive_store_id_created_at_status ON orders_archive(store_id, created_at, status);
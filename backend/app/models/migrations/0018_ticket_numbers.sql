@@ -0,0 +1,15 @@
+-- Per-store, per-business-day ticket numbers for calling out orders
+CREATE TABLE IF NOT EXISTS ticket_counters (
+    store_id INTEGER NOT NULL,
+    business_date DATE NOT NULL,
+    last_number INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (store_id, business_date),
+    CONSTRAINT fk_ticket_counters_store FOREIGN KEY (store_id) REFERENCES stores(id)
+);
+
+ALTER TABLE orders ADD COLUMN ticket_date DATE NULL;
+ALTER TABLE orders ADD COLUMN ticket_number INTEGER NULL;
+ALTER TABLE orders ADD CONSTRAINT uq_orders_store_id_ticket UNIQUE (store_id, ticket_date, ticket_number);
+
+ALTER TABLE orders_archive ADD COLUMN ticket_date DATE NULL;
+ALTER TABLE orders_archive ADD COLUMN ticket_number INTEGER NULL;
@@ -0,0 +1,3 @@
+-- Seller report groups a store's orders in a created_at range by user and status
+CREATE INDEX idx_orders_store_id_created_at_user_id_status ON orders(store_id, created_at, user_id, status);
+CREATE INDEX idx_orders_archive_store_id_created_at_user_id_status ON orders_archive(store_id, created_at, user_id, status);
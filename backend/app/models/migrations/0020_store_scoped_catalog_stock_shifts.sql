@@ -0,0 +1,19 @@
+-- Product and ingredient names are unique per store instead of overall;
+-- the column-level UNIQUE of both tables created an index named after it
+ALTER TABLE products DROP INDEX name;
+ALTER TABLE products ADD CONSTRAINT uq_products_store_id_name UNIQUE (store_id, name);
+
+-- Stock and shifts belong to a store; what exists today belongs to the first one
+ALTER TABLE ingredients ADD COLUMN store_id INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE ingredients ADD CONSTRAINT fk_ingredients_store FOREIGN KEY (store_id) REFERENCES stores(id);
+ALTER TABLE ingredients DROP INDEX name;
+ALTER TABLE ingredients ADD CONSTRAINT uq_ingredients_store_id_name UNIQUE (store_id, name);
+CREATE INDEX idx_ingredients_store_id_is_active ON ingredients(store_id, is_active);
+DROP INDEX idx_ingredients_is_active ON ingredients;
+
+ALTER TABLE shifts ADD COLUMN store_id INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE shifts ADD CONSTRAINT fk_shifts_store FOREIGN KEY (store_id) REFERENCES stores(id);
+CREATE INDEX idx_shifts_store_id_status ON shifts(store_id, status);
+CREATE INDEX idx_shifts_store_id_opened_at ON shifts(store_id, opened_at);
+DROP INDEX idx_shifts_status ON shifts;
+DROP INDEX idx_shifts_opened_at ON shifts;
@@ -0,0 +1,4 @@
+-- The refresh token a session last replaced, accepted again for a short
+-- grace window so tabs refreshing at the same moment do not end the session
+ALTER TABLE user_sessions ADD COLUMN previous_token_hash VARCHAR(64) NULL;
+ALTER TABLE user_sessions ADD COLUMN rotated_at DATETIME NULL;
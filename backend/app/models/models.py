@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, JSON, Table, Boolean, DECIMAL, Index, Enum
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, Date, DateTime, Time, JSON, Table, Boolean, DECIMAL, Index, Enum, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
@@ -10,31 +10,47 @@ class UserRole(enum.Enum):
     SELLER = 1
     ADMIN = 2
 
+# Rows created before stores existed, and callers that do not pick one, belong here
+DEFAULT_STORE_ID = 1
+
+class Store(Base):
+    __tablename__ = "stores"
+
+    id = Column(Integer, primary_key=True)
+    code = Column(String(20), nullable=False, unique=True)
+    name = Column(String(100), nullable=False)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class PaymentMethod(Base):
     __tablename__ = "payment_methods"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     payment_method_code = Column(String(20), nullable=False, unique=True, index=True)
     name = Column(String(100), nullable=False, unique=True)
     description = Column(String(255), nullable=True)
+    # NULL: offered in every store
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=True)
     is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     __table_args__ = (
-        Index('idx_payment_methods_payment_method_code', 'payment_method_code'),
         Index('idx_payment_methods_is_active', 'is_active'),
-        Index('idx_payment_methods_name', 'name'),
+        Index('idx_payment_methods_updated_at_id', 'updated_at', 'id'),
+        Index('idx_payment_methods_store_id', 'store_id'),
     )
 
 class Customer(Base):
     __tablename__ = "customers"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     customer_name = Column(String(100), nullable=False)
     phone = Column(String(20), nullable=True)
     address = Column(String(255), nullable=True)
     city = Column(String(100), nullable=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, default=DEFAULT_STORE_ID)
     sort_order = Column(Integer, nullable=False, default=0)
     is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -45,17 +61,23 @@ class Customer(Base):
         Index('idx_customers_phone', 'phone'),
         Index('idx_customers_is_active', 'is_active'),
         Index('idx_customers_sort_order', 'sort_order'),
+        Index('idx_customers_updated_at_id', 'updated_at', 'id'),
+        Index('idx_customers_store_id_sort_order', 'store_id', 'sort_order'),
+        Index('idx_customers_store_id_updated_at_id', 'store_id', 'updated_at', 'id'),
     )
 
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     username = Column(String(50), unique=True, index=True)
     email = Column(String(100), unique=True, index=True)
     hashed_password = Column(String(100))
-    is_active = Column(Boolean, nullable=False, default=True, index=True)
+    is_active = Column(Boolean, nullable=False, default=True)
     role = Column(Integer, default=UserRole.SELLER.value, nullable=False)
+    # Store the user works in; owners pick any store and are not tied to one
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=True, default=DEFAULT_STORE_ID)
+    is_owner = Column(Boolean, nullable=False, default=False)
     last_login = Column(DateTime, nullable=True)
     token_expires_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -65,63 +87,208 @@ class User(Base):
 
     __table_args__ = (
         Index('idx_users_is_active', 'is_active'),
-        Index('idx_users_username', 'username'),
-        Index('idx_users_email', 'email'),
         Index('idx_users_role', 'role'),
         Index('idx_users_last_login', 'last_login'),
         Index('idx_users_token_expires_at', 'token_expires_at'),
+        Index('idx_users_store_id', 'store_id'),
+    )
+
+class UserSession(Base):
+    __tablename__ = "user_sessions"
+
+    # Random id carried as "sid" in every access token issued for the session
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # SHA-256 of the current refresh token; rotated on every refresh
+    refresh_token_hash = Column(String(64), nullable=False)
+    # The token it replaced and when, accepted again for a short grace window
+    previous_token_hash = Column(String(64), nullable=True)
+    rotated_at = Column(DateTime, nullable=True)
+    user_agent = Column(String(255), nullable=True)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    last_used_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    user = relationship("User")
+
+    __table_args__ = (
+        Index('idx_user_sessions_user_id', 'user_id'),
+        Index('idx_user_sessions_revoked_at', 'revoked_at'),
     )
 
+class ChangeVersion(Base):
+    __tablename__ = "change_versions"
+
+    # One counter per cached data set; bumped in the transaction that changes
+    # it so every worker can tell with one primary key read whether to reload
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class Image(Base):
+    __tablename__ = "images"
+
+    id = Column(Integer, primary_key=True)
+    # SHA-256 of the original upload; variant file names are derived from it
+    content_hash = Column(String(64), nullable=False, unique=True)
+    original_ext = Column(String(10), nullable=False)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    # pending until the resized variants are written, then ready or failed
+    status = Column(String(20), nullable=False, default="pending")
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
 class Category(Base):
     __tablename__ = "categories"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False, unique=True)
     description = Column(String(255), nullable=True)
     image_url = Column(String(255), nullable=True)
-    is_active = Column(Boolean, nullable=False, default=True, index=True)
+    image_id = Column(Integer, ForeignKey("images.id"), nullable=True)
+    is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     products = relationship("Product", back_populates="category", cascade="all, delete-orphan")
+    image = relationship("Image")
 
     __table_args__ = (
         Index('idx_categories_is_active', 'is_active'),
-        Index('idx_categories_name', 'name'),
+        Index('idx_categories_updated_at_id', 'updated_at', 'id'),
     )
 
 class Product(Base):
     __tablename__ = "products"
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), nullable=False, unique=True)
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
     description = Column(String(255), nullable=True)
     price = Column(DECIMAL(10, 2), nullable=False)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, default=DEFAULT_STORE_ID)
     image_url = Column(String(255), nullable=True)
-    is_active = Column(Boolean, nullable=False, default=True, index=True)
+    image_id = Column(Integer, ForeignKey("images.id"), nullable=True)
+    # Preparation station at the bar: espresso, blender or food
+    station = Column(String(20), nullable=False, default="espresso")
+    is_active = Column(Boolean, nullable=False, default=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     category = relationship("Category", back_populates="products")
+    image = relationship("Image")
     order_items = relationship("OrderItem", back_populates="product", cascade="all, delete-orphan")
 
     __table_args__ = (
         Index('idx_products_is_active', 'is_active'),
-        Index('idx_products_name', 'name'),
         Index('idx_products_category_id', 'category_id'),
         Index('idx_products_price', 'price'),
+        Index('idx_products_updated_at_id', 'updated_at', 'id'),
+        Index('idx_products_store_id_is_active_category_id', 'store_id', 'is_active', 'category_id'),
+        Index('idx_products_store_id_updated_at_id', 'store_id', 'updated_at', 'id'),
+        # Names are unique within a store; another store may sell its own "Latte"
+        UniqueConstraint('store_id', 'name', name='uq_products_store_id_name'),
+    )
+
+class ProductPrice(Base):
+    __tablename__ = "product_prices"
+
+    # Price schedule: each row applies from effective_from until effective_to
+    # (exclusive, NULL for open-ended); rows of a product never overlap
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    price = Column(DECIMAL(10, 2), nullable=False)
+    effective_from = Column(DateTime, nullable=False)
+    effective_to = Column(DateTime, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint('product_id', 'effective_from', name='uq_product_prices_product_from'),
+    )
+
+class Promotion(Base):
+    __tablename__ = "promotions"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), nullable=False)
+    # "percent" off, fixed "amount" off each unit, or "buy_x_get_y" free units
+    kind = Column(String(20), nullable=False)
+    value = Column(DECIMAL(10, 2), nullable=False, default=0)
+    buy_quantity = Column(Integer, nullable=True)
+    get_quantity = Column(Integer, nullable=True)
+    # Scope: a product, a category, or every product when both are NULL
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=True)
+    category_id = Column(Integer, ForeignKey("categories.id"), nullable=True)
+    # Member deals apply only to orders for this customer
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=True)
+    starts_at = Column(DateTime, nullable=True)
+    ends_at = Column(DateTime, nullable=True)
+    # Shop-local daily window and weekday bitmask (bit 0 = Monday)
+    start_time = Column(Time, nullable=True)
+    end_time = Column(Time, nullable=True)
+    days_of_week = Column(Integer, nullable=False, default=127)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_promotions_is_active', 'is_active'),
+    )
+
+class Ingredient(Base):
+    __tablename__ = "ingredients"
+
+    id = Column(Integer, primary_key=True)
+    # Each store keeps its own stock
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, default=DEFAULT_STORE_ID)
+    name = Column(String(100), nullable=False)
+    unit = Column(String(20), nullable=False)
+    stock = Column(DECIMAL(12, 3), nullable=False, default=0)
+    low_stock_threshold = Column(DECIMAL(12, 3), nullable=False, default=0)
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_ingredients_store_id_is_active', 'store_id', 'is_active'),
+        UniqueConstraint('store_id', 'name', name='uq_ingredients_store_id_name'),
+    )
+
+class RecipeItem(Base):
+    __tablename__ = "recipe_items"
+
+    # Quantity of an ingredient used by one unit of a product
+    id = Column(Integer, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    ingredient_id = Column(Integer, ForeignKey("ingredients.id"), nullable=False)
+    quantity = Column(DECIMAL(12, 3), nullable=False)
+
+    ingredient = relationship("Ingredient")
+
+    __table_args__ = (
+        UniqueConstraint('product_id', 'ingredient_id', name='uq_recipe_items_product_ingredient'),
+        Index('idx_recipe_items_ingredient_id', 'ingredient_id'),
     )
 
 class Order(Base):
     __tablename__ = "orders"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, default=DEFAULT_STORE_ID)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     customer_id = Column(Integer, ForeignKey("customers.id"), nullable=True)
     total_amount = Column(DECIMAL(10, 2), nullable=False)
     payment_method_code = Column(String(20), ForeignKey("payment_methods.payment_method_code"), nullable=True)
     status = Column(String(50), nullable=False, default="pending")
+    shift_id = Column(Integer, ForeignKey("shifts.id"), nullable=True)
+    # Short number called out at the counter, from 1 each business day per store;
+    # orders from before ticket numbers have none
+    ticket_date = Column(Date, nullable=True)
+    ticket_number = Column(Integer, nullable=True)
+    # Bumped on every item change of an open tab for optimistic concurrency
+    version = Column(Integer, nullable=False, default=1)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -134,39 +301,200 @@ class Order(Base):
         Index('idx_orders_user_id', 'user_id'),
         Index('idx_orders_customer_id', 'customer_id'),
         Index('idx_orders_status', 'status'),
-        Index('idx_orders_created_at', 'created_at'),
+        Index('idx_orders_created_at_status', 'created_at', 'status'),
         Index('idx_orders_payment_method_code', 'payment_method_code'),
+        Index('idx_orders_shift_id', 'shift_id'),
+        # Single-store history and reports are range scans within one store
+        Index('idx_orders_store_id_created_at_status', 'store_id', 'created_at', 'status'),
+        Index('idx_orders_store_id_status', 'store_id', 'status'),
+        # Seller report: one range scan grouped by seller
+        Index('idx_orders_store_id_created_at_user_id_status', 'store_id', 'created_at', 'user_id', 'status'),
+        UniqueConstraint('store_id', 'ticket_date', 'ticket_number', name='uq_orders_store_id_ticket'),
     )
 
 class OrderItem(Base):
     __tablename__ = "order_items"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     product_name = Column(String(100), nullable=False)
     unit_price = Column(DECIMAL(10, 2), nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(DECIMAL(10, 2), nullable=False)
+    # price is the line total after discount_amount
+    discount_amount = Column(DECIMAL(10, 2), nullable=False, default=0)
+    promotion_id = Column(Integer, ForeignKey("promotions.id"), nullable=True)
+    station = Column(String(20), nullable=True)
+    prepared_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     order = relationship("Order", back_populates="items")
     product = relationship("Product", back_populates="order_items")
 
     __table_args__ = (
-        Index('idx_order_items_order_id', 'order_id'),
+        Index('idx_order_items_order_id_product_id', 'order_id', 'product_id'),
         Index('idx_order_items_product_id', 'product_id'),
+        # Lines still waiting at a station; finished and pre-queue lines never match
+        Index('idx_order_items_station_prepared_at', 'station', 'prepared_at'),
+        Index('idx_order_items_promotion_id', 'promotion_id'),
+    )
+
+class Shift(Base):
+    __tablename__ = "shifts"
+
+    id = Column(Integer, primary_key=True)
+    # Each store runs its own shifts and Z-reports
+    store_id = Column(Integer, ForeignKey("stores.id"), nullable=False, default=DEFAULT_STORE_ID)
+    status = Column(String(20), nullable=False, default="open")
+    opened_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    closed_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    opened_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    closed_at = Column(DateTime, nullable=True)
+    # Frozen Z-report, written once when the shift is closed
+    z_report = Column(JSON, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    counters = relationship("ShiftCounter", back_populates="shift", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index('idx_shifts_store_id_status', 'store_id', 'status'),
+        Index('idx_shifts_store_id_opened_at', 'store_id', 'opened_at'),
+    )
+
+class ShiftCounter(Base):
+    __tablename__ = "shift_counters"
+
+    # Running totals per shift, e.g. ("payment_method", "CASH") or ("product", "12")
+    id = Column(Integer, primary_key=True)
+    shift_id = Column(Integer, ForeignKey("shifts.id"), nullable=False)
+    dimension = Column(String(20), nullable=False)
+    key = Column(String(100), nullable=False)
+    orders = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    amount = Column(DECIMAL(12, 2), nullable=False, default=0)
+
+    shift = relationship("Shift", back_populates="counters")
+
+    __table_args__ = (
+        UniqueConstraint('shift_id', 'dimension', 'key', name='uq_shift_counters_shift_dimension_key'),
+    )
+
+class TicketCounter(Base):
+    __tablename__ = "ticket_counters"
+
+    # Last ticket number handed out per store and business day
+    store_id = Column(Integer, ForeignKey("stores.id"), primary_key=True, autoincrement=False)
+    business_date = Column(Date, primary_key=True)
+    last_number = Column(Integer, nullable=False, default=0)
+
+class ProductPrepStat(Base):
+    __tablename__ = "product_prep_stats"
+
+    # Moving average of how long one unit of a product takes at its station
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True, autoincrement=False)
+    avg_seconds = Column(Float, nullable=False)
+    samples = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class BasketDay(Base):
+    __tablename__ = "basket_days"
+
+    # Business days already folded into basket_day_counts
+    day = Column(Date, primary_key=True)
+    orders = Column(Integer, nullable=False)
+    computed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class BasketDayCount(Base):
+    __tablename__ = "basket_day_counts"
+
+    # Orders of the day containing both products (product_a <= product_b);
+    # product_a == product_b counts orders containing that product at all
+    day = Column(Date, primary_key=True)
+    product_a = Column(Integer, primary_key=True, autoincrement=False)
+    product_b = Column(Integer, primary_key=True, autoincrement=False)
+    orders = Column(Integer, nullable=False)
+
+class ProductAssociation(Base):
+    __tablename__ = "product_associations"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True, autoincrement=False)
+    associated_product_id = Column(Integer, ForeignKey("products.id"), primary_key=True, autoincrement=False)
+    position = Column(Integer, nullable=False)
+    orders = Column(Integer, nullable=False)
+    support = Column(Float, nullable=False)
+    confidence = Column(Float, nullable=False)
+    lift = Column(Float, nullable=False)
+    computed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    # Outbox of side effects, written in the same transaction as the change
+    # that caused them and run afterwards by the job workers
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    # queued, running, done or failed
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_jobs_status_run_at', 'status', 'run_at'),
     )
 
 class SystemConfig(Base):
     __tablename__ = "system_config"
     
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     key = Column(String(100), unique=True, index=True)
     value = Column(JSON)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow) 
+
+class OrderArchive(Base):
+    __tablename__ = "orders_archive"
+
+    # Same columns as orders, without foreign keys, filled by app/utils/archive.py
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    store_id = Column(Integer, nullable=False, default=DEFAULT_STORE_ID)
+    user_id = Column(Integer, nullable=False)
+    customer_id = Column(Integer, nullable=True)
+    total_amount = Column(DECIMAL(10, 2), nullable=False)
+    payment_method_code = Column(String(20), nullable=True)
+    status = Column(String(50), nullable=False)
+    ticket_date = Column(Date, nullable=True)
+    ticket_number = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index('idx_orders_archive_created_at_status', 'created_at', 'status'),
+        Index('idx_orders_archive_store_id_created_at_status', 'store_id', 'created_at', 'status'),
+        Index('idx_orders_archive_store_id_created_at_user_id_status', 'store_id', 'created_at', 'user_id', 'status'),
+    )
+
+class OrderItemArchive(Base):
+    __tablename__ = "order_items_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_id = Column(Integer, nullable=False)
+    product_id = Column(Integer, nullable=False)
+    product_name = Column(String(100), nullable=False)
+    unit_price = Column(DECIMAL(10, 2), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price = Column(DECIMAL(10, 2), nullable=False)
+    discount_amount = Column(DECIMAL(10, 2), nullable=False, default=0)
+    promotion_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, nullable=False)
 
     __table_args__ = (
-        Index('idx_system_config_key', 'key'),
-    ) 
\ No newline at end of file
+        Index('idx_order_items_archive_order_id_product_id', 'order_id', 'product_id'),
+    )
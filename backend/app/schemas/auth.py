@@ -3,10 +3,21 @@ from typing import Optional
 
 class Token(BaseModel):
     access_token: str
+    refresh_token: str
     token_type: str
+    expires_in: int
     role: int
     redirect_to: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class RefreshResponse(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str
+    expires_in: int
+
 class TokenData(BaseModel):
     username: Optional[str] = None
 
@@ -21,10 +32,15 @@ class UserResponse(UserBase):
     id: int
     role: int
     is_active: bool
+    store_id: Optional[int] = None
+    is_owner: bool = False
 
     class Config:
         from_attributes = True
 
+class UserStoreUpdate(BaseModel):
+    store_id: int
+
 class LoginRequest(BaseModel):
     username: str
     password: str 
\ No newline at end of file
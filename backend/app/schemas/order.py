@@ -3,6 +3,7 @@ from datetime import datetime
 
 class OrderResponse(BaseModel):
     id: int
+    ticket_number: int | None = None
     order_date: datetime
     total_quantity: int
     total_amount: float
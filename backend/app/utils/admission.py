@@ -0,0 +1,209 @@
+import asyncio
+import itertools
+import math
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+from fastapi import HTTPException, status
+from ..config.settings import settings
+from . import metrics
+
+class PriorityClass(NamedTuple):
+    name: str
+    # Lower is served first when a slot frees up
+    priority: int
+    # Requests of this class running at once in this worker
+    limit: int
+    # Slots this class must leave free for the classes above it
+    headroom: int
+    # Past this many waiting the request is refused without queueing
+    max_waiting: int
+    wait_seconds: float
+
+admitted = metrics.counter(
+    "pos_admission_admitted_total", "Requests let through admission control", ("class",)
+)
+shed = metrics.counter(
+    "pos_admission_shed_total", "Requests refused with 503 by admission control", ("class", "reason")
+)
+waited = metrics.counter(
+    "pos_admission_wait_seconds_total", "Time admitted requests spent queued", ("class",)
+)
+running = metrics.gauge(
+    "pos_admission_active", "Requests holding an admission slot", ("class",)
+)
+queued = metrics.gauge(
+    "pos_admission_waiting", "Requests queued for an admission slot", ("class",)
+)
+
+class _Waiter(NamedTuple):
+    order: tuple
+    cls: PriorityClass
+    route: Optional[str]
+    route_limit: Optional[int]
+    future: asyncio.Future
+
+class AdmissionController:
+    """Priority slots shared by the gated routes of one worker.
+
+    Everything runs on the worker's event loop, so the counters need no lock.
+    A freed slot goes to the highest priority waiter that fits its class and
+    route limits; lower classes never take the headroom kept for checkout.
+    """
+
+    def __init__(self, capacity: int, classes: List[PriorityClass]):
+        self.capacity = capacity
+        self.classes: Dict[str, PriorityClass] = {cls.name: cls for cls in classes}
+        self.active = 0
+        self._active: Dict[str, int] = defaultdict(int)
+        self._waiting: Dict[str, int] = defaultdict(int)
+        self._waiters: List[_Waiter] = []
+        self._sequence = itertools.count()
+
+    def _fits(self, cls: PriorityClass, route: Optional[str], route_limit: Optional[int]) -> bool:
+        return (
+            self.active + cls.headroom < self.capacity
+            and self._active[cls.name] < cls.limit
+            and (route_limit is None or self._active[route] < route_limit)
+        )
+
+    def _take(self, cls: PriorityClass, route: Optional[str]):
+        self.active += 1
+        self._active[cls.name] += 1
+        if route:
+            self._active[route] += 1
+
+    def release(self, cls: PriorityClass, route: Optional[str]):
+        self.active -= 1
+        self._active[cls.name] -= 1
+        if route:
+            self._active[route] -= 1
+        self._wake()
+
+    def _wake(self):
+        for waiter in list(self._waiters):
+            if waiter.future.done():
+                continue
+            if self._fits(waiter.cls, waiter.route, waiter.route_limit):
+                self._take(waiter.cls, waiter.route)
+                waiter.future.set_result(True)
+
+    def _refuse(self, cls: PriorityClass, reason: str):
+        shed.inc(**{"class": cls.name, "reason": reason})
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please retry",
+            headers={"Retry-After": str(max(1, math.ceil(cls.wait_seconds)))},
+        )
+
+    async def acquire(self, cls: PriorityClass, route: Optional[str] = None, route_limit: Optional[int] = None):
+        # Nobody jumps ahead of a waiter of the same or a higher class
+        ahead = any(waiter.cls.priority <= cls.priority for waiter in self._waiters)
+        if not ahead and self._fits(cls, route, route_limit):
+            self._take(cls, route)
+            admitted.inc(**{"class": cls.name})
+            return
+        if self._waiting[cls.name] >= cls.max_waiting:
+            self._refuse(cls, "queue_full")
+
+        waiter = _Waiter(
+            (cls.priority, next(self._sequence)), cls, route, route_limit,
+            asyncio.get_running_loop().create_future()
+        )
+        self._waiters.append(waiter)
+        self._waiters.sort(key=lambda w: w.order)
+        self._waiting[cls.name] += 1
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), cls.wait_seconds)
+        except asyncio.TimeoutError:
+            # A slot handed over just as the deadline passed is still used
+            if not waiter.future.done():
+                waiter.future.cancel()
+                self._refuse(cls, "timeout")
+        except BaseException:
+            # Client went away while queued; hand back a slot granted meanwhile
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(cls, route)
+            waiter.future.cancel()
+            raise
+        finally:
+            self._waiters.remove(waiter)
+            self._waiting[cls.name] -= 1
+        admitted.inc(**{"class": cls.name})
+        waited.inc(time.monotonic() - started, **{"class": cls.name})
+
+    def collect(self):
+        for name in self.classes:
+            running.set(self._active[name], **{"class": name})
+            queued.set(self._waiting[name], **{"class": name})
+
+def _classes() -> List[PriorityClass]:
+    capacity = settings.admission_capacity
+    reserve = settings.admission_checkout_reserve
+    return [
+        # Taking payment; waits rather than fails while anything else is running
+        PriorityClass("checkout", 0, capacity, 0, capacity, settings.admission_checkout_wait_seconds),
+        PriorityClass("standard", 1, capacity, reserve, capacity, settings.admission_checkout_wait_seconds),
+        # Reports and full order lists: a few at a time, refused fast beyond that
+        PriorityClass(
+            "bulk", 2, settings.admission_bulk_limit, reserve,
+            settings.admission_bulk_queue, settings.admission_bulk_wait_seconds
+        ),
+    ]
+
+admission = AdmissionController(settings.admission_capacity, _classes())
+metrics.register_collector(admission.collect)
+_routes = itertools.count(1)
+
+def admit(class_name: str, route_limit: Optional[int] = None):
+    """Dependency holding an admission slot until the response is sent.
+
+    route_limit additionally caps one route, for endpoints heavy enough that
+    even the class limit is too many at once.
+    """
+    cls = admission.classes[class_name]
+    route = f"route:{next(_routes)}" if route_limit is not None else None
+
+    async def gate():
+        await admission.acquire(cls, route, route_limit)
+        try:
+            yield
+        finally:
+            admission.release(cls, route)
+
+    return gate
+
+class HeldSlot:
+    """An admission slot that a streamed response keeps until its body is sent."""
+
+    def __init__(self, cls: PriorityClass):
+        self.cls = cls
+        self.handed_over = False
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            admission.release(self.cls, None)
+
+def hold(class_name: str):
+    """Dependency like admit() for endpoints that return a StreamingResponse.
+
+    admit() frees its slot when the endpoint returns, before a streamed body
+    is sent. This one yields the slot for the endpoint to hand to the
+    response (see bulk.export_response), which releases it once the body is
+    sent or the client leaves; a slot never handed over is released here.
+    """
+    cls = admission.classes[class_name]
+
+    async def take():
+        await admission.acquire(cls)
+        slot = HeldSlot(cls)
+        try:
+            yield slot
+        finally:
+            if not slot.handed_over:
+                slot.release()
+
+    return take
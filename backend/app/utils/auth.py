@@ -1,27 +1,23 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from ..models.models import User, UserRole
+from ..models.models import DEFAULT_STORE_ID, User, UserRole
 from ..config.database import get_db
-import os
-from dotenv import load_dotenv
+from ..config.settings import settings
+from .profiling import note_user
+from .sessions import is_revoked
+from .stores import StoreInfo, store_cache
 
-# Load environment variables
-load_dotenv()
-
-# Get environment variables
-SECRET_KEY = os.getenv("SECRET_KEY")
-if not SECRET_KEY:
-    raise ValueError("SECRET_KEY environment variable is not set")
-
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-# Set token expiration to 2 years (730 days)
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "1051200"))  # 730 days * 24 hours * 60 minutes
+SECRET_KEY = settings.secret_key
+ALGORITHM = settings.algorithm
+ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
 
+# Shared by every router; passlib resolves the bcrypt backend on first use
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
 
@@ -33,15 +29,19 @@ def get_password_hash(password):
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
+    to_encode["jti"] = uuid.uuid4().hex
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        # Default to 2 years if no expiration is provided
-        expire = datetime.utcnow() + timedelta(days=730)
+        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def token_session_id(token: str) -> Optional[str]:
+    # Called after get_current_user has validated the same token
+    return jwt.get_unverified_claims(token).get("sid")
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,13 +51,18 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        session_id: str = payload.get("sid")
+        # Tokens from before sessions existed carry no sid and cannot be revoked
+        if username is None or session_id is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
+    if is_revoked(db, session_id):
+        raise credentials_exception
     user = db.query(User).filter(User.username == username).first()
-    if user is None:
+    if user is None or not user.is_active:
         raise credentials_exception
+    note_user(user)
     return user
 
 async def require_admin(current_user: User = Depends(get_current_user)):
@@ -68,10 +73,39 @@ async def require_admin(current_user: User = Depends(get_current_user)):
         )
     return current_user
 
+async def require_owner(current_user: User = Depends(require_admin)):
+    # Store admins run their own store; adding stores or looking across them is for owners
+    if not current_user.is_owner:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return current_user
+
 async def require_seller(current_user: User = Depends(get_current_user)):
     if current_user.role not in [UserRole.SELLER.value, UserRole.ADMIN.value]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    return current_user 
\ No newline at end of file
+    return current_user 
+
+async def get_current_store(
+    x_store_id: Optional[int] = Header(None, description="Store to act in; staff of one store may omit it"),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+) -> StoreInfo:
+    """The store a request reads and writes, checked against the user's own store."""
+    if current_user.is_owner:
+        store_id = x_store_id or DEFAULT_STORE_ID
+    else:
+        if current_user.store_id is None or (x_store_id is not None and x_store_id != current_user.store_id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not allowed in this store"
+            )
+        store_id = current_user.store_id
+    store = store_cache.get(db).get(store_id)
+    if store is None or not store.is_active:
+        raise HTTPException(status_code=404, detail="Store not found")
+    return store
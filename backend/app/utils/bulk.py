@@ -0,0 +1,406 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Callable, Dict, Iterator, List, Literal, NamedTuple, Optional
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import func, insert, or_, select, update
+from sqlalchemy.orm import Session
+from ..config.database import SessionLocal
+from ..config.settings import settings
+from ..models.models import Category, Customer, PaymentMethod, Product, ProductPrice
+from .admission import HeldSlot
+from .pricing import PRICE_SCHEDULE, price_index, resolve_price, schedule_price
+from .stores import payment_methods_in
+from .upsert import upsert
+from .versions import bump_version
+
+# Per-row errors returned at most; the total is always reported
+MAX_REPORTED_ERRORS = 200
+
+class CategoryRow(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    description: Optional[str] = Field(None, max_length=255)
+    image_url: Optional[str] = Field(None, max_length=255)
+    is_active: bool = True
+
+class ProductRow(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    description: Optional[str] = Field(None, max_length=255)
+    price: Decimal = Field(..., ge=0, max_digits=10, decimal_places=2)
+    # Category by name, so files move between databases
+    category: str
+    station: Literal["espresso", "blender", "food"] = "espresso"
+    image_url: Optional[str] = Field(None, max_length=255)
+    is_active: bool = True
+
+class CustomerRow(BaseModel):
+    # Set to update that customer; omitted adds a new one
+    id: Optional[int] = None
+    customer_name: str = Field(..., min_length=1, max_length=100)
+    phone: Optional[str] = Field(None, max_length=20)
+    address: Optional[str] = Field(None, max_length=255)
+    city: Optional[str] = Field(None, max_length=100)
+    sort_order: int = 0
+    is_active: bool = True
+
+class PaymentMethodRow(BaseModel):
+    payment_method_code: str = Field(..., min_length=1, max_length=20)
+    name: str = Field(..., min_length=1, max_length=100)
+    description: Optional[str] = Field(None, max_length=255)
+    is_active: bool = True
+
+class ImportErrors(Exception):
+    def __init__(self, errors: List[dict]):
+        self.errors = errors
+
+class ImportResult(NamedTuple):
+    inserted: int
+    updated: int
+
+def parse_rows(data: bytes, file_format: str) -> List[dict]:
+    """Rows of a CSV file with a header line, or of a JSON array of objects."""
+    try:
+        text = data.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8")
+    if file_format == "json":
+        try:
+            rows = json.loads(text)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {e}")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise HTTPException(status_code=400, detail="JSON must be an array of objects")
+        return rows
+    # Empty CSV cells mean "not given", so optional columns take their default
+    return [
+        {key: value for key, value in row.items() if key and value != ""}
+        for row in csv.DictReader(io.StringIO(text))
+    ]
+
+def _validate(rows: List[dict], row_model) -> tuple:
+    valid, errors = [], []
+    for number, row in enumerate(rows, start=1):
+        try:
+            valid.append((number, row_model.model_validate(row)))
+        except ValidationError as e:
+            errors.append({
+                "row": number,
+                "errors": [f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in e.errors()]
+            })
+    return valid, errors
+
+def _duplicates(valid: list, key: Callable) -> List[dict]:
+    seen, errors = {}, []
+    for number, row in valid:
+        value = key(row)
+        if value is None:
+            continue
+        if value in seen:
+            errors.append({"row": number, "errors": [f"duplicate of row {seen[value]}"]})
+        else:
+            seen[value] = number
+    return errors
+
+def _chunks(rows: List[dict]) -> Iterator[List[dict]]:
+    for start in range(0, len(rows), settings.import_batch_rows):
+        yield rows[start:start + settings.import_batch_rows]
+
+def _existing(db: Session, column, values, *columns, where=()) -> dict:
+    """(column, *columns) of the rows whose column is one of values, keyed by it, looked up in batches.
+
+    `where` holds further criteria, e.g. the store of store-scoped keys.
+    """
+    values = list(values)
+    found = {}
+    for start in range(0, len(values), settings.import_batch_rows):
+        for row in db.query(column, *columns).filter(
+            column.in_(values[start:start + settings.import_batch_rows]), *where
+        ).all():
+            found[row[0]] = row
+    return found
+
+def _restamp(db: Session, table, stamp: datetime, *criteria):
+    # Rows were stamped when the import started; catalog sync only reads
+    # rows older than its safety lag, so move them to commit time or a long
+    # import could slip behind a till's cursor
+    now = datetime.utcnow().replace(microsecond=0)
+    if now != stamp:
+        db.execute(update(table).where(table.c.updated_at == stamp, *criteria).values(updated_at=now))
+
+def import_categories(db: Session, valid: list, store_id: int, user_id: int, stamp: datetime) -> ImportResult:
+    existing = _existing(db, Category.name, (row.name for _, row in valid))
+    rows = [dict(row.model_dump(), created_at=stamp, updated_at=stamp) for _, row in valid]
+    for chunk in _chunks(rows):
+        upsert(db, Category.__table__, chunk, key_columns=("name",),
+               replace=("description", "image_url", "is_active", "updated_at"))
+    _restamp(db, Category.__table__, stamp)
+    return ImportResult(len(rows) - len(existing), len(existing))
+
+def check_products(db: Session, valid: list, store_id: int, owner: bool) -> List[dict]:
+    categories = dict(db.query(Category.name, Category.id).all())
+    return [
+        {"row": number, "errors": [f"category: no category named {row.category!r}"]}
+        for number, row in valid if row.category not in categories
+    ]
+
+def import_products(db: Session, valid: list, store_id: int, user_id: int, stamp: datetime) -> ImportResult:
+    categories = dict(db.query(Category.name, Category.id).all())
+    in_store = (Product.store_id == store_id,)
+    # Compared with the price in force, which a scheduled change may have moved off Product.price
+    existing = {name: resolve_price(db, row) for name, row in _existing(
+        db, Product.name, (row.name for _, row in valid), Product.id, Product.price, where=in_store
+    ).items()}
+    rows = [
+        {
+            "name": row.name,
+            "description": row.description,
+            "price": row.price,
+            "category_id": categories[row.category],
+            "store_id": store_id,
+            "station": row.station,
+            "image_url": row.image_url,
+            "is_active": row.is_active,
+            "created_at": stamp,
+            "updated_at": stamp,
+        }
+        for _, row in valid
+    ]
+    # Price goes through the schedule below, never straight onto the row
+    for chunk in _chunks(rows):
+        upsert(db, Product.__table__, chunk, key_columns=("store_id", "name"),
+               replace=("description", "category_id", "station", "image_url", "is_active", "updated_at"))
+
+    new_names = [row["name"] for row in rows if row["name"] not in existing]
+    changed = {row["name"]: row["price"] for row in rows if row["name"] in existing and existing[row["name"]] != row["price"]}
+    ids = {name: row.id for name, row in _existing(db, Product.name, new_names, Product.id, where=in_store).items()}
+    prices = [
+        {"product_id": ids[row["name"]], "price": row["price"], "effective_from": stamp, "created_by": user_id, "created_at": stamp}
+        for row in rows if row["name"] in ids
+    ]
+    for chunk in _chunks(prices):
+        db.execute(insert(ProductPrice.__table__), chunk)
+    for product in db.query(Product).filter(*in_store, Product.name.in_(changed)).all():
+        schedule_price(db, product, changed[product.name], datetime.utcnow(), user_id)
+    if prices:
+        bump_version(db, PRICE_SCHEDULE)
+        price_index.invalidate()
+    _restamp(db, Product.__table__, stamp, Product.__table__.c.store_id == store_id)
+    return ImportResult(len(new_names), len(rows) - len(new_names))
+
+def check_customers(db: Session, valid: list, store_id: int, owner: bool) -> List[dict]:
+    ids = [row.id for _, row in valid if row.id is not None]
+    existing = _existing(db, Customer.id, ids, Customer.store_id)
+    return [
+        {"row": number, "errors": ["id: no customer with this id in this store"]}
+        for number, row in valid
+        if row.id is not None and (row.id not in existing or existing[row.id].store_id != store_id)
+    ]
+
+def import_customers(db: Session, valid: list, store_id: int, user_id: int, stamp: datetime) -> ImportResult:
+    rows = [dict(row.model_dump(), store_id=store_id, created_at=stamp, updated_at=stamp) for _, row in valid]
+    updates = [row for row in rows if row["id"] is not None]
+    inserts = [{key: value for key, value in row.items() if key != "id"} for row in rows if row["id"] is None]
+    for chunk in _chunks(updates):
+        upsert(db, Customer.__table__, chunk, key_columns=("id",),
+               replace=("customer_name", "phone", "address", "city", "sort_order", "is_active", "updated_at"))
+    for chunk in _chunks(inserts):
+        db.execute(insert(Customer.__table__), chunk)
+    _restamp(db, Customer.__table__, stamp, Customer.__table__.c.store_id == store_id)
+    return ImportResult(len(inserts), len(updates))
+
+def check_payment_methods(db: Session, valid: list, store_id: int, owner: bool) -> List[dict]:
+    by_name = _existing(db, PaymentMethod.name, (row.name for _, row in valid), PaymentMethod.payment_method_code)
+    by_code = _existing(db, PaymentMethod.payment_method_code, (row.payment_method_code for _, row in valid), PaymentMethod.store_id)
+    errors = []
+    for number, row in valid:
+        row_errors = []
+        if row.name in by_name and by_name[row.name].payment_method_code != row.payment_method_code:
+            row_errors.append("name: already used by payment method " + by_name[row.name].payment_method_code)
+        # Rows update the existing method with their code, which must be this
+        # store's own, or a shared one when an owner imports
+        if row.payment_method_code in by_code:
+            method_store_id = by_code[row.payment_method_code].store_id
+            if method_store_id is None and not owner:
+                row_errors.append("payment_method_code: shared payment methods can only be changed by an owner")
+            elif method_store_id not in (None, store_id):
+                row_errors.append("payment_method_code: used by another store")
+        if row_errors:
+            errors.append({"row": number, "errors": row_errors})
+    return errors
+
+def import_payment_methods(db: Session, valid: list, store_id: int, user_id: int, stamp: datetime) -> ImportResult:
+    existing = _existing(db, PaymentMethod.payment_method_code, (row.payment_method_code for _, row in valid))
+    # New methods are shared by every store, as from the create endpoint by default
+    rows = [dict(row.model_dump(), store_id=None, created_at=stamp, updated_at=stamp) for _, row in valid]
+    for chunk in _chunks(rows):
+        upsert(db, PaymentMethod.__table__, chunk, key_columns=("payment_method_code",),
+               replace=("name", "description", "is_active", "updated_at"))
+    _restamp(db, PaymentMethod.__table__, stamp)
+    return ImportResult(len(rows) - len(existing), len(existing))
+
+class BulkTable(NamedTuple):
+    row_model: type
+    # Natural key of a row in the file, for spotting duplicates
+    key: Callable
+    check: Optional[Callable]
+    write: Callable
+    # Export: the query for a store and the file columns
+    query: Callable
+    columns: tuple
+
+def _product_query(store_id: int):
+    # The scheduled price in force, as resolve_price gives it, else the row's
+    now = datetime.utcnow()
+    in_force = select(ProductPrice.price).where(
+        ProductPrice.product_id == Product.id,
+        ProductPrice.effective_from <= now,
+        or_(ProductPrice.effective_to.is_(None), ProductPrice.effective_to > now)
+    ).limit(1).scalar_subquery()
+    return select(
+        Product.name, Product.description, func.coalesce(in_force, Product.price).label("price"), Category.name.label("category"),
+        Product.station, Product.image_url, Product.is_active
+    ).join(Category, Category.id == Product.category_id).where(Product.store_id == store_id).order_by(Product.id)
+
+TABLES: Dict[str, BulkTable] = {
+    "categories": BulkTable(
+        CategoryRow, lambda row: row.name, None, import_categories,
+        lambda store_id: select(Category.name, Category.description, Category.image_url, Category.is_active).order_by(Category.id),
+        ("name", "description", "image_url", "is_active"),
+    ),
+    "products": BulkTable(
+        ProductRow, lambda row: row.name, check_products, import_products, _product_query,
+        ("name", "description", "price", "category", "station", "image_url", "is_active"),
+    ),
+    "customers": BulkTable(
+        CustomerRow, lambda row: row.id, check_customers, import_customers,
+        lambda store_id: select(
+            Customer.id, Customer.customer_name, Customer.phone, Customer.address, Customer.city,
+            Customer.sort_order, Customer.is_active
+        ).where(Customer.store_id == store_id).order_by(Customer.id),
+        ("id", "customer_name", "phone", "address", "city", "sort_order", "is_active"),
+    ),
+    "payment_methods": BulkTable(
+        PaymentMethodRow, lambda row: row.payment_method_code, check_payment_methods, import_payment_methods,
+        lambda store_id: select(
+            PaymentMethod.payment_method_code, PaymentMethod.name, PaymentMethod.description, PaymentMethod.is_active
+        ).where(payment_methods_in(store_id)).order_by(PaymentMethod.id),
+        ("payment_method_code", "name", "description", "is_active"),
+    ),
+}
+
+def import_rows(db: Session, table: str, rows: List[dict], store_id: int, user_id: int = None,
+                dry_run: bool = False, owner: bool = False) -> ImportResult:
+    """Validate every row, then write them all in one transaction.
+
+    Raises ImportErrors with the per-row problems, before anything is
+    written, if any row is invalid. Rows are upserted on their natural key
+    in multi-row statements of IMPORT_BATCH_ROWS. `owner` lets rows change
+    what is shared by all stores.
+    """
+    spec = TABLES[table]
+    valid, errors = _validate(rows, spec.row_model)
+    errors += _duplicates(valid, spec.key)
+    if spec.check:
+        errors += spec.check(db, valid, store_id, owner)
+    if errors:
+        raise ImportErrors(sorted(errors, key=lambda error: error["row"]))
+    if dry_run:
+        return ImportResult(0, 0)
+
+    stamp = datetime.utcnow().replace(microsecond=0)
+    try:
+        result = spec.write(db, valid, store_id, user_id, stamp)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return result
+
+def import_upload(db: Session, table: str, file: UploadFile, store_id: int, user_id: int, dry_run: bool,
+                  owner: bool = False) -> dict:
+    """The import endpoints' body: read, parse, import and answer or raise 413/400/422."""
+    data = file.file.read(settings.import_max_bytes + 1)
+    if len(data) > settings.import_max_bytes:
+        raise HTTPException(status_code=413, detail="File is too large")
+    name = (file.filename or "").lower()
+    file_format = "json" if name.endswith(".json") or file.content_type == "application/json" else "csv"
+    rows = parse_rows(data, file_format)
+    if not rows:
+        raise HTTPException(status_code=400, detail="Empty file")
+    try:
+        result = import_rows(db, table, rows, store_id, user_id, dry_run, owner)
+    except ImportErrors as e:
+        raise HTTPException(status_code=422, detail={
+            "message": f"{len(e.errors)} row(s) have errors; nothing was imported",
+            "errors": e.errors[:MAX_REPORTED_ERRORS],
+        })
+    if dry_run:
+        return {"message": f"{len(rows)} row(s) are valid", "rows": len(rows)}
+    return {"message": "Import completed successfully", "inserted": result.inserted, "updated": result.updated}
+
+def _cell(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return "" if value is None else value
+
+def _json_value(value):
+    return str(value) if isinstance(value, Decimal) else value
+
+def export_chunks(table: str, store_id: int, file_format: str) -> Iterator[str]:
+    """The table as CSV or a JSON array, a chunk of rows at a time.
+
+    Uses its own session so the stream does not depend on the request's.
+    """
+    spec = TABLES[table]
+    db = SessionLocal()
+    try:
+        result = db.execute(spec.query(store_id).execution_options(yield_per=settings.import_batch_rows))
+        if file_format == "json":
+            yield "["
+        else:
+            buffer = io.StringIO()
+            csv.writer(buffer).writerow(spec.columns)
+            yield buffer.getvalue()
+        first = True
+        for partition in result.partitions():
+            if file_format == "json":
+                text = ",".join(
+                    json.dumps({column: _json_value(value) for column, value in zip(spec.columns, row)}, default=str)
+                    for row in partition
+                )
+                yield ("" if first else ",") + text
+            else:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows([_cell(value) for value in row] for row in partition)
+                yield buffer.getvalue()
+            first = False
+        if file_format == "json":
+            yield "]"
+    finally:
+        db.close()
+
+class _HeldStreamingResponse(StreamingResponse):
+    # Keeps the export's admission slot until the body is sent or the client leaves
+    def __init__(self, content, slot: HeldSlot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+        slot.handed_over = True
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+def export_response(table: str, store_id: int, file_format: str, slot: HeldSlot) -> StreamingResponse:
+    media_type = "application/json" if file_format == "json" else "text/csv; charset=utf-8"
+    return _HeldStreamingResponse(
+        export_chunks(table, store_id, file_format),
+        slot,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{file_format}"'},
+    )
@@ -0,0 +1,159 @@
+import zlib
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:
+    # Optional; without it every client that asks for compression gets gzip
+    brotli = None
+
+# Bodies of these types are compressed already or too small to matter
+SKIPPED_CONTENT_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip", "font/woff")
+
+def _accepted(accept_encoding: str) -> dict:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    return accepted
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = _accepted(accept_encoding)
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            compressor = brotli.Compressor(quality=brotli_quality)
+            self._compress = compressor.process
+            self._sync = compressor.flush
+            self._finish = compressor.finish
+        else:
+            # gzip framing (wbits 16+) written incrementally
+            compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self._compress = compressor.compress
+            self._sync = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            self._finish = compressor.flush
+
+    def compress(self, data: bytes, sync: bool = False) -> bytes:
+        # Sync flushing keeps a streamed response moving chunk by chunk
+        compressed = self._compress(data)
+        return compressed + self._sync() if sync else compressed
+
+    def finish(self) -> bytes:
+        return self._finish()
+
+class CompressionMiddleware:
+    """gzip or brotli for responses of at least minimum_size bytes.
+
+    Pure ASGI so streaming responses stay streamed. Responses that already
+    carry a Content-Encoding, media bodies and 204/304 answers go out as they
+    are.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = choose_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(send, encoding, self)
+        await self.app(scope, receive, responder.send)
+
+class _CompressingResponder:
+    def __init__(self, send, encoding: str, config: CompressionMiddleware):
+        self._send = send
+        self._encoding = encoding
+        self._config = config
+        self._start = None
+        # None until the first body chunk decides; then True or False
+        self._compressing = None
+        self._compressor = None
+
+    def _compressible(self, headers: list) -> bool:
+        if self._start["status"] in (204, 304) or self._start["status"] < 200:
+            return False
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type" and value.decode("latin-1").startswith(SKIPPED_CONTENT_TYPES):
+                return False
+        return True
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            # Held back until the first chunk shows whether to compress
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self._compressing is None:
+            headers = list(self._start.get("headers", []))
+            self._compressing = self._compressible(headers) and (
+                more_body or len(body) >= self._config.minimum_size
+            )
+            if not self._compressing:
+                await self._send(self._start)
+                await self._send(message)
+                return
+
+            self._compressor = _Compressor(self._encoding, self._config.gzip_level, self._config.brotli_quality)
+            headers = [(name, value) for name, value in headers if name not in (b"content-length", b"vary")]
+            vary = [value for name, value in self._start.get("headers", []) if name == b"vary"]
+            headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+            headers.append((b"content-encoding", self._encoding.encode()))
+            # A strong ETag names the uncompressed bytes; weak ones still hold
+            headers = [
+                (name, value if name != b"etag" or value.startswith(b"W/") else b"W/" + value)
+                for name, value in headers
+            ]
+
+            if not more_body:
+                compressed = self._compressor.compress(body) + self._compressor.finish()
+                headers.append((b"content-length", str(len(compressed)).encode()))
+                await self._send({**self._start, "headers": headers})
+                await self._send({"type": "http.response.body", "body": compressed})
+                return
+            await self._send({**self._start, "headers": headers})
+
+        if not self._compressing:
+            await self._send(message)
+            return
+
+        if more_body:
+            chunk = self._compressor.compress(body, sync=True)
+        else:
+            chunk = self._compressor.compress(body) + self._compressor.finish()
+        await self._send({"type": "http.response.body", "body": chunk, "more_body": more_body})
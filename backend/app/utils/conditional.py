@@ -0,0 +1,56 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+# DATETIME columns keep whole seconds, so two changes inside one second can
+# share a timestamp; lists changed that recently are sent without validators
+TIMESTAMP_RESOLUTION = timedelta(seconds=1)
+
+def weak_etag(*parts) -> str:
+    # Built from the newest updated_at and row count of what a list shows,
+    # not from the body, so it is known before the list is loaded
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes are ignored on both sides
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None
+) -> Optional[Response]:
+    """Set validators on the response; return a 304 if the client is current.
+
+    Only If-None-Match is honoured. Deleted rows do not move the newest
+    updated_at, so If-Modified-Since alone could answer 304 for a list that
+    lost rows; the ETag also covers the row count.
+    """
+    if last_modified is not None and datetime.utcnow() - last_modified < TIMESTAMP_RESOLUTION:
+        return None
+
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        # Stored times are naive UTC
+        headers["Last-Modified"] = format_datetime(
+            last_modified.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True
+        )
+    response.headers.update(headers)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return None
@@ -0,0 +1,164 @@
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..config.settings import settings
+from ..models.models import Product
+from .archive import order_items_between
+from .shop_settings import ShopSettings
+
+HOURS = 24
+# Pseudo-observations pulling sparse weekday and hour estimates towards the
+# product's overall average, so one odd Tuesday does not set next Tuesday
+WEEKDAY_PRIOR_DAYS = 2.0
+HOUR_PRIOR_UNITS = 24.0
+
+class ForecastModel(NamedTuple):
+    product_ids: np.ndarray
+    # Last business day the model has seen
+    trained_through: date
+    # Deseasonalised daily level at trained_through and its change per day
+    level: np.ndarray
+    slope: np.ndarray
+    # (products, 7) multiplier per weekday, Monday first
+    weekday_factor: np.ndarray
+    # (products, 7, 24) share of a weekday's sales in each local hour
+    hour_share: np.ndarray
+
+    def predict(self, day: date) -> np.ndarray:
+        """Expected units per product and local hour on a business day, shape (products, 24)."""
+        horizon = (day - self.trained_through).days
+        daily = np.maximum(self.level + self.slope * horizon, 0) * self.weekday_factor[:, day.weekday()]
+        return daily[:, None] * self.hour_share[:, day.weekday(), :]
+
+def load_sales(db: Session, shop: ShopSettings, start: date, end: date):
+    """Units sold per product, business day and local hour for days in [start, end).
+
+    Returns (product_ids, sales) with sales shaped (products, days, 24). Lines
+    are streamed in chunks and binned with numpy; only the distinct UTC hours
+    go through the timezone conversion.
+    """
+    product_ids = np.array(sorted(row.id for row in db.query(Product.id).all()), dtype=np.int64)
+    sales = np.zeros((len(product_ids), (end - start).days, HOURS), dtype=np.float64)
+    if not len(product_ids) or not sales.shape[1]:
+        return product_ids, sales
+
+    items = order_items_between(db, shop.day_start(start), shop.day_start(end))
+    query = select(items.c.product_id, items.c.created_at, items.c.quantity).where(items.c.status != "cancelled")
+    result = db.execute(query.execution_options(yield_per=settings.basket_chunk_rows))
+    epoch = datetime(1970, 1, 1)
+    zone = ZoneInfo(shop.timezone)
+    slots = {}
+    for partition in result.partitions():
+        products = np.array([row[0] for row in partition], dtype=np.int64)
+        utc_hours = np.array([row[1] for row in partition], dtype="datetime64[h]").astype(np.int64)
+        quantities = np.array([row[2] for row in partition], dtype=np.float64)
+
+        unique_hours, hour_index = np.unique(utc_hours, return_inverse=True)
+        for hour in unique_hours:
+            if hour not in slots:
+                at = epoch + timedelta(hours=int(hour))
+                local = at.replace(tzinfo=timezone.utc).astimezone(zone)
+                slots[hour] = ((shop.business_date(at) - start).days, local.hour)
+        day_index = np.array([slots[hour][0] for hour in unique_hours])[hour_index]
+        local_hour = np.array([slots[hour][1] for hour in unique_hours])[hour_index]
+
+        columns = np.searchsorted(product_ids, products)
+        keep = (columns < len(product_ids)) & (day_index >= 0) & (day_index < sales.shape[1])
+        keep[keep] = product_ids[columns[keep]] == products[keep]
+        np.add.at(sales, (columns[keep], day_index[keep], local_hour[keep]), quantities[keep])
+    return product_ids, sales
+
+def fit(product_ids: np.ndarray, sales: np.ndarray, start: date) -> ForecastModel:
+    """Weekday x hour profile with a linear trend, fitted for all products at once."""
+    days = sales.shape[1]
+    daily = sales.sum(axis=2)
+    weekdays = (np.arange(days) + start.weekday()) % 7
+    mean = daily.mean(axis=1) if days else np.zeros(len(product_ids))
+
+    weekday_sum = np.stack([daily[:, weekdays == w].sum(axis=1) for w in range(7)], axis=1)
+    weekday_days = np.array([(weekdays == w).sum() for w in range(7)], dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weekday_factor = (weekday_sum + WEEKDAY_PRIOR_DAYS * mean[:, None]) / \
+            ((weekday_days + WEEKDAY_PRIOR_DAYS) * mean[:, None])
+    weekday_factor = np.where(mean[:, None] > 0, weekday_factor, 1.0)
+
+    # Least squares line through the deseasonalised series, all products in one go
+    deseasonalised = daily / weekday_factor[:, weekdays] if days else daily
+    t = np.arange(days, dtype=np.float64)
+    centred = t - t.mean() if days else t
+    spread = centred @ centred
+    slope = deseasonalised @ centred / spread if spread else np.zeros(len(product_ids))
+    level = (deseasonalised.mean(axis=1) if days else np.zeros(len(product_ids))) + slope * (t[-1] - t.mean() if days else 0)
+
+    weekday_hours = np.stack([sales[:, weekdays == w, :].sum(axis=1) for w in range(7)], axis=1)
+    overall_hours = sales.sum(axis=1)
+    overall_total = overall_hours.sum(axis=1, keepdims=True)
+    overall_share = np.divide(overall_hours, overall_total, out=np.full_like(overall_hours, 1.0 / HOURS), where=overall_total > 0)
+    hour_share = (weekday_hours + HOUR_PRIOR_UNITS * overall_share[:, None, :]) / \
+        (weekday_hours.sum(axis=2, keepdims=True) + HOUR_PRIOR_UNITS)
+
+    return ForecastModel(product_ids, start + timedelta(days=days - 1), level, slope, weekday_factor, hour_share)
+
+_model: Optional[ForecastModel] = None
+_model_key = None
+_model_lock = threading.Lock()
+
+def current_model(db: Session, shop: ShopSettings) -> ForecastModel:
+    """Model trained on the finished business days before today.
+
+    Fitted once per business day and settings change in each process; the
+    lock keeps concurrent first requests from all fitting it.
+    """
+    global _model, _model_key
+    today = shop.business_date()
+    key = (today, shop.timezone, shop.report_cutoff_hour)
+    with _model_lock:
+        if _model_key != key:
+            start = today - timedelta(days=settings.forecast_history_days)
+            product_ids, sales = load_sales(db, shop, start, today)
+            _model, _model_key = fit(product_ids, sales, start), key
+        return _model
+
+def backtest(product_ids: np.ndarray, sales: np.ndarray, start: date, test_days: int, history_days: int) -> dict:
+    """Refit before each of the last test_days days and score the next-day forecast.
+
+    Reports WAPE (absolute error over units sold) for the model and for a
+    same-weekday-last-week baseline, plus the average fit time.
+    """
+    days = sales.shape[1]
+    daily = sales.sum(axis=2)
+    model_error = np.zeros(len(product_ids))
+    naive_error = np.zeros(len(product_ids))
+    actual_total = np.zeros(len(product_ids))
+    fit_seconds = []
+    tested = range(max(7, days - test_days), days)
+    for day in tested:
+        first = max(0, day - history_days)
+        began = time.perf_counter()
+        model = fit(product_ids, sales[:, first:day], start + timedelta(days=first))
+        fit_seconds.append(time.perf_counter() - began)
+        predicted = model.predict(start + timedelta(days=day)).sum(axis=1)
+        model_error += np.abs(predicted - daily[:, day])
+        naive_error += np.abs(daily[:, day - 7] - daily[:, day])
+        actual_total += daily[:, day]
+
+    sold = actual_total.sum()
+    return {
+        "days": len(tested),
+        "wape": float(model_error.sum() / sold) if sold else None,
+        "naive_wape": float(naive_error.sum() / sold) if sold else None,
+        "fit_ms": 1000 * float(np.mean(fit_seconds)) if fit_seconds else None,
+        "per_product": {
+            int(product_id): {
+                "sold": float(actual_total[i]),
+                "wape": float(model_error[i] / actual_total[i]) if actual_total[i] else None,
+                "naive_wape": float(naive_error[i] / actual_total[i]) if actual_total[i] else None,
+            }
+            for i, product_id in enumerate(product_ids) if actual_total[i] or model_error[i]
+        },
+    }
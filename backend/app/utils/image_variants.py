@@ -0,0 +1,44 @@
+import os
+
+# Longest edge in pixels of each variant; the tills ask for the one they draw
+VARIANT_SIZES = (128, 256, 512)
+VARIANT_FORMATS = (("WEBP", "webp"), ("JPEG", "jpg"))
+QUALITY = 80
+
+# This module is what the image worker processes import, so it stays free of
+# the app's settings and database modules and Pillow is only loaded here
+
+def variant_name(content_hash: str, size: int, ext: str) -> str:
+    # Sharded by hash prefix; a new upload never reuses a name, so the files
+    # can be cached forever
+    return f"{content_hash[:2]}/{content_hash}-{size}.{ext}"
+
+def original_name(content_hash: str, ext: str) -> str:
+    return f"originals/{content_hash}.{ext}"
+
+def _write_atomic(image, path: str, image_format: str):
+    tmp = path + ".tmp"
+    image.save(tmp, image_format, quality=QUALITY, optimize=True)
+    os.replace(tmp, path)
+
+def render_variants(media_root: str, content_hash: str, ext: str):
+    """Write every size and format of one original. Runs in a worker process."""
+    from PIL import Image, ImageOps
+
+    with Image.open(os.path.join(media_root, original_name(content_hash, ext))) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode in ("RGBA", "LA", "P"):
+            # JPEG has no alpha; flatten transparent product shots onto white
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        else:
+            image = image.convert("RGB")
+
+        os.makedirs(os.path.join(media_root, content_hash[:2]), exist_ok=True)
+        for size in VARIANT_SIZES:
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            for image_format, variant_ext in VARIANT_FORMATS:
+                _write_atomic(variant, os.path.join(media_root, variant_name(content_hash, size, variant_ext)), image_format)
@@ -0,0 +1,163 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..config.database import SessionLocal
+from ..config.settings import settings
+from ..models.models import Image
+from .image_variants import VARIANT_SIZES, variant_name, original_name, render_variants
+
+logger = logging.getLogger(__name__)
+
+# Pillow format name to the extension the original is stored under
+ACCEPTED_FORMATS = {"JPEG": "jpg", "PNG": "png", "WEBP": "webp"}
+
+# A pending image older than this lost its worker (restart or crash)
+STALE_PENDING = timedelta(minutes=5)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def _get_pool() -> ProcessPoolExecutor:
+    # Created on first upload, in the worker that needs it; spawned rather than
+    # forked because the parent already runs threads
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.image_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+def shutdown_image_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def _inspect(data: bytes):
+    from PIL import Image as PILImage, UnidentifiedImageError
+
+    try:
+        with PILImage.open(io.BytesIO(data)) as image:
+            image_format = image.format
+            width, height = image.size
+            image.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        raise HTTPException(status_code=400, detail="File is not a readable image")
+    if image_format not in ACCEPTED_FORMATS:
+        raise HTTPException(status_code=400, detail="Only JPEG, PNG and WebP images are accepted")
+    return ACCEPTED_FORMATS[image_format], width, height
+
+def _set_status(image_id: int, status: str):
+    db = SessionLocal()
+    try:
+        db.query(Image).filter(Image.id == image_id).update({"status": status})
+        db.commit()
+    finally:
+        db.close()
+
+def schedule_variants(image: Image):
+    future = _get_pool().submit(render_variants, settings.media_root, image.content_hash, image.original_ext)
+    image_id = image.id
+
+    def done(future):
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error:
+            logger.error("Resizing image %s failed: %s", image_id, error)
+        _set_status(image_id, "failed" if error else "ready")
+
+    future.add_done_callback(done)
+
+def store_image(db: Session, data: bytes) -> Image:
+    """Save an upload once by content hash and queue its variants.
+
+    Uploading the same file again returns the existing image, and retries its
+    variants if they failed or were never finished.
+    """
+    content_hash = hashlib.sha256(data).hexdigest()
+    existing = db.query(Image).filter(Image.content_hash == content_hash).first()
+    if existing:
+        stale = existing.status == "pending" and existing.created_at < datetime.utcnow() - STALE_PENDING
+        if existing.status == "failed" or stale:
+            existing.status = "pending"
+            db.commit()
+            schedule_variants(existing)
+        return existing
+
+    ext, width, height = _inspect(data)
+    path = os.path.join(settings.media_root, original_name(content_hash, ext))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+    image = Image(content_hash=content_hash, original_ext=ext, width=width, height=height, status="pending")
+    db.add(image)
+    try:
+        db.commit()
+    except IntegrityError:
+        # The same file was uploaded concurrently; its variants are already queued
+        db.rollback()
+        return db.query(Image).filter(Image.content_hash == content_hash).one()
+    db.refresh(image)
+    schedule_variants(image)
+    return image
+
+def _url(name: str) -> str:
+    return f"{settings.media_url}/{name}"
+
+def closest_size(requested: int) -> int:
+    # Smallest variant that still covers the requested size
+    for size in VARIANT_SIZES:
+        if size >= requested:
+            return size
+    return VARIANT_SIZES[-1]
+
+def image_urls(image: Optional[Image], legacy_url: Optional[str], size: int) -> dict:
+    """URLs the catalog returns for one picture at the requested size.
+
+    Until the variants are written the original is returned, and rows that
+    only have a plain image_url keep returning it unchanged.
+    """
+    if image is None:
+        return {"image_url": legacy_url, "image_fallback_url": legacy_url}
+    if image.status != "ready":
+        original = _url(original_name(image.content_hash, image.original_ext))
+        return {"image_url": original, "image_fallback_url": original}
+    size = closest_size(size)
+    return {
+        "image_url": _url(variant_name(image.content_hash, size, "webp")),
+        "image_fallback_url": _url(variant_name(image.content_hash, size, "jpg")),
+    }
+
+def image_response(image: Image) -> dict:
+    response = {
+        "id": image.id,
+        "status": image.status,
+        "width": image.width,
+        "height": image.height,
+        "original_url": _url(original_name(image.content_hash, image.original_ext)),
+    }
+    if image.status == "ready":
+        response["variants"] = {
+            size: {
+                "webp": _url(variant_name(image.content_hash, size, "webp")),
+                "jpg": _url(variant_name(image.content_hash, size, "jpg")),
+            }
+            for size in VARIANT_SIZES
+        }
+    return response
@@ -0,0 +1,91 @@
+from decimal import Decimal
+from typing import Dict, List
+from fastapi import HTTPException
+from sqlalchemy import case, update
+from sqlalchemy.orm import Session
+from ..models.models import Ingredient, RecipeItem
+
+# Order writes take their row locks in one order so two of them never wait on
+# each other crosswise: the open shift (open_shift_id), the order row, the
+# shift's counters, then the ingredients here, then the store's ticket
+# counter. Anything calling consume_stock or restore_stock books its shift
+# counters first and draws a ticket number after.
+
+def ingredient_requirements(db: Session, product_quantities: Dict[int, int]) -> Dict[int, Decimal]:
+    """Total quantity of each ingredient used by the given product quantities."""
+    product_quantities = {pid: qty for pid, qty in product_quantities.items() if qty}
+    if not product_quantities:
+        return {}
+
+    rows = db.query(RecipeItem.product_id, RecipeItem.ingredient_id, RecipeItem.quantity).filter(
+        RecipeItem.product_id.in_(list(product_quantities))
+    ).all()
+
+    requirements = {}
+    for row in rows:
+        needed = Decimal(row.quantity) * product_quantities[row.product_id]
+        requirements[row.ingredient_id] = requirements.get(row.ingredient_id, Decimal(0)) + needed
+    return {iid: qty for iid, qty in requirements.items() if qty}
+
+def _per_ingredient(requirements: Dict[int, Decimal]):
+    return case(
+        {iid: qty for iid, qty in requirements.items()},
+        value=Ingredient.id,
+        else_=0
+    )
+
+def consume_stock(db: Session, requirements: Dict[int, Decimal]):
+    """Take ingredients out of stock, or fail without touching any of them.
+
+    A single UPDATE decrements every ingredient whose stock covers what is
+    needed. InnoDB locks the rows in primary key order, so concurrent orders
+    never wait on each other in opposite orders, and a short row count means
+    at least one ingredient ran out, in which case the transaction is rolled
+    back and a 409 is raised.
+    """
+    if not requirements:
+        return
+
+    needed = _per_ingredient(requirements)
+    result = db.execute(
+        update(Ingredient)
+        .where(Ingredient.id.in_(sorted(requirements)), Ingredient.stock >= needed)
+        .values(stock=Ingredient.stock - needed)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != len(requirements):
+        # Undo the ingredients that were decremented before naming the short ones
+        db.rollback()
+        short = db.query(Ingredient.name).filter(
+            Ingredient.id.in_(list(requirements)),
+            Ingredient.stock < _per_ingredient(requirements)
+        ).all()
+        raise HTTPException(
+            status_code=409,
+            detail="Not enough stock: " + ", ".join(row.name for row in short)
+        )
+
+def restore_stock(db: Session, requirements: Dict[int, Decimal]):
+    if not requirements:
+        return
+
+    needed = _per_ingredient(requirements)
+    db.execute(
+        update(Ingredient)
+        .where(Ingredient.id.in_(sorted(requirements)))
+        .values(stock=Ingredient.stock + needed)
+        .execution_options(synchronize_session=False)
+    )
+
+def product_quantities(items) -> Dict[int, int]:
+    quantities = {}
+    for item in items:
+        quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+    return quantities
+
+def low_stock(db: Session, store_id: int) -> List[Ingredient]:
+    return db.query(Ingredient).filter(
+        Ingredient.store_id == store_id,
+        Ingredient.is_active == True,
+        Ingredient.stock <= Ingredient.low_stock_threshold
+    ).order_by(Ingredient.stock - Ingredient.low_stock_threshold).all()
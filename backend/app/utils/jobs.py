@@ -0,0 +1,175 @@
+import logging
+import random
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from sqlalchemy import func, or_, and_, update, delete
+from sqlalchemy.orm import Session
+from ..config.database import SessionLocal
+from ..config.settings import settings
+from ..models.models import Job
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+HANDLERS: Dict[str, Callable[[Session, dict], None]] = {}
+
+jobs_processed = metrics.counter(
+    "pos_jobs_processed_total", "Jobs finished by this worker process", ("kind", "outcome")
+)
+queue_depth = metrics.gauge(
+    "pos_job_queue_depth", "Jobs waiting in the outbox by status", ("status",)
+)
+oldest_queued = metrics.gauge(
+    "pos_job_oldest_queued_seconds", "Age of the oldest job that is due but not yet picked up"
+)
+
+def job_handler(kind: str):
+    def register(handler):
+        HANDLERS[kind] = handler
+        return handler
+    return register
+
+def enqueue(db: Session, kind: str, payload: dict, delay_seconds: float = 0):
+    """Add a job to the caller's transaction; it exists only if that commits."""
+    db.add(Job(
+        kind=kind,
+        payload=payload,
+        status="queued",
+        run_at=datetime.utcnow() + timedelta(seconds=delay_seconds)
+    ))
+
+def backoff_seconds(attempts: int) -> float:
+    # Exponential with jitter so jobs failing together do not retry together
+    delay = min(settings.job_backoff_seconds * 2 ** (attempts - 1), settings.job_backoff_max_seconds)
+    return delay * random.uniform(0.8, 1.2)
+
+def claim_job(db: Session) -> Optional[Job]:
+    """Take the next due job, or one whose worker died mid-run.
+
+    SKIP LOCKED lets several workers pull from the head of the queue without
+    waiting on each other; the conditional UPDATE makes the claim safe on
+    databases that ignore the lock hint.
+    """
+    now = datetime.utcnow()
+    claimable = or_(
+        and_(Job.status == "queued", Job.run_at <= now),
+        and_(Job.status == "running", Job.locked_at < now - timedelta(seconds=settings.job_lease_seconds)),
+    )
+    candidate = db.query(Job.id, Job.status).filter(claimable).order_by(Job.run_at).limit(1) \
+        .with_for_update(skip_locked=True).first()
+    if not candidate:
+        db.rollback()
+        return None
+
+    result = db.execute(
+        update(Job)
+        .where(Job.id == candidate.id, Job.status == candidate.status)
+        .values(status="running", locked_at=now, attempts=Job.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if result.rowcount == 0:
+        return None
+    return db.query(Job).filter(Job.id == candidate.id).first()
+
+def run_job(job_id: int, kind: str, payload: dict, attempts: int):
+    handler = HANDLERS.get(kind)
+    db = SessionLocal()
+    try:
+        if handler is None:
+            raise LookupError(f"No handler for job kind {kind!r}")
+        handler(db, payload)
+        db.query(Job).filter(Job.id == job_id).update({"status": "done", "last_error": None})
+        db.commit()
+        jobs_processed.inc(kind=kind, outcome="done")
+    except Exception as e:
+        db.rollback()
+        final = attempts >= settings.job_max_attempts
+        logger.warning("Job %s (%s) attempt %d failed: %s", job_id, kind, attempts, e)
+        db.query(Job).filter(Job.id == job_id).update({
+            "status": "failed" if final else "queued",
+            "run_at": datetime.utcnow() + timedelta(seconds=0 if final else backoff_seconds(attempts)),
+            "last_error": str(e)[:2000],
+        })
+        db.commit()
+        jobs_processed.inc(kind=kind, outcome="failed" if final else "retry")
+    finally:
+        db.close()
+
+def purge_done(db: Session, older_than: datetime) -> int:
+    result = db.execute(delete(Job).where(Job.status == "done", Job.updated_at < older_than))
+    db.commit()
+    return result.rowcount
+
+def collect_queue_metrics():
+    db = SessionLocal()
+    try:
+        counts = dict(db.query(Job.status, func.count(Job.id)).filter(
+            Job.status != "done"
+        ).group_by(Job.status).all())
+        for status in ("queued", "running", "failed"):
+            queue_depth.set(counts.get(status, 0), status=status)
+        oldest = db.query(func.min(Job.run_at)).filter(
+            Job.status == "queued", Job.run_at <= datetime.utcnow()
+        ).scalar()
+        oldest_queued.set(round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else 0)
+    finally:
+        db.close()
+
+metrics.register_collector(collect_queue_metrics)
+
+class JobWorkers:
+    """Threads that drain the outbox inside one process.
+
+    Each gunicorn worker may run its own; claims are exclusive, so any number
+    of them (and scripts/run_jobs.py) can share the queue.
+    """
+
+    def __init__(self, threads: int, poll_seconds: float):
+        self.threads = threads
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._workers = []
+
+    def start(self):
+        for n in range(self.threads):
+            worker = threading.Thread(target=self._loop, name=f"job-worker-{n}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def notify(self):
+        # New work was committed in this process; skip the rest of the poll wait
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def run_once(self) -> bool:
+        db = SessionLocal()
+        try:
+            job = claim_job(db)
+            if job is None:
+                return False
+            job_id, kind, payload, attempts = job.id, job.kind, job.payload, job.attempts
+        finally:
+            db.close()
+        run_job(job_id, kind, payload, attempts)
+        return True
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_once():
+                    continue
+            except Exception:
+                logger.exception("Job worker could not claim a job")
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+job_workers = JobWorkers(settings.job_workers, settings.job_poll_seconds)
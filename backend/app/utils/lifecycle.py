@@ -0,0 +1,83 @@
+import asyncio
+import signal
+import logging
+from fastapi import HTTPException, status
+from sqlalchemy import text
+from ..config.database import engine
+
+logger = logging.getLogger(__name__)
+
+class InFlightTracker:
+    """Counts requests that must finish before the worker exits."""
+
+    def __init__(self):
+        self.count = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def enter(self):
+        self.count += 1
+        self._idle.clear()
+
+    def exit(self):
+        self.count -= 1
+        if self.count == 0:
+            self._idle.set()
+
+    async def wait_idle(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+order_writes = InFlightTracker()
+
+async def guard_order_write():
+    # Refuse new orders once draining so the till retries on another worker,
+    # and keep shutdown waiting until the ones already accepted are committed
+    if order_writes.draining:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is restarting, please retry",
+            headers={"Retry-After": "1"},
+        )
+    order_writes.enter()
+    try:
+        yield
+    finally:
+        order_writes.exit()
+
+def install_drain_handler(tracker: InFlightTracker = order_writes):
+    # Chain in front of the server's own SIGTERM handler, which stops accepting
+    # connections; /readyz starts failing as soon as the signal arrives
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def handle_sigterm(signum, frame):
+        tracker.draining = True
+        logger.info("SIGTERM received, draining %d in-flight order(s)", tracker.count)
+        if callable(previous):
+            previous(signum, frame)
+
+    try:
+        signal.signal(signal.SIGTERM, handle_sigterm)
+    except ValueError:
+        # Not running in the main thread (e.g. under a test client)
+        pass
+
+def ping_database():
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+def pool_status() -> dict:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"checked_out": None, "capacity": None, "exhausted": False}
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    checked_out = pool.checkedout()
+    return {
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "exhausted": checked_out >= capacity,
+    }
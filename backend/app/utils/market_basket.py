@@ -0,0 +1,147 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Iterator, List
+import numpy as np
+from scipy import sparse
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from ..config.settings import settings
+from ..models.models import BasketDay, BasketDayCount, Product, ProductAssociation
+from .archive import order_items_between
+from .shop_settings import ShopSettings
+
+logger = logging.getLogger(__name__)
+
+def _order_product_chunks(db: Session, start: datetime, end: datetime) -> Iterator[np.ndarray]:
+    """(order_id, product_id) pairs of the range, sorted by order, streamed in chunks."""
+    items = order_items_between(db, start, end)
+    query = select(items.c.order_id, items.c.product_id).where(
+        items.c.status != "cancelled"
+    ).distinct().order_by(items.c.order_id, items.c.product_id)
+    result = db.execute(query.execution_options(yield_per=settings.basket_chunk_rows))
+    for partition in result.partitions():
+        yield np.array(partition, dtype=np.int64).reshape(-1, 2)
+
+def _accumulate(rows: np.ndarray, product_ids: np.ndarray, totals: np.ndarray) -> int:
+    """Add the co-occurrence counts of complete orders in rows; returns the order count."""
+    if not len(rows):
+        return 0
+    order_ids, order_index = np.unique(rows[:, 0], return_inverse=True)
+    columns = np.searchsorted(product_ids, rows[:, 1])
+    known = columns < len(product_ids)
+    known[known] = product_ids[columns[known]] == rows[known, 1]
+    # Orders x products, one per line; B^T B counts orders per product pair
+    basket = sparse.csr_matrix(
+        (np.ones(known.sum(), dtype=np.int64), (order_index[known], columns[known])),
+        shape=(len(order_ids), len(product_ids))
+    )
+    pairs = (basket.T @ basket).tocoo()
+    np.add.at(totals, (pairs.row, pairs.col), pairs.data)
+    return len(order_ids)
+
+def count_day(db: Session, shop: ShopSettings, day: date, product_ids: np.ndarray):
+    """Pair counts of one business day as a products x products matrix.
+
+    Memory is one chunk of order lines plus the matrix, whatever the day's
+    volume. A chunk ends mid-order, so the last order is carried into the
+    next chunk.
+    """
+    totals = np.zeros((len(product_ids), len(product_ids)), dtype=np.int64)
+    orders = 0
+    carry = np.empty((0, 2), dtype=np.int64)
+    for chunk in _order_product_chunks(db, shop.day_start(day), shop.day_start(day + timedelta(days=1))):
+        rows = np.concatenate([carry, chunk])
+        split = np.searchsorted(rows[:, 0], rows[-1, 0])
+        carry = rows[split:]
+        orders += _accumulate(rows[:split], product_ids, totals)
+    orders += _accumulate(carry, product_ids, totals)
+    return totals, orders
+
+def update_days(db: Session, shop: ShopSettings, days: List[date], recompute: bool = False) -> List[date]:
+    """Fold finished business days into basket_day_counts, one transaction per day."""
+    today = shop.business_date()
+    done = {row.day for row in db.query(BasketDay.day).filter(BasketDay.day.in_(days)).all()}
+    product_ids = np.array(sorted(row.id for row in db.query(Product.id).all()), dtype=np.int64)
+
+    updated = []
+    for day in sorted(days):
+        if day >= today or (day in done and not recompute):
+            continue
+        totals, orders = count_day(db, shop, day, product_ids)
+        first, second = np.nonzero(np.triu(totals))
+        db.execute(delete(BasketDayCount).where(BasketDayCount.day == day))
+        db.execute(delete(BasketDay).where(BasketDay.day == day))
+        if len(first):
+            db.execute(insert(BasketDayCount.__table__), [
+                {"day": day, "product_a": int(product_ids[a]), "product_b": int(product_ids[b]), "orders": int(totals[a, b])}
+                for a, b in zip(first, second)
+            ])
+        db.add(BasketDay(day=day, orders=orders))
+        db.commit()
+        updated.append(day)
+        logger.info("Basket counts for %s: %d orders, %d pairs", day, orders, len(first))
+    return updated
+
+def rebuild_associations(db: Session, shop: ShopSettings, window_days: int = None, top_n: int = None,
+                         min_pair_orders: int = None) -> int:
+    """Replace product_associations with the top pairs of the last window_days.
+
+    For a product A and a companion B: support is the share of orders with
+    both, confidence the share of A's orders that also have B, and lift
+    the confidence over B's overall share. Only companions with lift above 1
+    are kept, best confidence first.
+    """
+    window_days = window_days or settings.basket_window_days
+    top_n = top_n or settings.basket_top_n
+    min_pair_orders = min_pair_orders or settings.basket_min_pair_orders
+    end = shop.business_date()
+    start = end - timedelta(days=window_days)
+    in_window = (BasketDayCount.day >= start, BasketDayCount.day < end)
+
+    total_orders = db.query(func.sum(BasketDay.orders)).filter(BasketDay.day >= start, BasketDay.day < end).scalar() or 0
+    counts = np.array(db.query(
+        BasketDayCount.product_a, BasketDayCount.product_b, func.sum(BasketDayCount.orders)
+    ).filter(*in_window).group_by(BasketDayCount.product_a, BasketDayCount.product_b).all(), dtype=np.int64).reshape(-1, 3)
+
+    rows = []
+    if total_orders and len(counts):
+        product_ids = np.unique(counts[:, :2])
+        singles = counts[counts[:, 0] == counts[:, 1]]
+        product_orders = np.zeros(len(product_ids), dtype=np.int64)
+        product_orders[np.searchsorted(product_ids, singles[:, 0])] = singles[:, 2]
+
+        pairs = counts[(counts[:, 0] != counts[:, 1]) & (counts[:, 2] >= min_pair_orders)]
+        # Every pair in both directions: A -> B and B -> A
+        source = np.concatenate([pairs[:, 0], pairs[:, 1]])
+        target = np.concatenate([pairs[:, 1], pairs[:, 0]])
+        together = np.concatenate([pairs[:, 2], pairs[:, 2]]).astype(np.float64)
+        support = together / total_orders
+        confidence = together / product_orders[np.searchsorted(product_ids, source)]
+        lift = confidence / (product_orders[np.searchsorted(product_ids, target)] / total_orders)
+
+        keep = lift > 1
+        source, target, together = source[keep], target[keep], together[keep]
+        support, confidence, lift = support[keep], confidence[keep], lift[keep]
+        order = np.lexsort((-lift, -confidence, source))
+        grouped = source[order]
+        position = np.arange(len(order)) - np.searchsorted(grouped, grouped, side="left")
+        now = datetime.utcnow()
+        rows = [
+            {
+                "product_id": int(source[i]),
+                "associated_product_id": int(target[i]),
+                "position": int(p) + 1,
+                "orders": int(together[i]),
+                "support": float(support[i]),
+                "confidence": float(confidence[i]),
+                "lift": float(lift[i]),
+                "computed_at": now
+            }
+            for i, p in zip(order, position) if p < top_n
+        ]
+
+    db.execute(delete(ProductAssociation))
+    if rows:
+        db.execute(insert(ProductAssociation.__table__), rows)
+    db.commit()
+    return len(rows)
@@ -0,0 +1,73 @@
+import threading
+from typing import Callable, Dict, List, Tuple
+
+# Minimal Prometheus text exposition. Counters live in this worker process;
+# collectors are called at scrape time for values read from the database.
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with self._lock:
+            return list(self._values.items())
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+_metrics: List[_Metric] = []
+_collectors: List[Callable[[], None]] = []
+
+def counter(name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Counter:
+    metric = Counter(name, help_text, labels)
+    _metrics.append(metric)
+    return metric
+
+def gauge(name: str, help_text: str, labels: Tuple[str, ...] = ()) -> Gauge:
+    metric = Gauge(name, help_text, labels)
+    _metrics.append(metric)
+    return metric
+
+def register_collector(collect: Callable[[], None]):
+    # Called before every scrape to refresh gauges that are not kept live
+    _collectors.append(collect)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render() -> str:
+    for collect in _collectors:
+        collect()
+
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for key, value in sorted(metric.samples()):
+            if metric.labels:
+                labels = ",".join(f'{label}="{_escape(v)}"' for label, v in zip(metric.labels, key))
+                lines.append(f"{metric.name}{{{labels}}} {value}")
+            else:
+                lines.append(f"{metric.name} {value}")
+    return "\n".join(lines) + "\n"
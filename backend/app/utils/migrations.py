@@ -0,0 +1,256 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, UniqueConstraint, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from ..models.models import Base, DEFAULT_STORE_ID, Store
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "models" / "migrations"
+
+# Migrations up to this version were applied by hand before versioning existed
+LEGACY_BASELINE_VERSION = 3
+
+_migration_metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations",
+    _migration_metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("name", String(255), nullable=False),
+    Column("checksum", String(64), nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+_FILENAME_RE = re.compile(r"^(\d+)_(\w+)\.sql$")
+_CREATE_INDEX_RE = re.compile(
+    r"^CREATE\s+(?:UNIQUE\s+)?INDEX\s+`?(\w+)`?\s+ON\s+`?(\w+)`?", re.IGNORECASE
+)
+_DROP_INDEX_RE = re.compile(
+    r"^DROP\s+INDEX\s+`?(\w+)`?\s+ON\s+`?(\w+)`?\s*$", re.IGNORECASE
+)
+_ONLINE_DDL_RE = re.compile(r"\bALGORITHM\s*=|\bLOCK\s*=", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.path.read_bytes()).hexdigest()
+
+
+@dataclass(frozen=True)
+class RedundantIndex:
+    table: str
+    index: str
+    columns: Tuple[str, ...]
+    covered_by: str
+    reason: str
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> List[Migration]:
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        match = _FILENAME_RE.match(path.name)
+        if not match:
+            raise ValueError(f"Migration file {path.name} must be named <version>_<name>.sql")
+        migrations.append(Migration(int(match.group(1)), match.group(2), path))
+
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration versions in " + str(directory))
+    return sorted(migrations, key=lambda m: m.version)
+
+
+def split_statements(sql: str) -> List[str]:
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def applied_versions(conn: Connection) -> dict:
+    if not inspect(conn).has_table(schema_migrations.name):
+        return {}
+    rows = conn.execute(select(schema_migrations.c.version, schema_migrations.c.checksum))
+    return {row.version: row.checksum for row in rows}
+
+
+def pending_migrations(conn: Connection) -> List[Migration]:
+    applied = applied_versions(conn)
+    return [m for m in discover_migrations() if m.version not in applied]
+
+
+def _index_names(conn: Connection, table: str) -> set:
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return set()
+    names = {ix["name"] for ix in inspector.get_indexes(table)}
+    names.update(uc["name"] for uc in inspector.get_unique_constraints(table) if uc["name"])
+    return names
+
+
+def _prepare_statement(conn: Connection, statement: str) -> Optional[str]:
+    # Index DDL is made idempotent and, on MySQL, online so that a partially
+    # applied migration can be re-run and writes are not blocked while it runs
+    create = _CREATE_INDEX_RE.match(statement)
+    drop = _DROP_INDEX_RE.match(statement)
+    if not create and not drop:
+        return statement
+
+    index, table = (create or drop).groups()
+    exists = index in _index_names(conn, table)
+    if (create and exists) or (drop and not exists):
+        return None
+
+    dialect = conn.dialect.name
+    if dialect == "mysql" and not _ONLINE_DDL_RE.search(statement):
+        return f"{statement} ALGORITHM=INPLACE LOCK=NONE"
+    if dialect == "sqlite" and drop:
+        return f"DROP INDEX {index}"
+    return statement
+
+
+def _record(conn: Connection, migration: Migration):
+    conn.execute(schema_migrations.insert().values(
+        version=migration.version,
+        name=migration.name,
+        checksum=migration.checksum,
+        applied_at=datetime.utcnow(),
+    ))
+
+
+def apply_migration(conn: Connection, migration: Migration):
+    for statement in split_statements(migration.sql):
+        prepared = _prepare_statement(conn, statement)
+        if prepared is not None:
+            conn.execute(text(prepared))
+    _record(conn, migration)
+
+
+def stamp(engine: Engine, up_to: int) -> List[Migration]:
+    """Mark migrations as applied without running them."""
+    with engine.begin() as conn:
+        _migration_metadata.create_all(conn)
+        applied = applied_versions(conn)
+        stamped = [m for m in discover_migrations() if m.version <= up_to and m.version not in applied]
+        for migration in stamped:
+            _record(conn, migration)
+    return stamped
+
+
+def upgrade(engine: Engine) -> Tuple[List[Migration], List[Migration]]:
+    """Bring the database schema to the latest migration.
+
+    An empty database is created from the models, which always describe the
+    latest schema, and every migration is stamped. A database that predates
+    versioning gets the legacy migrations stamped before the rest are applied.
+    Returns the migrations that ran and those only stamped, in that order.
+    """
+    with engine.connect() as conn:
+        inspector = inspect(conn)
+        versioned = inspector.has_table(schema_migrations.name)
+        empty = not any(inspector.has_table(t) for t in Base.metadata.tables)
+
+    migrations = discover_migrations()
+    if not versioned and empty:
+        with engine.begin() as conn:
+            Base.metadata.create_all(conn)
+            # Seed rows the migrations insert for existing databases
+            conn.execute(Store.__table__.insert().values(id=DEFAULT_STORE_ID, code="main", name="Main store"))
+        return [], stamp(engine, migrations[-1].version if migrations else 0)
+
+    stamped = [] if versioned else stamp(engine, LEGACY_BASELINE_VERSION)
+
+    applied = []
+    for migration in migrations:
+        with engine.begin() as conn:
+            if migration.version in applied_versions(conn):
+                continue
+            apply_migration(conn, migration)
+        applied.append(migration)
+    return applied, stamped
+
+
+def modified_migrations(conn: Connection) -> List[Migration]:
+    applied = applied_versions(conn)
+    return [
+        m for m in discover_migrations()
+        if m.version in applied and applied[m.version] != m.checksum
+    ]
+
+
+def metadata_indexes(metadata=Base.metadata) -> List[Tuple[str, str, Tuple[str, ...], bool]]:
+    indexes = []
+    for table in metadata.sorted_tables:
+        pk = tuple(c.name for c in table.primary_key.columns)
+        if pk:
+            indexes.append((table.name, "PRIMARY", pk, True))
+        for index in table.indexes:
+            indexes.append((table.name, index.name, tuple(c.name for c in index.columns), bool(index.unique)))
+        for constraint in table.constraints:
+            if isinstance(constraint, UniqueConstraint):
+                columns = tuple(c.name for c in constraint.columns)
+                indexes.append((table.name, constraint.name or "_".join(columns), columns, True))
+    return indexes
+
+
+def database_indexes(conn: Connection) -> List[Tuple[str, str, Tuple[str, ...], bool]]:
+    inspector = inspect(conn)
+    indexes = []
+    for table in inspector.get_table_names():
+        pk = tuple(inspector.get_pk_constraint(table).get("constrained_columns") or ())
+        if pk:
+            indexes.append((table, "PRIMARY", pk, True))
+        seen = set()
+        for index in inspector.get_indexes(table):
+            seen.add(index["name"])
+            indexes.append((table, index["name"], tuple(index["column_names"]), bool(index["unique"])))
+        for constraint in inspector.get_unique_constraints(table):
+            columns = tuple(constraint["column_names"])
+            name = constraint["name"] or "_".join(columns)
+            if name not in seen:
+                indexes.append((table, name, columns, True))
+    return indexes
+
+
+def find_redundant_indexes(indexes: Iterable[Tuple[str, str, Tuple[str, ...], bool]]) -> List[RedundantIndex]:
+    """Report indexes whose columns are a leftmost prefix of another index.
+
+    Unique indexes are only redundant when an index with exactly the same
+    columns is itself unique, since the uniqueness is otherwise lost.
+    """
+    by_table = {}
+    for table, name, columns, unique in indexes:
+        by_table.setdefault(table, []).append((name, columns, unique))
+
+    redundant = []
+    for table, table_indexes in sorted(by_table.items()):
+        dropped = set()
+        for i, (name, columns, unique) in enumerate(table_indexes):
+            if name == "PRIMARY":
+                continue
+            for j, (other, other_columns, other_unique) in enumerate(table_indexes):
+                if i == j or other in dropped:
+                    continue
+                same = columns == other_columns
+                if unique and not (same and other_unique):
+                    continue
+                if not same and other_columns[:len(columns)] != columns:
+                    continue
+                # Of two identical indexes keep the primary key, then the unique one, then the first declared
+                if same and other != "PRIMARY" and (unique, -i) > (other_unique, -j):
+                    continue
+                reason = "duplicate of" if same else "leftmost prefix of"
+                redundant.append(RedundantIndex(table, name, columns, other, reason))
+                dropped.add(name)
+                break
+    return redundant
@@ -0,0 +1,26 @@
+import logging
+from sqlalchemy.orm import Session
+from ..models.models import Ingredient, OrderItem, RecipeItem
+from .jobs import job_handler
+
+logger = logging.getLogger(__name__)
+
+# Side effects of a sale that the till does not wait for
+
+ORDER_CREATED = "order.created"
+
+@job_handler(ORDER_CREATED)
+def warn_low_stock(db: Session, payload: dict):
+    # Only the ingredients this order used can have just crossed their threshold
+    low = db.query(Ingredient.name, Ingredient.stock, Ingredient.unit).join(
+        RecipeItem, RecipeItem.ingredient_id == Ingredient.id
+    ).join(
+        OrderItem, OrderItem.product_id == RecipeItem.product_id
+    ).filter(
+        OrderItem.order_id == payload["order_id"],
+        Ingredient.is_active == True,
+        Ingredient.stock <= Ingredient.low_stock_threshold
+    ).distinct().all()
+    for row in low:
+        logger.warning("Low stock after order %s: %s has %s %s left",
+                       payload["order_id"], row.name, row.stock, row.unit)
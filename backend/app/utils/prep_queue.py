@@ -0,0 +1,172 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from ..models.models import Order, OrderItem, ProductPrepStat
+
+STATIONS = ("espresso", "blender", "food")
+
+# Seconds per unit until a product has its own completion history
+DEFAULT_PREP_SECONDS = {"espresso": 90.0, "blender": 150.0, "food": 60.0}
+
+# Orders whose lines are still being made
+QUEUED_ORDER_STATUSES = ("open", "pending")
+
+# Weight of the newest completion in the moving average
+EWMA_ALPHA = 0.2
+MIN_SAMPLE_SECONDS = 5.0
+MAX_SAMPLE_SECONDS = 1800.0
+
+# Identical products this many lines ahead are made together with the head of
+# the queue; each extra unit in a batch costs this fraction of a single one
+LOOKAHEAD = 6
+MAX_BATCH_UNITS = 4
+BATCH_UNIT_FACTOR = 0.5
+
+# Estimates are re-read at most this often per worker
+ESTIMATE_TTL_SECONDS = 30.0
+
+_estimates: Dict[int, float] = {}
+_estimates_loaded_at = 0.0
+_estimates_lock = threading.Lock()
+
+def prep_estimates(db: Session) -> Dict[int, float]:
+    global _estimates, _estimates_loaded_at
+    with _estimates_lock:
+        if time.monotonic() - _estimates_loaded_at < ESTIMATE_TTL_SECONDS:
+            return _estimates
+    rows = db.query(ProductPrepStat.product_id, ProductPrepStat.avg_seconds).all()
+    with _estimates_lock:
+        _estimates = {row.product_id: row.avg_seconds for row in rows}
+        _estimates_loaded_at = time.monotonic()
+        return _estimates
+
+def queued_items(db: Session, store_id: int) -> list:
+    """Lines still waiting at a station, oldest order first.
+
+    Only lines with a station and no completion time are read, through the
+    (station, prepared_at) index, so the cost follows the queue length and
+    not the size of order history.
+    """
+    return db.query(
+        OrderItem.id,
+        OrderItem.order_id,
+        OrderItem.product_id,
+        OrderItem.product_name,
+        OrderItem.quantity,
+        OrderItem.station,
+        Order.ticket_number,
+        Order.created_at,
+    ).join(Order, Order.id == OrderItem.order_id).filter(
+        OrderItem.station.in_(STATIONS),
+        OrderItem.prepared_at.is_(None),
+        Order.status.in_(QUEUED_ORDER_STATUSES),
+        Order.store_id == store_id
+    ).order_by(Order.created_at, OrderItem.id).all()
+
+def _batch_seconds(unit_seconds: float, units: int) -> float:
+    return unit_seconds * (1 + (units - 1) * BATCH_UNIT_FACTOR)
+
+def build_plan(items: list, estimates: Dict[int, float], now: datetime = None) -> dict:
+    """Make-order per station and the expected ready time of every order.
+
+    Each station works one batch at a time. The oldest line leads each batch
+    and identical products close behind it join, up to MAX_BATCH_UNITS.
+    """
+    now = now or datetime.utcnow()
+    by_station = {}
+    for item in items:
+        by_station.setdefault(item.station, []).append(item)
+
+    stations = {}
+    order_ready = {}
+    for station, waiting in by_station.items():
+        default_seconds = DEFAULT_PREP_SECONDS.get(station, DEFAULT_PREP_SECONDS["espresso"])
+        clock = 0.0
+        plan = []
+        batch_number = 0
+        while waiting:
+            head = waiting.pop(0)
+            batch = [head]
+            units = head.quantity
+            for other in list(waiting[:LOOKAHEAD]):
+                if other.product_id == head.product_id and units + other.quantity <= MAX_BATCH_UNITS:
+                    batch.append(other)
+                    units += other.quantity
+                    waiting.remove(other)
+
+            batch_number += 1
+            start = clock
+            clock += _batch_seconds(estimates.get(head.product_id, default_seconds), units)
+            for item in batch:
+                plan.append({
+                    "item_id": item.id,
+                    "order_id": item.order_id,
+                    "ticket_number": item.ticket_number,
+                    "product_id": item.product_id,
+                    "product_name": item.product_name,
+                    "quantity": item.quantity,
+                    "batch": batch_number,
+                    "expected_start_seconds": round(start),
+                    "expected_ready_seconds": round(clock),
+                })
+                order_ready[item.order_id] = max(order_ready.get(item.order_id, 0.0), clock)
+        stations[station] = plan
+
+    created_at = {item.order_id: item.created_at for item in items}
+    tickets = {item.order_id: item.ticket_number for item in items}
+    orders = [
+        {
+            "order_id": order_id,
+            "ticket_number": tickets[order_id],
+            "created_at": created_at[order_id],
+            "expected_ready_seconds": round(seconds),
+            "expected_ready_at": now + timedelta(seconds=seconds),
+        }
+        for order_id, seconds in order_ready.items()
+    ]
+    return {
+        "generated_at": now,
+        "stations": stations,
+        "orders": sorted(orders, key=lambda o: (o["expected_ready_seconds"], o["order_id"])),
+    }
+
+def record_completion(db: Session, item: OrderItem, order_created_at: datetime, prepared_at: datetime):
+    """Fold the time this line took into its product's moving average.
+
+    The line started when the station finished its previous line, or when the
+    order came in if the station was idle by then.
+    """
+    previous = db.query(func.max(OrderItem.prepared_at)).filter(
+        OrderItem.station == item.station,
+        OrderItem.prepared_at >= order_created_at,
+        OrderItem.prepared_at < prepared_at
+    ).scalar()
+    started_at = max(order_created_at, previous) if previous else order_created_at
+    elapsed = (prepared_at - started_at).total_seconds()
+    if elapsed < MIN_SAMPLE_SECONDS or elapsed > MAX_SAMPLE_SECONDS:
+        # Marked done in bulk or left on the counter; neither is a prep time
+        return
+    unit_seconds = elapsed / _batch_seconds(1.0, item.quantity)
+
+    stat = db.query(ProductPrepStat).filter(
+        ProductPrepStat.product_id == item.product_id
+    ).with_for_update().first()
+    if stat:
+        stat.avg_seconds = stat.avg_seconds + EWMA_ALPHA * (unit_seconds - stat.avg_seconds)
+        stat.samples += 1
+    else:
+        db.add(ProductPrepStat(product_id=item.product_id, avg_seconds=unit_seconds, samples=1))
+
+def close_queued_items(db: Session, order_id: int):
+    # A completed or cancelled order drops whatever it had left off the queue.
+    # The station is cleared rather than stamping a completion time, which
+    # would pass for a real one when timing the next line at that station.
+    db.execute(
+        update(OrderItem)
+        .where(OrderItem.order_id == order_id, OrderItem.prepared_at.is_(None))
+        .values(station=None)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,101 @@
+from bisect import bisect_right
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+from ..config.settings import settings
+from ..models.models import Product, ProductPrice
+from .versions import bump_version, VersionedSnapshot
+
+# Version counter bumped with every schedule change
+PRICE_SCHEDULE = "product_prices"
+
+class PriceTimeline(NamedTuple):
+    # Parallel lists sorted by start, as bisect wants them
+    starts: List[datetime]
+    ends: List[Optional[datetime]]
+    prices: List[Decimal]
+
+    def price_at(self, at: datetime) -> Optional[Decimal]:
+        i = bisect_right(self.starts, at) - 1
+        if i < 0:
+            return None
+        end = self.ends[i]
+        return self.prices[i] if end is None or at < end else None
+
+def _load_timelines(db: Session) -> Dict[int, PriceTimeline]:
+    rows = db.query(
+        ProductPrice.product_id, ProductPrice.effective_from, ProductPrice.effective_to, ProductPrice.price
+    ).order_by(ProductPrice.product_id, ProductPrice.effective_from).all()
+    timelines = {}
+    for row in rows:
+        timeline = timelines.setdefault(row.product_id, PriceTimeline([], [], []))
+        timeline.starts.append(row.effective_from)
+        timeline.ends.append(row.effective_to)
+        timeline.prices.append(row.price)
+    return timelines
+
+# Every product's schedule in memory, so pricing an order line is a bisect
+# rather than a query; other workers follow within PRICE_INDEX_CHECK_SECONDS
+price_index = VersionedSnapshot(PRICE_SCHEDULE, _load_timelines, {}, settings.price_index_check_seconds)
+
+def resolve_price(db: Session, product: Product, at: datetime = None) -> Decimal:
+    """Scheduled price of the product at `at` (default now), else Product.price."""
+    timeline = price_index.get(db).get(product.id)
+    price = timeline.price_at(at or datetime.utcnow()) if timeline else None
+    return product.price if price is None else price
+
+def schedule_price(db: Session, product: Product, price: Decimal, effective_from: datetime, user_id: int = None) -> ProductPrice:
+    """Insert a price into the product's schedule, keeping rows contiguous.
+
+    The entry running at effective_from is cut short there, and the new one
+    runs until the next scheduled change. A change at an existing start
+    replaces that entry's price.
+    """
+    # Serialises schedule edits per product
+    db.query(Product.id).filter(Product.id == product.id).with_for_update().first()
+    entries = db.query(ProductPrice).filter(
+        ProductPrice.product_id == product.id
+    ).order_by(ProductPrice.effective_from).all()
+
+    same = next((e for e in entries if e.effective_from == effective_from), None)
+    if same:
+        same.price = price
+        entry = same
+    else:
+        previous = [e for e in entries if e.effective_from < effective_from]
+        following = [e for e in entries if e.effective_from > effective_from]
+        if previous and (previous[-1].effective_to is None or previous[-1].effective_to > effective_from):
+            previous[-1].effective_to = effective_from
+        entry = ProductPrice(
+            product_id=product.id,
+            price=price,
+            effective_from=effective_from,
+            effective_to=following[0].effective_from if following else None,
+            created_by=user_id
+        )
+        db.add(entry)
+
+    # Product.price mirrors the schedule's latest change that is already in force
+    if effective_from <= datetime.utcnow():
+        later_started = any(effective_from < e.effective_from <= datetime.utcnow() for e in entries)
+        if not later_started:
+            product.price = price
+    bump_version(db, PRICE_SCHEDULE)
+    price_index.invalidate()
+    return entry
+
+def unschedule_price(db: Session, product: Product, entry: ProductPrice):
+    if entry.effective_from <= datetime.utcnow():
+        raise HTTPException(status_code=400, detail="Prices already in effect are kept as history")
+    db.query(Product.id).filter(Product.id == product.id).with_for_update().first()
+    previous = db.query(ProductPrice).filter(
+        ProductPrice.product_id == product.id,
+        ProductPrice.effective_to == entry.effective_from
+    ).first()
+    if previous:
+        previous.effective_to = entry.effective_to
+    db.delete(entry)
+    bump_version(db, PRICE_SCHEDULE)
+    price_index.invalidate()
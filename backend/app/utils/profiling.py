@@ -0,0 +1,259 @@
+import cProfile
+import functools
+import inspect
+import io
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import List, Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from starlette.concurrency import run_in_threadpool
+from ..config.database import engine
+from ..config.settings import settings
+from ..models.models import UserRole
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+# Statements kept per profile; the rest are only counted
+MAX_STATEMENTS = 500
+TOP_FUNCTIONS = 40
+
+# One cProfile at a time: concurrent profilers on the event loop overwrite
+# each other's hook, and Python 3.12+ refuses a second one outright
+_profiler_lock = threading.Lock()
+
+class RequestProfile:
+    """What one profiled request did: endpoint CPU profile, SQL and timings."""
+
+    def __init__(self, trigger: str, method: str, path: str, query: str):
+        self.id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.trigger = trigger
+        self.method = method
+        self.path = path
+        self.query = query
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.user_id = None
+        self.is_admin = False
+        self.statements = []
+        self.statement_count = 0
+        self.sql_seconds = 0.0
+        self.profiler: Optional[cProfile.Profile] = None
+        # Set when another request held the profiler; timings and SQL are still kept
+        self.cpu_profile_skipped = False
+        self.endpoint_seconds = None
+        self.endpoint_done = None
+        self.response_started = None
+        self.status = None
+
+    def wanted(self) -> bool:
+        # A header asks for a profile, but only an admin's request is kept
+        return self.trigger == "sample" or self.is_admin
+
+    @contextmanager
+    def endpoint(self):
+        profiling = _profiler_lock.acquire(blocking=False)
+        self.cpu_profile_skipped = not profiling
+        if profiling:
+            self.profiler = cProfile.Profile()
+        began = time.perf_counter()
+        try:
+            if profiling:
+                self.profiler.enable()
+            yield
+        finally:
+            if profiling:
+                self.profiler.disable()
+                _profiler_lock.release()
+            self.endpoint_done = time.perf_counter()
+            self.endpoint_seconds = self.endpoint_done - began
+
+    def summary(self) -> dict:
+        finished = time.perf_counter()
+        serialization = None
+        if self.endpoint_done is not None and self.response_started is not None:
+            serialization = self.response_started - self.endpoint_done
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "user_id": self.user_id,
+            "started_at": self.started_at.isoformat(),
+            "total_ms": _ms(finished - self.started),
+            "endpoint_ms": _ms(self.endpoint_seconds),
+            "serialization_ms": _ms(serialization),
+            "sql_count": self.statement_count,
+            "sql_ms": _ms(self.sql_seconds),
+            "cpu_profile_skipped": self.cpu_profile_skipped,
+        }
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 3)
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+def note_user(user):
+    """Called once the request's user is known; decides whether a header profile is kept."""
+    profile = _current.get()
+    if profile is not None:
+        profile.user_id = user.id
+        profile.is_admin = user.role == UserRole.ADMIN.value
+
+# Statements run in the request's context, including the threadpool that sync
+# endpoints run in; without a profile each costs one context variable lookup
+@event.listens_for(engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+@event.listens_for(engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is None or not conn.info.get("profile_started"):
+        return
+    seconds = time.perf_counter() - conn.info["profile_started"].pop()
+    profile.statement_count += 1
+    profile.sql_seconds += seconds
+    if len(profile.statements) < MAX_STATEMENTS:
+        profile.statements.append({
+            "statement": statement,
+            "ms": _ms(seconds),
+            "rows": cursor.rowcount,
+            "executemany": executemany,
+        })
+
+def _profiled(endpoint):
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def run_async(*args, **kwargs):
+            profile = _current.get()
+            if profile is None or not profile.wanted():
+                return await endpoint(*args, **kwargs)
+            # Runs on the event loop, so other requests' work in between is included
+            with profile.endpoint():
+                return await endpoint(*args, **kwargs)
+        return run_async
+
+    @functools.wraps(endpoint)
+    def run(*args, **kwargs):
+        profile = _current.get()
+        if profile is None or not profile.wanted():
+            return endpoint(*args, **kwargs)
+        with profile.endpoint():
+            return endpoint(*args, **kwargs)
+    return run
+
+class ProfiledRoute(APIRoute):
+    """Route whose endpoint is run under cProfile when the request is profiled."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, _profiled(endpoint), **kwargs)
+
+def _top_functions(profiler: cProfile.Profile) -> List[dict]:
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "own_ms": _ms(own),
+            "cumulative_ms": _ms(cumulative),
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows
+    ]
+
+def save_profile(profile: RequestProfile) -> dict:
+    """Write the profile under PROFILE_DIR and drop the oldest beyond PROFILE_KEEP."""
+    os.makedirs(settings.profile_dir, exist_ok=True)
+    summary = profile.summary()
+    document = dict(summary)
+    document["sql"] = profile.statements
+    document["top_functions"] = _top_functions(profile.profiler) if profile.profiler else []
+    if profile.profiler:
+        profile.profiler.dump_stats(os.path.join(settings.profile_dir, f"{profile.id}.prof"))
+    with open(os.path.join(settings.profile_dir, f"{profile.id}.json"), "w") as f:
+        json.dump(document, f, indent=1, default=str)
+
+    for old in list_profile_ids()[settings.profile_keep:]:
+        for suffix in (".json", ".prof"):
+            try:
+                os.remove(os.path.join(settings.profile_dir, old + suffix))
+            except FileNotFoundError:
+                pass
+    return summary
+
+def list_profile_ids() -> List[str]:
+    """Stored profile ids, newest first."""
+    try:
+        names = os.listdir(settings.profile_dir)
+    except FileNotFoundError:
+        return []
+    return sorted((name[:-5] for name in names if name.endswith(".json") and PROFILE_ID.match(name[:-5])), reverse=True)
+
+def profile_path(profile_id: str, suffix: str) -> Optional[str]:
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(settings.profile_dir, profile_id + suffix)
+    return path if os.path.exists(path) else None
+
+class ProfilingMiddleware:
+    """Profiles requests sent with an X-Profile header or picked by PROFILE_SAMPLE_RATE.
+
+    Pure ASGI. Unprofiled requests cost a header scan and, when sampling is
+    on, one random number.
+    """
+
+    def __init__(self, app, sample_rate: float = 0.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        trigger = None
+        if any(name == PROFILE_HEADER for name, _ in scope["headers"]):
+            trigger = "header"
+        elif self.sample_rate and random.random() < self.sample_rate:
+            trigger = "sample"
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(trigger, scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"))
+
+        async def send_profiled(message):
+            if message["type"] == "http.response.start":
+                profile.response_started = time.perf_counter()
+                profile.status = message["status"]
+                if profile.wanted():
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        token = _current.set(profile)
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            _current.reset(token)
+            if profile.wanted():
+                try:
+                    await run_in_threadpool(save_profile, profile)
+                except OSError as e:
+                    logger.error("Could not store profile %s: %s", profile.id, e)
@@ -0,0 +1,155 @@
+from datetime import datetime, timezone
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from ..config.settings import settings
+from ..models.models import Promotion
+from .versions import bump_version, VersionedSnapshot
+
+# Version counter bumped whenever a promotion is created, edited or ended
+PROMOTIONS = "promotions"
+
+KINDS = ("percent", "amount", "buy_x_get_y")
+
+SLOTS_PER_WEEK = 7 * 24
+CENT = Decimal("0.01")
+
+class CompiledPromotion(NamedTuple):
+    id: int
+    kind: str
+    value: Decimal
+    buy_quantity: int
+    get_quantity: int
+    customer_id: Optional[int]
+    starts_at: Optional[datetime]
+    ends_at: Optional[datetime]
+    # Minutes after local midnight; start > end wraps past midnight
+    start_minute: int
+    end_minute: int
+    days_of_week: int
+
+    def applies(self, at: datetime, local: datetime, customer_id: Optional[int]) -> bool:
+        if self.customer_id is not None and self.customer_id != customer_id:
+            return False
+        if (self.starts_at and at < self.starts_at) or (self.ends_at and at >= self.ends_at):
+            return False
+        minute = local.hour * 60 + local.minute
+        weekday = local.weekday()
+        if self.start_minute < self.end_minute:
+            return bool(self.days_of_week >> weekday & 1) and self.start_minute <= minute < self.end_minute
+        # After midnight the window still belongs to the day it opened on
+        return (bool(self.days_of_week >> weekday & 1) and minute >= self.start_minute) or \
+            (bool(self.days_of_week >> (weekday - 1) % 7 & 1) and minute < self.end_minute)
+
+    def discount(self, unit_price: Decimal, quantity: int) -> Decimal:
+        if self.kind == "percent":
+            amount = unit_price * quantity * self.value / 100
+        elif self.kind == "amount":
+            amount = min(self.value, unit_price) * quantity
+        else:
+            free_units = quantity // (self.buy_quantity + self.get_quantity) * self.get_quantity
+            amount = unit_price * free_units
+        return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+class Slot(NamedTuple):
+    by_product: Dict[int, Tuple[CompiledPromotion, ...]]
+    by_category: Dict[int, Tuple[CompiledPromotion, ...]]
+    everything: Tuple[CompiledPromotion, ...]
+
+def _minutes(value) -> Optional[int]:
+    return None if value is None else value.hour * 60 + value.minute
+
+def _slots(promotion: CompiledPromotion) -> set:
+    """Hour-of-week slots (0 = Monday 00:00 local) the promotion can fire in."""
+    if promotion.start_minute < promotion.end_minute:
+        hours = [(0, h) for h in range(promotion.start_minute // 60, (promotion.end_minute - 1) // 60 + 1)]
+    else:
+        hours = [(0, h) for h in range(promotion.start_minute // 60, 24)] + \
+            [(1, h) for h in range(0, (promotion.end_minute - 1) // 60 + 1) if promotion.end_minute]
+    return {
+        ((day + offset) % 7) * 24 + hour
+        for day in range(7) if promotion.days_of_week >> day & 1
+        for offset, hour in hours
+    }
+
+def compile_promotions(promotions) -> List[Slot]:
+    """Index rules by hour-of-week slot, then by product, category or neither.
+
+    Pricing a line then touches only the handful of rules that can apply to
+    that product at that hour, however many promotions exist.
+    """
+    by_product = [dict() for _ in range(SLOTS_PER_WEEK)]
+    by_category = [dict() for _ in range(SLOTS_PER_WEEK)]
+    everything = [[] for _ in range(SLOTS_PER_WEEK)]
+    for row in promotions:
+        start, end = _minutes(row.start_time), _minutes(row.end_time)
+        if start is None or end is None or start == end:
+            start, end = 0, 24 * 60
+        compiled = CompiledPromotion(
+            id=row.id,
+            kind=row.kind,
+            value=Decimal(row.value),
+            buy_quantity=row.buy_quantity or 0,
+            get_quantity=row.get_quantity or 0,
+            customer_id=row.customer_id,
+            starts_at=row.starts_at,
+            ends_at=row.ends_at,
+            start_minute=start,
+            end_minute=end,
+            days_of_week=row.days_of_week
+        )
+        for slot in _slots(compiled):
+            if row.product_id is not None:
+                by_product[slot].setdefault(row.product_id, []).append(compiled)
+            elif row.category_id is not None:
+                by_category[slot].setdefault(row.category_id, []).append(compiled)
+            else:
+                everything[slot].append(compiled)
+    return [
+        Slot(
+            {key: tuple(rules) for key, rules in by_product[slot].items()},
+            {key: tuple(rules) for key, rules in by_category[slot].items()},
+            tuple(everything[slot])
+        )
+        for slot in range(SLOTS_PER_WEEK)
+    ]
+
+def _load(db: Session) -> List[Slot]:
+    return compile_promotions(db.query(Promotion).filter(
+        Promotion.is_active == True,
+        or_(Promotion.ends_at.is_(None), Promotion.ends_at > datetime.utcnow())
+    ).order_by(Promotion.id).all())
+
+promotion_index = VersionedSnapshot(PROMOTIONS, _load, compile_promotions([]), settings.promotion_index_check_seconds)
+
+def promotions_changed(db: Session):
+    bump_version(db, PROMOTIONS)
+    promotion_index.invalidate()
+
+class OrderPricer:
+    """Applies the best promotion to each line of one order.
+
+    Promotions do not stack: a line gets the single rule that takes the
+    most off it. Buy-X-get-Y counts units within the line.
+    """
+
+    def __init__(self, db: Session, time_zone: str, customer_id: Optional[int] = None, at: datetime = None):
+        self.at = at or datetime.utcnow()
+        self.local = self.at.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(time_zone))
+        self.slot = promotion_index.get(db)[self.local.weekday() * 24 + self.local.hour]
+        self.customer_id = customer_id
+
+    def price_line(self, product, unit_price: Decimal, quantity: int) -> Tuple[Decimal, Optional[int]]:
+        """(discount_amount, promotion_id) for the line."""
+        best, best_id = Decimal("0.00"), None
+        candidates = self.slot.by_product.get(product.id, ()) + \
+            self.slot.by_category.get(product.category_id, ()) + self.slot.everything
+        for promotion in candidates:
+            if not promotion.applies(self.at, self.local, self.customer_id):
+                continue
+            discount = promotion.discount(unit_price, quantity)
+            if discount > best:
+                best, best_id = discount, promotion.id
+        return best, best_id
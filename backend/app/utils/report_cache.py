@@ -0,0 +1,111 @@
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, NamedTuple, Optional
+from ..config.settings import settings
+from . import metrics
+
+report_requests = metrics.counter(
+    "pos_report_cache_total", "Report requests by how they were answered", ("report", "outcome")
+)
+
+def _as_datetime(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+class _Entry(NamedTuple):
+    expires: float
+    store_id: Optional[int]
+    start: datetime
+    end: datetime
+    value: Any
+
+    def covers(self, store_id: int, at: datetime) -> bool:
+        return self.store_id in (None, store_id) and self.start <= at < self.end
+
+class _Flight:
+    def __init__(self, store_id: Optional[int], start: datetime, end: datetime):
+        self.store_id = store_id
+        self.start = start
+        self.end = end
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        # An order landed in the period while computing; answer, but do not keep
+        self.stale = False
+
+    def covers(self, store_id: int, at: datetime) -> bool:
+        return self.store_id in (None, store_id) and self.start <= at < self.end
+
+class ReportCache:
+    """Shares report results between identical requests in this worker.
+
+    Concurrent requests for the same report, store and period wait for the
+    first one's query instead of running their own, and its result is kept
+    for ttl_seconds. Writing an order drops the results whose period holds
+    the order's created_at; other workers notice within the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._results: Dict[tuple, _Entry] = {}
+        self._flights: Dict[tuple, _Flight] = {}
+
+    def get(self, report: str, store_id: Optional[int], start, end, compute: Callable[[], Any], *params,
+            ttl_seconds: float = None):
+        """Result of compute() for orders created in [start, end), shared when possible.
+
+        store_id None means the report spans every store. ttl_seconds
+        overrides the cache's own, e.g. for periods that are already over.
+        """
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        start, end = _as_datetime(start), _as_datetime(end)
+        key = (report, store_id, start, end, *params)
+        with self._lock:
+            entry = self._results.get(key)
+            if entry and entry.expires > time.monotonic():
+                report_requests.inc(report=report, outcome="hit")
+                return entry.value
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight(store_id, start, end)
+
+        if not leader:
+            report_requests.inc(report=report, outcome="coalesced")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        report_requests.inc(report=report, outcome="miss")
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None and not flight.stale and ttl_seconds > 0:
+                    now = time.monotonic()
+                    for expired in [cached for cached, entry in self._results.items() if entry.expires <= now]:
+                        del self._results[expired]
+                    self._results[key] = _Entry(now + ttl_seconds, store_id, start, end, flight.value)
+            flight.done.set()
+        return flight.value
+
+    def order_written(self, store_id: int, created_at: datetime):
+        """Call after committing a change to an order created at created_at."""
+        with self._lock:
+            for key in [key for key, entry in self._results.items() if entry.covers(store_id, created_at)]:
+                del self._results[key]
+            for flight in self._flights.values():
+                if flight.covers(store_id, created_at):
+                    flight.stale = True
+
+report_cache = ReportCache(settings.report_cache_ttl_seconds)
@@ -0,0 +1,117 @@
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+from ..config.settings import settings
+from ..models.models import User, UserSession
+from .versions import bump_version, VersionedSnapshot
+
+# Version counter bumped with every revocation
+REVOCATIONS = "session_revocations"
+
+def _hash(secret: str) -> str:
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+def _new_refresh_token(session_id: str) -> Tuple[str, str]:
+    # "<session id>.<secret>": the id finds the row, only the hash is stored
+    secret = secrets.token_urlsafe(32)
+    return f"{session_id}.{secret}", _hash(secret)
+
+def _next_secret(secret: str) -> str:
+    # Derived from the token it replaces, so a second request with the same
+    # token inside the grace window can be given the same new token again
+    return hmac.new(settings.secret_key.encode(), secret.encode(), hashlib.sha256).hexdigest()
+
+def _refresh_expiry() -> datetime:
+    return datetime.utcnow() + timedelta(days=settings.refresh_token_expire_days)
+
+def create_session(db: Session, user: User, user_agent: Optional[str] = None) -> Tuple[UserSession, str]:
+    session_id = secrets.token_hex(16)
+    refresh_token, refresh_hash = _new_refresh_token(session_id)
+    session = UserSession(
+        id=session_id,
+        user_id=user.id,
+        refresh_token_hash=refresh_hash,
+        user_agent=(user_agent or "")[:255] or None,
+        expires_at=_refresh_expiry()
+    )
+    db.add(session)
+    user.token_expires_at = session.expires_at
+    return session, refresh_token
+
+def rotate_refresh_token(db: Session, refresh_token: str) -> Optional[Tuple[UserSession, str]]:
+    """Swap a refresh token for a new one, or None if it is not valid.
+
+    The token just replaced is accepted for REFRESH_REUSE_GRACE_SECONDS and
+    answered with the same new token, for tabs that refreshed at the same
+    moment. Presenting any other rotated token means it was copied; the
+    whole session is revoked so neither copy can be used again.
+    """
+    session_id, _, secret = refresh_token.partition(".")
+    session = db.query(UserSession).filter(UserSession.id == session_id).with_for_update().first()
+    now = datetime.utcnow()
+    if not session or session.revoked_at or session.expires_at < now:
+        return None
+    presented = _hash(secret)
+    if not secrets.compare_digest(session.refresh_token_hash, presented):
+        in_grace = (
+            session.previous_token_hash is not None
+            and secrets.compare_digest(session.previous_token_hash, presented)
+            and session.rotated_at >= now - timedelta(seconds=settings.refresh_reuse_grace_seconds)
+        )
+        if in_grace and session.user.is_active:
+            return session, f"{session.id}.{_next_secret(secret)}"
+        revoke_sessions(db, [session.id])
+        db.commit()
+        return None
+    if not session.user.is_active:
+        return None
+
+    new_secret = _next_secret(secret)
+    session.previous_token_hash = presented
+    session.refresh_token_hash = _hash(new_secret)
+    session.rotated_at = now
+    new_token = f"{session.id}.{new_secret}"
+    session.last_used_at = now
+    # Sliding expiry: a till in daily use stays signed in
+    session.expires_at = _refresh_expiry()
+    session.user.token_expires_at = session.expires_at
+    return session, new_token
+
+def revoke_sessions(db: Session, session_ids) -> int:
+    session_ids = list(session_ids)
+    if not session_ids:
+        return 0
+    result = db.execute(
+        update(UserSession)
+        .where(UserSession.id.in_(session_ids), UserSession.revoked_at.is_(None))
+        .values(revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        bump_version(db, REVOCATIONS)
+        revoked_sessions.invalidate()
+    return result.rowcount
+
+def revoke_user_sessions(db: Session, user_id: int) -> int:
+    session_ids = [row.id for row in db.query(UserSession.id).filter(
+        UserSession.user_id == user_id, UserSession.revoked_at.is_(None)
+    ).all()]
+    return revoke_sessions(db, session_ids)
+
+def _load_revoked(db: Session) -> frozenset:
+    # Older revocations only cover access tokens that have expired anyway
+    window = timedelta(minutes=settings.access_token_expire_minutes, seconds=60)
+    return frozenset(row.id for row in db.query(UserSession.id).filter(
+        UserSession.revoked_at >= datetime.utcnow() - window
+    ).all())
+
+# Session ids whose access tokens may still be unexpired; another worker's
+# revocation shows up within REVOCATION_CHECK_SECONDS
+revoked_sessions = VersionedSnapshot(REVOCATIONS, _load_revoked, frozenset(), settings.revocation_check_seconds)
+
+def is_revoked(db: Session, session_id: str) -> bool:
+    return session_id in revoked_sessions.get(db)
@@ -0,0 +1,155 @@
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy.orm import Session
+from ..models.models import Shift, ShiftCounter, Order, PaymentMethod, Product, User
+from .upsert import upsert
+
+# Counter dimensions; "cancelled" holds what was taken back out of the others
+PAYMENT_METHOD = "payment_method"
+PRODUCT = "product"
+SELLER = "seller"
+CANCELLED = "cancelled"
+
+NO_PAYMENT_METHOD = "NONE"
+
+def open_shift_id(db: Session, store_id: int) -> Optional[int]:
+    """The store's open shift, share-locked until the caller's transaction ends.
+
+    Orders only share the lock with each other, but close_shift waits for
+    them, so every order counted in a shift is in its frozen Z-report and an
+    order arriving after the close goes to the next shift.
+    """
+    row = db.query(Shift.id).filter(
+        Shift.store_id == store_id, Shift.status == "open"
+    ).with_for_update(read=True).first()
+    return row.id if row else None
+
+def _order_deltas(order: Order, items, sign: int) -> list:
+    amount = Decimal(order.total_amount) * sign
+    payment_key = order.payment_method_code or NO_PAYMENT_METHOD
+    deltas = [
+        (PAYMENT_METHOD, payment_key, sign, 0, amount),
+        (SELLER, str(order.user_id), sign, 0, amount),
+    ]
+    for item in items:
+        deltas.append((PRODUCT, str(item.product_id), 0, item.quantity * sign, Decimal(item.price) * sign))
+    return deltas
+
+def _apply(db: Session, shift_id: int, deltas: list):
+    # Merge deltas per key first so each counter row is touched once
+    merged = {}
+    for dimension, key, orders, quantity, amount in deltas:
+        current = merged.setdefault((dimension, key), [0, 0, Decimal(0)])
+        current[0] += orders
+        current[1] += quantity
+        current[2] += amount
+
+    upsert(
+        db,
+        ShiftCounter.__table__,
+        [
+            {"shift_id": shift_id, "dimension": dimension, "key": key,
+             "orders": orders, "quantity": quantity, "amount": amount}
+            for (dimension, key), (orders, quantity, amount) in merged.items()
+        ],
+        key_columns=("shift_id", "dimension", "key"),
+        increment=("orders", "quantity", "amount"),
+    )
+
+def record_order(db: Session, order: Order, items):
+    if order.shift_id is not None:
+        _apply(db, order.shift_id, _order_deltas(order, items, 1))
+
+# Later changes to an order are booked to the shift open when they happen,
+# from open_shift_id; the order's own shift may already be closed with its
+# Z-report frozen
+
+def record_item_changes(db: Session, shift_id: Optional[int], order: Order, amount_delta: Decimal, item_deltas):
+    # item_deltas holds (product_id, quantity delta, amount delta) per changed line
+    if shift_id is None:
+        return
+    payment_key = order.payment_method_code or NO_PAYMENT_METHOD
+    deltas = [
+        (PAYMENT_METHOD, payment_key, 0, 0, amount_delta),
+        (SELLER, str(order.user_id), 0, 0, amount_delta),
+    ]
+    deltas.extend((PRODUCT, str(pid), 0, quantity, amount) for pid, quantity, amount in item_deltas)
+    _apply(db, shift_id, deltas)
+
+def record_status_change(db: Session, shift_id: Optional[int], order: Order, old_status: str, new_status: str):
+    if shift_id is None or (old_status == "cancelled") == (new_status == "cancelled"):
+        return
+    # Cancelling moves the order out of the sales counters into "cancelled";
+    # reinstating a cancelled order moves it back
+    sign = -1 if new_status == "cancelled" else 1
+    deltas = _order_deltas(order, order.items, sign)
+    deltas.append((CANCELLED, "all", -sign, 0, Decimal(order.total_amount) * -sign))
+    _apply(db, shift_id, deltas)
+
+def build_z_report(db: Session, shift: Shift) -> dict:
+    counters = db.query(ShiftCounter).filter(ShiftCounter.shift_id == shift.id).all()
+    by_dimension = {}
+    for counter in counters:
+        by_dimension.setdefault(counter.dimension, []).append(counter)
+
+    # Names are resolved from the handful of keys present, not from the orders
+    payment_keys = [c.key for c in by_dimension.get(PAYMENT_METHOD, [])]
+    product_ids = [int(c.key) for c in by_dimension.get(PRODUCT, [])]
+    seller_ids = [int(c.key) for c in by_dimension.get(SELLER, [])]
+    payment_names = dict(db.query(PaymentMethod.payment_method_code, PaymentMethod.name).filter(
+        PaymentMethod.payment_method_code.in_(payment_keys)
+    ).all()) if payment_keys else {}
+    product_names = dict(db.query(Product.id, Product.name).filter(
+        Product.id.in_(product_ids)
+    ).all()) if product_ids else {}
+    seller_names = dict(db.query(User.id, User.username).filter(
+        User.id.in_(seller_ids)
+    ).all()) if seller_ids else {}
+
+    payment_methods = [
+        {
+            "payment_method_code": None if c.key == NO_PAYMENT_METHOD else c.key,
+            "payment_method_name": payment_names.get(c.key),
+            "orders": c.orders,
+            "amount": float(c.amount),
+        }
+        for c in by_dimension.get(PAYMENT_METHOD, []) if c.orders or c.amount
+    ]
+    products = [
+        {
+            "product_id": int(c.key),
+            "product_name": product_names.get(int(c.key)),
+            "quantity": c.quantity,
+            "amount": float(c.amount),
+        }
+        for c in by_dimension.get(PRODUCT, []) if c.quantity
+    ]
+    sellers = [
+        {
+            "user_id": int(c.key),
+            "username": seller_names.get(int(c.key)),
+            "orders": c.orders,
+            "amount": float(c.amount),
+        }
+        for c in by_dimension.get(SELLER, []) if c.orders or c.amount
+    ]
+    cancelled = next(iter(by_dimension.get(CANCELLED, [])), None)
+
+    return {
+        "shift_id": shift.id,
+        "store_id": shift.store_id,
+        "status": shift.status,
+        "opened_by": shift.opened_by,
+        "closed_by": shift.closed_by,
+        "opened_at": shift.opened_at.isoformat(),
+        "closed_at": shift.closed_at.isoformat() if shift.closed_at else None,
+        "total_orders": sum(p["orders"] for p in payment_methods),
+        "total_revenue": round(sum(p["amount"] for p in payment_methods), 2),
+        "payment_methods": sorted(payment_methods, key=lambda p: -p["amount"]),
+        "products": sorted(products, key=lambda p: -p["amount"]),
+        "sellers": sorted(sellers, key=lambda s: -s["amount"]),
+        "cancelled": {
+            "orders": cancelled.orders if cancelled else 0,
+            "amount": float(cancelled.amount) if cancelled else 0.0,
+        },
+    }
@@ -0,0 +1,93 @@
+import logging
+from datetime import date, datetime, time as day_time, timedelta, timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from fastapi import Depends
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+from sqlalchemy.orm import Session
+from ..config.database import get_db
+from ..config.settings import settings
+from ..models.models import SystemConfig
+from .upsert import upsert
+from .versions import bump_version, VersionedSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Version counter bumped whenever a system_config row changes
+SHOP_SETTINGS = "shop_settings"
+
+class ShopSettings(BaseModel):
+    """Shop-wide settings stored one key per row in system_config."""
+
+    model_config = ConfigDict(frozen=True)
+
+    timezone: str = "Asia/Ho_Chi_Minh"
+    receipt_header: str = Field("", max_length=500)
+    tax_rate: Decimal = Field(Decimal("0"), ge=0, le=1)
+    # Sales before this local hour count towards the previous business day
+    report_cutoff_hour: int = Field(0, ge=0, le=23)
+
+    @field_validator("timezone")
+    @classmethod
+    def known_timezone(cls, value: str) -> str:
+        try:
+            ZoneInfo(value)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown timezone {value!r}")
+        return value
+
+    def business_date(self, now: datetime = None) -> date:
+        """The business day that is open at `now` (naive UTC, default current time)."""
+        now = (now or datetime.utcnow()).replace(tzinfo=timezone.utc)
+        local = now.astimezone(ZoneInfo(self.timezone))
+        return (local - timedelta(hours=self.report_cutoff_hour)).date()
+
+    def day_start(self, day: date) -> datetime:
+        """Naive UTC instant a business day starts, comparable with created_at."""
+        local = datetime.combine(day, day_time(hour=self.report_cutoff_hour), tzinfo=ZoneInfo(self.timezone))
+        return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+class ShopSettingsUpdate(BaseModel):
+    timezone: str = None
+    receipt_header: str = None
+    tax_rate: Decimal = None
+    report_cutoff_hour: int = None
+
+def _load(db: Session) -> ShopSettings:
+    rows = db.query(SystemConfig.key, SystemConfig.value).filter(
+        SystemConfig.key.in_(list(ShopSettings.model_fields))
+    ).all()
+    values = {}
+    for key, value in rows:
+        # A bad row falls back to its default instead of taking the shop down
+        try:
+            ShopSettings(**{key: value})
+            values[key] = value
+        except ValidationError as e:
+            logger.error("Ignoring invalid system_config %s=%r: %s", key, value, e)
+    return ShopSettings(**values)
+
+# Reloaded when an admin saves; other workers follow within
+# SHOP_SETTINGS_CHECK_SECONDS
+shop_settings_cache = VersionedSnapshot(SHOP_SETTINGS, _load, ShopSettings(), settings.shop_settings_check_seconds)
+
+def get_shop_settings(db: Session = Depends(get_db)) -> ShopSettings:
+    return shop_settings_cache.get(db)
+
+def save_shop_settings(db: Session, current: ShopSettings, changes: dict) -> ShopSettings:
+    """Validate the merged settings, then write only the keys that changed."""
+    updated = ShopSettings(**{**current.model_dump(), **changes})
+    now = datetime.utcnow()
+    rows = [
+        {"key": key, "value": _json_value(getattr(updated, key)), "created_at": now, "updated_at": now}
+        for key in changes
+        if getattr(updated, key) != getattr(current, key)
+    ]
+    if rows:
+        upsert(db, SystemConfig.__table__, rows, key_columns=("key",), replace=("value", "updated_at"))
+        bump_version(db, SHOP_SETTINGS)
+    return updated
+
+def _json_value(value):
+    # Decimals are stored as strings so the JSON column keeps them exact
+    return str(value) if isinstance(value, Decimal) else value
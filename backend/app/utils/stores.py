@@ -0,0 +1,33 @@
+from typing import Dict, NamedTuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from ..config.settings import settings
+from ..models.models import PaymentMethod, Store
+from .versions import bump_version, VersionedSnapshot
+
+# Version counter bumped whenever a store is added or changed
+STORES = "stores"
+
+class StoreInfo(NamedTuple):
+    id: int
+    code: str
+    name: str
+    is_active: bool
+
+def _load(db: Session) -> Dict[int, StoreInfo]:
+    return {
+        row.id: StoreInfo(row.id, row.code, row.name, row.is_active)
+        for row in db.query(Store.id, Store.code, Store.name, Store.is_active).all()
+    }
+
+# Read on every scoped request; stores change about as rarely as the shop
+# settings, so they share SHOP_SETTINGS_CHECK_SECONDS
+store_cache = VersionedSnapshot(STORES, _load, {}, settings.shop_settings_check_seconds)
+
+def stores_changed(db: Session):
+    bump_version(db, STORES)
+    store_cache.invalidate()
+
+def payment_methods_in(store_id: int):
+    """Filter for the payment methods a store offers; shared ones have no store."""
+    return or_(PaymentMethod.store_id.is_(None), PaymentMethod.store_id == store_id)
@@ -0,0 +1,24 @@
+from datetime import date
+from sqlalchemy.orm import Session
+from ..models.models import TicketCounter
+from .upsert import upsert
+
+def next_ticket_number(db: Session, store_id: int, business_date: date) -> int:
+    """Take the next ticket number of a store's business day, starting at 1.
+
+    The increment locks only that day's counter row, and only until the
+    caller's transaction ends: concurrent checkouts in other stores do not
+    wait at all and a rollback hands the number back, so a day's tickets run
+    1, 2, 3... without gaps. Call it as late in the transaction as possible.
+    """
+    upsert(
+        db,
+        TicketCounter.__table__,
+        [{"store_id": store_id, "business_date": business_date, "last_number": 1}],
+        key_columns=("store_id", "business_date"),
+        increment=("last_number",),
+    )
+    return db.query(TicketCounter.last_number).filter(
+        TicketCounter.store_id == store_id,
+        TicketCounter.business_date == business_date
+    ).scalar()
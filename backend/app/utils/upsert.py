@@ -0,0 +1,41 @@
+from typing import Iterable, List, Sequence
+from sqlalchemy import Table
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+
+def upsert(
+    db: Session,
+    table: Table,
+    rows: List[dict],
+    key_columns: Sequence[str],
+    increment: Iterable[str] = (),
+    replace: Iterable[str] = (),
+):
+    """Insert rows in multi-row statements, updating rows whose key exists.
+
+    Columns in `increment` are added to the existing value and columns in
+    `replace` overwrite it. Rows are sorted by key so that concurrent upserts
+    touching the same rows lock them in the same order and cannot deadlock.
+    The rows go as executemany parameters: the statement is compiled once
+    and cached, and the MySQL dialect sends them as multi-row VALUES.
+    """
+    if not rows:
+        return
+    increment, replace = list(increment), list(replace)
+    rows = sorted(rows, key=lambda row: tuple(row[c] for c in key_columns))
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        updates = {c: table.c[c] + stmt.inserted[c] for c in increment}
+        updates.update({c: stmt.inserted[c] for c in replace})
+        stmt = stmt.on_duplicate_key_update(**updates)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table)
+        updates = {c: table.c[c] + stmt.excluded[c] for c in increment}
+        updates.update({c: stmt.excluded[c] for c in replace})
+        stmt = stmt.on_conflict_do_update(index_elements=list(key_columns), set_=updates)
+    else:
+        raise NotImplementedError(f"upsert is not supported on {dialect}")
+
+    db.execute(stmt, rows)
@@ -0,0 +1,46 @@
+import threading
+import time
+from typing import Any, Callable
+from sqlalchemy.orm import Session
+from ..models.models import ChangeVersion
+from .upsert import upsert
+
+def bump_version(db: Session, name: str):
+    # Part of the caller's transaction, so readers see the new version only
+    # together with the change it stands for
+    upsert(db, ChangeVersion.__table__, [{"name": name, "version": 1}],
+           key_columns=("name",), increment=("version",))
+
+def current_version(db: Session, name: str) -> int:
+    return db.query(ChangeVersion.version).filter(ChangeVersion.name == name).scalar() or 0
+
+class VersionedSnapshot:
+    """Per-process copy of rarely changing data, shared by every request.
+
+    The version counter is read at most every check_seconds and the data is
+    reloaded only when it moved, so most reads cost no database round trip.
+    Writers bump the version in their transaction and call invalidate() so
+    their own process reloads on the next read.
+    """
+
+    def __init__(self, name: str, load: Callable[[Session], Any], initial: Any, check_seconds: float):
+        self.name = name
+        self.check_seconds = check_seconds
+        self._load = load
+        self._value = initial
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._checked_at = 0.0
+
+    def get(self, db: Session):
+        if time.monotonic() - self._checked_at > self.check_seconds:
+            with self._lock:
+                if time.monotonic() - self._checked_at > self.check_seconds:
+                    version = current_version(db, self.name)
+                    if version != self._version:
+                        self._value, self._version = self._load(db), version
+                    self._checked_at = time.monotonic()
+        return self._value
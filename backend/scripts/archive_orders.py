@@ -0,0 +1,34 @@
+import sys
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.utils.archive import archive_orders
+
+def main():
+    parser = argparse.ArgumentParser(description="Move old closed orders into the archive tables")
+    parser.add_argument("--horizon-days", type=int, default=settings.archive_horizon_days,
+                        help="Archive orders created more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size,
+                        help="Orders moved per transaction")
+    args = parser.parse_args()
+
+    cutoff = datetime.utcnow() - timedelta(days=args.horizon_days)
+    db = SessionLocal()
+    try:
+        moved = archive_orders(db, cutoff, args.batch_size)
+        print(f"Archived {moved} order(s) created before {cutoff:%Y-%m-%d %H:%M}")
+    except Exception as e:
+        print(f"Error archiving orders: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
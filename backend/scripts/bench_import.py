@@ -0,0 +1,70 @@
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.models.models import DEFAULT_STORE_ID, Customer
+from app.utils.bulk import export_chunks, import_rows, parse_rows
+
+PREFIX = "bench-"
+
+def customers_csv(count: int) -> bytes:
+    lines = ["customer_name,phone,address,city,sort_order"]
+    lines += [f"{PREFIX}{n},09{n:08d},{n} Le Loi,Hue,{n}" for n in range(count)]
+    return ("\n".join(lines) + "\n").encode()
+
+def timed(label: str, rows: int, run):
+    began = time.perf_counter()
+    result = run()
+    seconds = time.perf_counter() - began
+    print(f"{label:<28} {seconds:8.2f}s  {rows / seconds if seconds else 0:10.0f} rows/s")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the bulk customer import and export against the configured database")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--store-id", type=int, default=DEFAULT_STORE_ID)
+    parser.add_argument("--baseline-rows", type=int, default=1000,
+                        help="Rows inserted one commit at a time for comparison, like repeated POST /api/customers/")
+    parser.add_argument("--keep", action="store_true", help="Leave the generated customers in place")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        data = customers_csv(args.rows)
+        print(f"{args.rows} customers, {len(data) / 1e6:.1f} MB of CSV, batches of {settings.import_batch_rows}")
+        rows = timed("parse", args.rows, lambda: parse_rows(data, "csv"))
+        timed("validate (dry run)", args.rows, lambda: import_rows(db, "customers", rows, args.store_id, dry_run=True))
+        result = timed("import (one transaction)", args.rows, lambda: import_rows(db, "customers", rows, args.store_id))
+        print(f"  inserted {result.inserted}, updated {result.updated}")
+
+        exported = timed("export csv", args.rows, lambda: sum(len(chunk) for chunk in export_chunks("customers", args.store_id, "csv")))
+        print(f"  {exported / 1e6:.1f} MB")
+
+        # Re-importing the export updates every row in place
+        exported_rows = parse_rows("".join(export_chunks("customers", args.store_id, "csv")).encode(), "csv")
+        mine = [row for row in exported_rows if row["customer_name"].startswith(PREFIX)]
+        result = timed("re-import (upsert by id)", len(mine), lambda: import_rows(db, "customers", mine, args.store_id))
+        print(f"  inserted {result.inserted}, updated {result.updated}")
+
+        def one_by_one():
+            for n in range(args.baseline_rows):
+                db.add(Customer(customer_name=f"{PREFIX}single-{n}", phone=f"08{n:08d}", store_id=args.store_id, sort_order=n))
+                db.commit()
+        timed(f"baseline: {args.baseline_rows} single commits", args.baseline_rows, one_by_one)
+    finally:
+        if not args.keep:
+            deleted = db.query(Customer).filter(
+                Customer.store_id == args.store_id, Customer.customer_name.like(f"{PREFIX}%")
+            ).delete(synchronize_session=False)
+            db.commit()
+            print(f"Removed {deleted} generated customer(s)")
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import sys
+import random
+import argparse
+import threading
+from decimal import Decimal
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import HTTPException
+from sqlalchemy.exc import OperationalError
+from app.config.database import SessionLocal
+from app.models.models import Ingredient
+from app.utils.inventory import consume_stock, restore_stock
+
+def run_till(ingredient_ids, orders, results, lock):
+    # Each "till" takes random amounts of a random subset of ingredients per
+    # order, listed in random order, and cancels some orders again
+    db = SessionLocal()
+    rng = random.Random()
+    try:
+        for _ in range(orders):
+            picked = rng.sample(ingredient_ids, rng.randint(1, len(ingredient_ids)))
+            requirements = {iid: Decimal(rng.randint(1, 3)) for iid in picked}
+            try:
+                consume_stock(db, requirements)
+                db.commit()
+            except HTTPException:
+                with lock:
+                    results["rejected"] += 1
+                continue
+            except OperationalError as e:
+                db.rollback()
+                with lock:
+                    results["errors"].append(str(e.orig))
+                continue
+
+            if rng.random() < 0.2:
+                restore_stock(db, requirements)
+                db.commit()
+                continue
+            with lock:
+                results["accepted"] += 1
+                for iid, qty in requirements.items():
+                    results["consumed"][iid] += qty
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Check stock decrements under concurrent tills against the configured database")
+    parser.add_argument("--tills", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=200, help="Orders per till")
+    parser.add_argument("--ingredients", type=int, default=5)
+    parser.add_argument("--stock", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    ingredients = [
+        Ingredient(name=f"concurrency-check-{i}-{random.getrandbits(32):08x}", unit="unit", stock=args.stock)
+        for i in range(args.ingredients)
+    ]
+    db.add_all(ingredients)
+    db.commit()
+    ids = [ingredient.id for ingredient in ingredients]
+
+    results = {"accepted": 0, "rejected": 0, "errors": [], "consumed": {iid: Decimal(0) for iid in ids}}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=run_till, args=(ids, args.orders, results, lock)) for _ in range(args.tills)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db.expire_all()
+    failures = []
+    for ingredient in db.query(Ingredient).filter(Ingredient.id.in_(ids)).all():
+        expected = args.stock - results["consumed"][ingredient.id]
+        if ingredient.stock != expected:
+            failures.append(f"{ingredient.name}: stock {ingredient.stock}, expected {expected}")
+        if ingredient.stock < 0:
+            failures.append(f"{ingredient.name}: negative stock {ingredient.stock}")
+        db.delete(ingredient)
+    db.commit()
+    db.close()
+
+    print(f"accepted {results['accepted']}, rejected for stock {results['rejected']}, deadlocks/errors {len(results['errors'])}")
+    for failure in failures + results["errors"][:5]:
+        print("  " + failure)
+    sys.exit(1 if failures or results["errors"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import sys
+import time
+import random
+import argparse
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy.exc import OperationalError
+from app.config.database import SessionLocal
+from app.models.models import Order, Store, TicketCounter, User
+from app.utils.tickets import next_ticket_number
+
+def run_till(store_ids, user_id, business_date, orders, results, lock):
+    # Each "till" creates orders the way create_order does, for a random
+    # store, and abandons some of them before the commit
+    db = SessionLocal()
+    rng = random.Random()
+    try:
+        for _ in range(orders):
+            store_id = rng.choice(store_ids)
+            try:
+                order = Order(store_id=store_id, user_id=user_id, total_amount=0, status="pending")
+                db.add(order)
+                db.flush()
+                order.ticket_date = business_date
+                order.ticket_number = next_ticket_number(db, store_id, business_date)
+                if rng.random() < 0.2:
+                    db.rollback()
+                    with lock:
+                        results["abandoned"] += 1
+                    continue
+                db.commit()
+            except OperationalError as e:
+                db.rollback()
+                with lock:
+                    results["errors"].append(str(e.orig))
+                continue
+            with lock:
+                results["created"] += 1
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Check ticket numbers under concurrent tills against the configured database")
+    parser.add_argument("--tills", type=int, default=8)
+    parser.add_argument("--orders", type=int, default=200, help="Orders per till")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    store_ids = [row.id for row in db.query(Store.id).all()]
+    user_id = db.query(User.id).order_by(User.id).first().id
+    # A business day far in the future so real tickets are not touched
+    business_date = date(2100, 1, 1) + timedelta(days=random.randrange(36500))
+    db.close()
+
+    results = {"created": 0, "abandoned": 0, "errors": []}
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=run_till, args=(store_ids, user_id, business_date, args.orders, results, lock))
+        for _ in range(args.tills)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    db = SessionLocal()
+    failures = []
+    for store_id in store_ids:
+        numbers = sorted(row.ticket_number for row in db.query(Order.ticket_number).filter(
+            Order.store_id == store_id, Order.ticket_date == business_date
+        ))
+        if numbers != list(range(1, len(numbers) + 1)):
+            duplicates = len(numbers) - len(set(numbers))
+            missing = sorted(set(range(1, (numbers[-1] if numbers else 0) + 1)) - set(numbers))
+            failures.append(f"store {store_id}: {duplicates} duplicate(s), missing {missing[:10]}")
+        last_number = db.query(TicketCounter.last_number).filter(
+            TicketCounter.store_id == store_id, TicketCounter.business_date == business_date
+        ).scalar() or 0
+        if last_number != len(numbers):
+            failures.append(f"store {store_id}: counter at {last_number} after {len(numbers)} order(s)")
+
+    db.query(Order).filter(Order.ticket_date == business_date).delete(synchronize_session=False)
+    db.query(TicketCounter).filter(TicketCounter.business_date == business_date).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+    print(f"{len(store_ids)} store(s): created {results['created']}, abandoned {results['abandoned']}, "
+          f"deadlocks/errors {len(results['errors'])} in {seconds:.2f}s")
+    for failure in failures + results["errors"][:5]:
+        print("  " + failure)
+    sys.exit(1 if failures or results["errors"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import sys
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sqlalchemy import func, select
+from app.config.database import SessionLocal, engine
+from app.models.models import DEFAULT_STORE_ID, Customer, Order, Product
+from app.utils.archive import orders_between
+
+def store_queries(db, store_id: int):
+    """The hot single-store reads, built the way the routers build them."""
+    now = datetime.utcnow()
+    day = orders_between(db, now - timedelta(days=1), now, store_id)
+    return {
+        "order history": select(day.c.id, day.c.total_amount).order_by(day.c.created_at.desc()),
+        "day totals": select(func.count(day.c.id), func.sum(day.c.total_amount)),
+        "open tabs": select(Order.id).where(Order.store_id == store_id, Order.status == "open"),
+        "product list": select(Product.id, Product.name).where(
+            Product.store_id == store_id, Product.is_active == 1
+        ),
+        "customer list": select(Customer.id).where(Customer.store_id == store_id).order_by(Customer.sort_order),
+        "catalog sync": select(Product.id).where(
+            Product.store_id == store_id, Product.updated_at > now - timedelta(hours=1)
+        ).order_by(Product.updated_at, Product.id),
+    }
+
+def explain(conn, statement):
+    compiled = statement.compile(dialect=engine.dialect)
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    params = tuple(compiled.params[name] for name in compiled.positiontup) if compiled.positional else compiled.params
+    return conn.exec_driver_sql(prefix + str(compiled), params).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the query plans of single-store reads")
+    parser.add_argument("--store-id", type=int, default=DEFAULT_STORE_ID)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        conn = db.connection()
+        for name, statement in store_queries(db, args.store_id).items():
+            print(f"== {name}")
+            for row in explain(conn, statement):
+                print("  ", tuple(row))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import sys
+import argparse
+import time
+from datetime import timedelta
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.models.models import Product
+from app.utils.forecast import backtest, load_sales
+from app.utils.shop_settings import shop_settings_cache
+
+def _percent(value):
+    return "-" if value is None else f"{100 * value:.1f}%"
+
+def main():
+    parser = argparse.ArgumentParser(description="Score next-day demand forecasts against recorded sales")
+    parser.add_argument("--test-days", type=int, default=14,
+                        help="Most recent finished business days to forecast and score")
+    parser.add_argument("--history-days", type=int, default=settings.forecast_history_days,
+                        help="Days each forecast is fitted on")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        shop = shop_settings_cache.get(db)
+        end = shop.business_date()
+        start = end - timedelta(days=args.history_days + args.test_days)
+        began = time.perf_counter()
+        product_ids, sales = load_sales(db, shop, start, end)
+        load_seconds = time.perf_counter() - began
+        result = backtest(product_ids, sales, start, args.test_days, args.history_days)
+        names = dict(db.query(Product.id, Product.name).all())
+    finally:
+        db.close()
+
+    print(f"Loaded {int(sales.sum())} units over {sales.shape[1]} days for {len(product_ids)} products in {load_seconds:.2f}s")
+    print(f"Scored {result['days']} days, average fit {result['fit_ms'] or 0:.2f} ms")
+    print(f"{'product':30} {'sold':>8} {'model':>8} {'naive':>8}")
+    for product_id, scores in sorted(result["per_product"].items(), key=lambda item: -item[1]["sold"]):
+        print(f"{names.get(product_id, product_id)!s:30.30} {scores['sold']:8.0f} "
+              f"{_percent(scores['wape']):>8} {_percent(scores['naive_wape']):>8}")
+    print(f"{'all products':30} {'':8} {_percent(result['wape']):>8} {_percent(result['naive_wape']):>8}")
+    print("WAPE = absolute forecast error / units sold; naive = same weekday last week")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config.database import SessionLocal
+from app.models.models import User, UserRole
+
+def main():
+    parser = argparse.ArgumentParser(description="Make an admin an owner, who works across all stores")
+    parser.add_argument("username")
+    parser.add_argument("--revoke", action="store_true", help="Turn the owner back into an admin of their store")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == args.username).first()
+        if not user:
+            sys.exit(f"No user named {args.username}")
+        if user.role != UserRole.ADMIN.value:
+            sys.exit("Only admins can be owners")
+        user.is_owner = not args.revoke
+        db.commit()
+        print(f"{user.username} is {'now' if user.is_owner else 'no longer'} an owner")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+import sys
+import argparse
+from datetime import timedelta
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.utils.market_basket import update_days, rebuild_associations
+from app.utils.shop_settings import shop_settings_cache
+
+def main():
+    parser = argparse.ArgumentParser(description="Update frequently-bought-together product associations")
+    parser.add_argument("--days", type=int, default=settings.basket_window_days,
+                        help="Count any of the last N finished business days not counted yet")
+    parser.add_argument("--recompute", action="store_true",
+                        help="Count those days again even if they were counted before")
+    parser.add_argument("--window-days", type=int, default=settings.basket_window_days,
+                        help="Days of counts the associations are built from")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        shop = shop_settings_cache.get(db)
+        today = shop.business_date()
+        days = [today - timedelta(days=n) for n in range(1, args.days + 1)]
+        updated = update_days(db, shop, days, args.recompute)
+        stored = rebuild_associations(db, shop, args.window_days)
+        print(f"Counted {len(updated)} day(s), stored {stored} association(s)")
+    except Exception as e:
+        print(f"Error updating product associations: {e}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import sys
+import os
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+# Add the parent directory to the Python path
+sys.path.append(str(BACKEND_DIR))
+
+from app.config.settings import settings
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def measure_import():
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    output = subprocess.check_output([sys.executable, "-c", code], cwd=BACKEND_DIR, env=os.environ)
+    return float(output.strip().splitlines()[-1])
+
+def measure_ready(timeout):
+    # Wall time from spawning a worker process until /readyz answers 200
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=os.environ,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/readyz", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.02)
+        raise TimeoutError(f"Worker not ready after {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API worker cold-start time")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    ready = [measure_ready(args.timeout) for _ in range(args.runs)]
+
+    target = settings.startup_target_seconds
+    print(f"import app.main: median {statistics.median(imports):.3f}s, max {max(imports):.3f}s")
+    print(f"spawn to ready:  median {statistics.median(ready):.3f}s, max {max(ready):.3f}s (target {target:.1f}s)")
+    sys.exit(0 if max(ready) <= target else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import sys
+import argparse
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config.database import engine
+from app.utils.migrations import (
+    upgrade,
+    stamp,
+    applied_versions,
+    discover_migrations,
+    modified_migrations,
+    metadata_indexes,
+    database_indexes,
+    find_redundant_indexes,
+)
+
+def cmd_upgrade(args):
+    applied, stamped = upgrade(engine)
+    if not applied and not stamped:
+        print("Database schema is up to date.")
+    # Stamped migrations were already part of the schema and did not run
+    for migration in stamped:
+        print(f"Stamped {migration.version:04d}_{migration.name}")
+    for migration in applied:
+        print(f"Applied {migration.version:04d}_{migration.name}")
+
+def cmd_status(args):
+    with engine.connect() as conn:
+        applied = applied_versions(conn)
+        modified = {m.version for m in modified_migrations(conn)}
+    for migration in discover_migrations():
+        state = "applied" if migration.version in applied else "pending"
+        if migration.version in modified:
+            state += " (modified since applied)"
+        print(f"{migration.version:04d}_{migration.name}: {state}")
+
+def cmd_stamp(args):
+    for migration in stamp(engine, args.version):
+        print(f"Stamped {migration.version:04d}_{migration.name}")
+
+def cmd_redundant_indexes(args):
+    if args.models:
+        indexes = metadata_indexes()
+    else:
+        with engine.connect() as conn:
+            indexes = database_indexes(conn)
+
+    redundant = find_redundant_indexes(indexes)
+    if not redundant:
+        print("No redundant indexes found.")
+    for r in redundant:
+        print(f"{r.table}.{r.index} ({', '.join(r.columns)}) is a {r.reason} {r.covered_by}")
+    return 1 if redundant else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Coffee POS schema migrations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("upgrade", help="Apply pending migrations").set_defaults(func=cmd_upgrade)
+    subparsers.add_parser("status", help="List migrations and whether they are applied").set_defaults(func=cmd_status)
+
+    stamp_parser = subparsers.add_parser("stamp", help="Mark migrations up to VERSION as applied without running them")
+    stamp_parser.add_argument("version", type=int)
+    stamp_parser.set_defaults(func=cmd_stamp)
+
+    redundant_parser = subparsers.add_parser("redundant-indexes", help="Report indexes covered by another index")
+    redundant_parser.add_argument("--models", action="store_true", help="Check the SQLAlchemy models instead of the live database")
+    redundant_parser.set_defaults(func=cmd_redundant_indexes)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args) or 0)
+
+if __name__ == "__main__":
+    main()
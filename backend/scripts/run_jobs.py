@@ -0,0 +1,55 @@
+import sys
+import time
+import signal
+import argparse
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the parent directory to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config.database import SessionLocal
+from app.config.settings import settings
+from app.utils.jobs import JobWorkers, purge_done
+import app.utils.order_jobs  # noqa: F401  registers the order job handlers
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background jobs from the outbox")
+    parser.add_argument("--threads", type=int, default=max(settings.job_workers, 1),
+                        help="Worker threads in this process")
+    parser.add_argument("--once", action="store_true",
+                        help="Run every job that is due now, then exit")
+    parser.add_argument("--purge-days", type=int, default=None,
+                        help="Delete finished jobs older than this many days and exit")
+    args = parser.parse_args()
+
+    if args.purge_days is not None:
+        db = SessionLocal()
+        try:
+            removed = purge_done(db, datetime.utcnow() - timedelta(days=args.purge_days))
+            print(f"Removed {removed} finished job(s)")
+        finally:
+            db.close()
+        return
+
+    workers = JobWorkers(args.threads, settings.job_poll_seconds)
+    if args.once:
+        ran = 0
+        while workers.run_once():
+            ran += 1
+        print(f"Ran {ran} job(s)")
+        return
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    workers.start()
+    print(f"Running jobs with {args.threads} thread(s)")
+    try:
+        while not stopping:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    workers.stop()
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,9 @@ interface User {
 
 interface LoginResponse {
     access_token: string;
+    refresh_token: string;
     token_type: string;
+    expires_in: number;
     role: number;
     redirect_to: string;
 }
@@ -52,6 +54,7 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
         } catch (error) {
             console.error('Auth check failed:', error);
             localStorage.removeItem('access_token');
+            localStorage.removeItem('refresh_token');
             setUser(null);
             setIsAuthenticated(false);
             setIsAdmin(false);
@@ -65,6 +68,7 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
         try {
             const response = await authService.login(username, password);
             localStorage.setItem('access_token', response.access_token);
+            localStorage.setItem('refresh_token', response.refresh_token);
             const userData = await authService.getCurrentUser();
             setUser(userData);
             setIsAuthenticated(true);
@@ -72,6 +76,7 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
             return response;
         } catch (error) {
             localStorage.removeItem('access_token');
+            localStorage.removeItem('refresh_token');
             setUser(null);
             setIsAuthenticated(false);
             setIsAdmin(false);
@@ -80,7 +85,8 @@ export const AuthProvider: React.FC<{ children: React.ReactNode }> = ({ children
     };
 
     const logout = () => {
-        localStorage.removeItem('access_token');
+        // Revoke the session server-side; local state is cleared either way
+        authService.logout().catch((error) => console.error('Logout failed:', error));
         setUser(null);
         setIsAuthenticated(false);
         setIsAdmin(false);
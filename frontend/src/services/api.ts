@@ -14,15 +14,58 @@ api.interceptors.request.use((config) => {
     if (token) {
         config.headers.Authorization = `Bearer ${token}`;
     }
+    // Owners pick the store to work in; staff of one store never need to
+    const storeId = localStorage.getItem('store_id');
+    if (storeId) {
+        config.headers['X-Store-Id'] = storeId;
+    }
     return config;
 });
 
+const clearSession = () => {
+    localStorage.removeItem('access_token');
+    localStorage.removeItem('refresh_token');
+};
+
+// Access tokens are short-lived; concurrent 401s share a single refresh
+let refreshing: Promise<string> | null = null;
+
+const refreshAccessToken = (): Promise<string> => {
+    if (!refreshing) {
+        const refreshToken = localStorage.getItem('refresh_token');
+        refreshing = (refreshToken
+            ? axios.post<RefreshResponse>(`${api.defaults.baseURL}/auth/refresh`, { refresh_token: refreshToken })
+                .then((response) => {
+                    localStorage.setItem('access_token', response.data.access_token);
+                    localStorage.setItem('refresh_token', response.data.refresh_token);
+                    return response.data.access_token;
+                })
+            : Promise.reject(new Error('No refresh token'))
+        ).finally(() => {
+            refreshing = null;
+        });
+    }
+    return refreshing;
+};
+
 // Add response interceptor to handle errors
 api.interceptors.response.use(
     (response) => response,
-    (error) => {
+    async (error) => {
+        const original = error.config;
+        const isAuthCall = original?.url?.startsWith('/auth/token') || original?.url?.startsWith('/auth/refresh');
+        if (error.response?.status === 401 && original && !original._retried && !isAuthCall) {
+            original._retried = true;
+            try {
+                const token = await refreshAccessToken();
+                original.headers.Authorization = `Bearer ${token}`;
+                return api(original);
+            } catch {
+                // Fall through to the login redirect
+            }
+        }
         if (error.response?.status === 401 || error.response?.status === 403) {
-            localStorage.removeItem('access_token');
+            clearSession();
             window.location.href = '/login';
         }
         return Promise.reject(error);
@@ -31,11 +74,20 @@ api.interceptors.response.use(
 
 interface LoginResponse {
     access_token: string;
+    refresh_token: string;
     token_type: string;
+    expires_in: number;
     role: number;
     redirect_to: string;
 }
 
+interface RefreshResponse {
+    access_token: string;
+    refresh_token: string;
+    token_type: string;
+    expires_in: number;
+}
+
 interface UserResponse {
     id: number;
     username: string;
@@ -67,13 +119,20 @@ export const authService = {
         });
         return response.data;
     },
+    logout: async (): Promise<void> => {
+        try {
+            await api.post('/auth/logout');
+        } finally {
+            clearSession();
+        }
+    },
     getCurrentUser: async (): Promise<UserResponse> => {
         try {
             const response = await api.get<UserResponse>('/auth/me');
             return response.data;
         } catch (error) {
             if (axios.isAxiosError(error) && error.response?.status === 401) {
-                localStorage.removeItem('access_token');
+                clearSession();
                 throw new Error('Session expired. Please login again.');
             }
             throw error;